@@ -1,12 +1,25 @@
 import json
 import logging
-from llm.gemini_pipeline import invoke
-from vectorstore.store import add_document
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import parse_json
+from vectorstore.store import write_memory
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Structured output schema requested from Gemini and validated on parse
+ANALYTICS_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "persona_changes": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "content_improvements": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "channel_recommendations": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "next_steps": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+}
+
 
 class AnalyticsAgent:
     """
@@ -16,17 +29,8 @@ class AnalyticsAgent:
     def __init__(self):
         pass
 
-    def analyse_campaign(self, campaign_results: str):
-        """
-        Analyzes campaign results and produces structured insights.
-
-        Args:
-        - campaign_results: JSON or text of impressions, clicks, conversions, etc.
-
-        Returns:
-        - Structured JSON with summary, persona changes, content improvements, channel recommendations, next steps.
-        """
-        prompt = f"""
+    def _build_prompt(self, campaign_results: str) -> str:
+        return f"""
         You are a SENIOR AI MARKETING PERFORMANCE ANALYST.
 
         Analyse the following campaign results:
@@ -50,8 +54,10 @@ class AnalyticsAgent:
         }}
         """
 
-        response = invoke(prompt)
-
+    def _handle_response(self, response: str | None) -> dict:
+        """
+        Validates the LLM insights and stores them in the vector database.
+        """
         if not response:
             logger.warning("No response from Analytics Agent")
             return {
@@ -64,9 +70,8 @@ class AnalyticsAgent:
             }
 
         # Validate JSON and apply fallback if needed
-        try:
-            json_response = json.loads(response)
-        except json.JSONDecodeError:
+        json_response = parse_json(response, ANALYTICS_SCHEMA, agent="AnalyticsAgent")
+        if json_response is None:
             logger.error("Analytics JSON invalid. Applying fallback structure.")
             json_response = {
                 "summary": "",
@@ -78,10 +83,38 @@ class AnalyticsAgent:
             }
 
         # Store in vector DB
-        add_document(
+        write_memory(
             json.dumps(json_response),
             metadata={"type": "analytics", "source": "campaign_feedback"}
         )
 
         logger.info("Analytics insights stored successfully.")
         return json_response
+
+    def analyse_campaign(self, campaign_results: str):
+        """
+        Analyzes campaign results and produces structured insights.
+
+        Args:
+        - campaign_results: JSON or text of impressions, clicks, conversions, etc.
+
+        Returns:
+        - Structured JSON with summary, persona changes, content improvements, channel recommendations, next steps.
+        """
+        response = invoke(
+            self._build_prompt(campaign_results),
+            agent="analytics",
+            response_schema=ANALYTICS_SCHEMA
+        )
+        return self._handle_response(response)
+
+    async def aanalyse_campaign(self, campaign_results: str):
+        """
+        Async variant of analyse_campaign().
+        """
+        response = await ainvoke(
+            self._build_prompt(campaign_results),
+            agent="analytics",
+            response_schema=ANALYTICS_SCHEMA
+        )
+        return self._handle_response(response)
@@ -1,8 +1,8 @@
 import logging
 import json
 
-from llm.gemini_pipeline import invoke
-from vectorstore.store import add_document
+from llm.gemini_pipeline import invoke, ainvoke, astream
+from vectorstore.store import write_memory
 
 # Logger setup
 logging.basicConfig(level=logging.INFO)
@@ -18,16 +18,7 @@ class ContentAgent:
     def __init__(self):
         pass
 
-    def generate_content(self, product_text: str, persona_text: str, channel: str = "social_media") -> dict:
-        """
-        Args:
-        - product_text
-        - persona-text
-        - channel
-        Returns:
-        - Generated content as text
-        """
-
+    def _build_prompt(self, product_text: str, persona_text: str, channel: str) -> str:
         prompt = f"""
         You are a SENIOR MARKETING CONTENT GENERATOR.
         Create a high-converting content for the following:
@@ -56,9 +47,15 @@ class ContentAgent:
         }
         template_instruction = templates.get(channel, "")
         prompt += "\n{template_instruction}"
-        logger.info(f"Prompt sent to Agent: \n {prompt}")
-        response = invoke(prompt)
+        return prompt
 
+    def _handle_response(
+            self, product_text: str, persona_text: str, channel: str,
+            response: str | None
+            ) -> dict:
+        """
+        Wraps the generated content and stores it in the vector database.
+        """
         if response:
             try:
                 structured_response = json.loads(response)
@@ -66,7 +63,7 @@ class ContentAgent:
                 structured_response = {"text": response}
 
             # Store in vectorstore for retrieval and experiments
-            add_document(
+            write_memory(
                 str(structured_response),
                 metadata={
                     "type": "content",
@@ -90,3 +87,42 @@ class ContentAgent:
                     "channel": channel,
                     "content": None
                 }
+
+    def generate_content(self, product_text: str, persona_text: str, channel: str = "social_media") -> dict:
+        """
+        Args:
+        - product_text
+        - persona-text
+        - channel
+        Returns:
+        - Generated content as text
+        """
+        prompt = self._build_prompt(product_text, persona_text, channel)
+        logger.info(f"Prompt sent to Agent: \n {prompt}")
+        response = invoke(prompt, agent="content")
+        return self._handle_response(product_text, persona_text, channel, response)
+
+    async def agenerate_content(self, product_text: str, persona_text: str, channel: str = "social_media") -> dict:
+        """
+        Async variant of generate_content().
+        """
+        prompt = self._build_prompt(product_text, persona_text, channel)
+        logger.info(f"Prompt sent to Agent: \n {prompt}")
+        response = await ainvoke(prompt, agent="content")
+        return self._handle_response(product_text, persona_text, channel, response)
+
+    async def agenerate_content_stream(self, product_text: str, persona_text: str, channel: str = "social_media"):
+        """
+        Streaming variant of generate_content().
+        Yields ("token", chunk) while the model generates, then
+        ("result", content) once the full content has been stored.
+        """
+        prompt = self._build_prompt(product_text, persona_text, channel)
+        logger.info(f"Prompt sent to Agent: \n {prompt}")
+        parts = []
+        async for chunk in astream(prompt, agent="content"):
+            parts.append(chunk)
+            yield "token", chunk
+
+        response = "".join(parts) or None
+        yield "result", self._handle_response(product_text, persona_text, channel, response)
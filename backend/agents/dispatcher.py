@@ -35,9 +35,48 @@ class Dispatcher:
         self.experiment_agent = experiment_agent
         self.analytics_agent = analytics_agent
 
-    def run(self, plan: dict, reason_output: dict, user_payload: dict):
+    def _route(self, action: str, user_payload: dict):
         """
-        Core Routing Logic
+        Maps an action onto (status, agent method name, agent, kwargs).
+        Async callers await the "a"-prefixed variant of the same method.
+        """
+        if action == "call_research_agent":
+            return "research_done", "analyse_product", self.research_agent, {
+                "product_text": user_payload.get("product_text", ""),
+                "competitor_text": user_payload.get("competitor_text", "")
+            }
+
+        if action == "call_persona_agent":
+            return "persona_done", "generate_persona", self.persona_agent, {
+                "product_text": user_payload.get("product_text", ""),
+                "market_text": user_payload.get("market_text", "")
+            }
+
+        if action == "call_content_agent":
+            return "content_done", "generate_content", self.content_agent, {
+                "product_text": user_payload.get("product_text", ""),
+                "persona_text": user_payload.get("persona_text", ""),
+                "channel": user_payload.get("channel", "")
+            }
+
+        if action == "call_experiment_agent":
+            return "experiment_done", "score_variants", self.experiment_agent, {
+                "persona_text": user_payload.get("persona_text", ""),
+                "channel": user_payload.get("channel", ""),
+                "variants": user_payload.get("variants", [])
+            }
+
+        if action == "call_analytics_agent":
+            return "analytics_done", "analyse_campaign", self.analytics_agent, {
+                "campaign_results": user_payload.get("campaign_results", "")
+            }
+
+        return None
+
+    def _prepare(self, plan: dict, reason_output: dict, user_payload: dict):
+        """
+        Validates inputs and resolves the route.
+        Returns (early_result, route); exactly one of them is set.
         """
         task_type = reason_output.get("task_type")
         action = reason_output.get("action")
@@ -56,59 +95,85 @@ class Dispatcher:
                 "missing_inputs": missing_inputs,
                 "required": inputs_needed,
                 "plan": plan
-            }
+            }, None
+
+        # 2) Select agent
+        route = self._route(action, user_payload)
+        if route is None:
+            return {
+                "status": "unknown_action",
+                "action": action,
+                "reason_output": reason_output,
+                "plan": plan
+            }, None
+        return None, route
+
+    def _agent_error(self, plan: dict, e: Exception) -> dict:
+        logger.error(f"[Dispatcher] Agent crashed: {e}")
+        return {
+            "status": "agent_error",
+            "error": str(e),
+            "trace": traceback.format_exc(),
+            "plan": plan
+        }
+
+    def run(self, plan: dict, reason_output: dict, user_payload: dict):
+        """
+        Core Routing Logic
+        """
+        early, route = self._prepare(plan, reason_output, user_payload)
+        if early is not None:
+            return early
 
-        # 2) Execute selected agent
+        status, method, agent, kwargs = route
         try:
-            if action == "call_research_agent":
-                result = self.research_agent.analyse_product(
-                    product_text=user_payload.get("product_text", ""),
-                    competitor_text=user_payload.get("competitor_text", "")
-                )
-                return {"status": "research_done", "result": result, "plan": plan}
-
-            elif action == "call_persona_agent":
-                result = self.persona_agent.generate_persona(
-                    product_text=user_payload.get("product_text", ""),
-                    market_text=user_payload.get("market_text", "")
-                )
-                return {"status": "persona_done", "result": result, "plan": plan}
-
-            elif action == "call_content_agent":
-                result = self.content_agent.generate_content(
-                    product_text=user_payload.get("product_text", ""),
-                    persona_text=user_payload.get("persona_text", ""),
-                    channel=user_payload.get("channel", "")
-                )
-                return {"status": "content_done", "result": result, "plan": plan}
-
-            elif action == "call_experiment_agent":
-                result = self.experiment_agent.run_experiment(
-                    persona_text=user_payload.get("persona_text", ""),
-                    channel=user_payload.get("channel", ""),
-                    variants=user_payload.get("variants", [])
-                )
-                return {"status": "experiment_done", "result": result, "plan": plan}
-
-            elif action == "call_analytics_agent":
-                result = self.analytics_agent.analyse_campaign(
-                    campaign_results=user_payload.get("campaign_results", "")
-                )
-                return {"status": "analytics_done", "result": result, "plan": plan}
+            result = getattr(agent, method)(**kwargs)
+            return {"status": status, "result": result, "plan": plan}
+        except Exception as e:
+            return self._agent_error(plan, e)
 
-            else:
-                return {
-                    "status": "unknown_action",
-                    "action": action,
-                    "reason_output": reason_output,
-                    "plan": plan
-                }
+    async def arun(self, plan: dict, reason_output: dict, user_payload: dict):
+        """
+        Async variant of run(): awaits the agent's async method so the
+        event loop is never blocked on the LLM call.
+        """
+        early, route = self._prepare(plan, reason_output, user_payload)
+        if early is not None:
+            return early
 
+        status, method, agent, kwargs = route
+        try:
+            result = await getattr(agent, "a" + method)(**kwargs)
+            return {"status": status, "result": result, "plan": plan}
         except Exception as e:
-            logger.error(f"[Dispatcher] Agent crashed: {e}")
-            return {
-                "status": "agent_error",
-                "error": str(e),
-                "trace": traceback.format_exc(),
-                "plan": plan
-            }
+            return self._agent_error(plan, e)
+
+    async def astream(self, plan: dict, reason_output: dict, user_payload: dict):
+        """
+        Streaming variant of arun().
+        Yields ("token", chunk) for agents with a streaming method
+        ("a" + method + "_stream"), then a single ("dispatch", result).
+        Agents without one are awaited and only emit the final result.
+        """
+        early, route = self._prepare(plan, reason_output, user_payload)
+        if early is not None:
+            yield "dispatch", early
+            return
+
+        status, method, agent, kwargs = route
+        streamer = getattr(agent, "a" + method + "_stream", None)
+        try:
+            if streamer is None:
+                result = await getattr(agent, "a" + method)(**kwargs)
+            else:
+                result = None
+                async for event, data in streamer(**kwargs):
+                    if event == "token":
+                        yield "token", data
+                    else:
+                        result = data
+        except Exception as e:
+            yield "dispatch", self._agent_error(plan, e)
+            return
+
+        yield "dispatch", {"status": status, "result": result, "plan": plan}
@@ -1,13 +1,27 @@
-import json
 import logging
 
-from llm.gemini_pipeline import invoke
-from vectorstore.store import add_document
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import parse_json
+from vectorstore.store import write_memory
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Structured output schema requested from Gemini and validated on parse
+EXPERIMENT_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "variant": {"type": "STRING"},
+            "score": {"type": "INTEGER"},
+            "reason": {"type": "STRING"},
+        },
+        "required": ["variant", "score", "reason"],
+    },
+}
+
 
 class ExperimentationAgent:
     """
@@ -18,14 +32,10 @@ class ExperimentationAgent:
     def __init__(self):
         pass
 
-    def score_variants(
+    def _build_prompt(
             self, persona_text: str, channel: str, variants: list[str]
-            ) -> dict:
-        """
-        Scores content variants based on persona fit and conversion likelihood.
-        """
-
-        prompt = f"""
+            ) -> str:
+        return f"""
         You are an AI MARKETING EXPERIMENT EVAULATOR.
         Score each content variant from 0 to 100 based on:
 
@@ -51,9 +61,14 @@ class ExperimentationAgent:
         "reason": "..."
         }}]
         """
-        logger.info(f"Prompt sent to agent:\n{prompt}")
-        response = invoke(prompt)
 
+    def _handle_response(
+            self, persona_text: str, channel: str, variants: list[str],
+            response: str | None
+            ) -> dict:
+        """
+        Clamps and ranks the variant scores, then stores the experiment.
+        """
         if not response:
             return {
                 "persona": persona_text,
@@ -66,9 +81,8 @@ class ExperimentationAgent:
         logger.info(f"LLM Response: \n{response}")
 
         # JSON Parsing
-        try:
-            result = json.loads(response)
-        except json.JSONDecodeError:
+        results = parse_json(response, EXPERIMENT_SCHEMA, agent="ExperimentationAgent")
+        if not results or not all(isinstance(r, dict) for r in results):
             logger.error("Agent did not return valid JSON. Wrapping fallback.")
             results = [{"variant": v, "score": 0, "reason": "invalid JSON"} for v in variants]
 
@@ -85,8 +99,8 @@ class ExperimentationAgent:
             )
         best_result = results_sorted[0]
         # Save experiment vectors into the Vectordb
-        add_document(
-            str(results_sorted)
+        write_memory(
+            str(results_sorted),
             metadata={
                 "type": "experiment",
                 "channel": channel,
@@ -101,3 +115,29 @@ class ExperimentationAgent:
             "variants_scored": results_sorted,
             "best_variant": best_result
         }
+
+    def score_variants(
+            self, persona_text: str, channel: str, variants: list[str]
+            ) -> dict:
+        """
+        Scores content variants based on persona fit and conversion likelihood.
+        """
+        prompt = self._build_prompt(persona_text, channel, variants)
+        logger.info(f"Prompt sent to agent:\n{prompt}")
+        response = invoke(
+            prompt, agent="experiment", response_schema=EXPERIMENT_SCHEMA
+        )
+        return self._handle_response(persona_text, channel, variants, response)
+
+    async def ascore_variants(
+            self, persona_text: str, channel: str, variants: list[str]
+            ) -> dict:
+        """
+        Async variant of score_variants().
+        """
+        prompt = self._build_prompt(persona_text, channel, variants)
+        logger.info(f"Prompt sent to agent:\n{prompt}")
+        response = await ainvoke(
+            prompt, agent="experiment", response_schema=EXPERIMENT_SCHEMA
+        )
+        return self._handle_response(persona_text, channel, variants, response)
@@ -1,13 +1,29 @@
 import json
 import logging
 
-from llm.gemini_pipeline import invoke
-from vectorstore.store import add_document
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import parse_json
+from vectorstore.store import write_memory
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_PERSONA_FIELDS = [
+    "persona_name", "age_range", "demographics", "lifestyle",
+    "deep_motivations", "pain_points", "buying_triggers", "objections",
+    "language_and_tone", "summary",
+]
+
+# Structured output schema requested from Gemini and validated on parse
+PERSONA_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        **{field: {"type": "STRING"} for field in _PERSONA_FIELDS},
+        "recommended_channels": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+}
+
 
 class PersonaAgent:
     def __init__(self):
@@ -59,12 +75,8 @@ class PersonaAgent:
 
         return persona
 
-    def generate_persona(self, product_text: str, market_text: str = None) -> dict:
-        """
-        Creates a full persona profile for the given product and the market.
-        Then automatically saves it to the vector database.
-        """
-        prompt = f"""
+    def _build_prompt(self, product_text: str, market_text: str = None) -> str:
+        return f"""
         You are a SENIOR MARKETING PERSONA MODELLER.
         Based on the product description below,
         create a complete, highly actionable buyer persona.
@@ -97,17 +109,17 @@ class PersonaAgent:
         - Make the persona extremely actionable and emotionally insightful.
         """
 
-        logger.info("Sending persona prompt to model...")
-        response = invoke(prompt)
-
+    def _handle_response(self, product_text: str, response: str | None) -> dict:
+        """
+        Parses, normalises and stores the persona returned by the LLM.
+        """
         if not response:
             logger.error("PersonaAgent: empty LLM response.")
             return self._fallback_persona("Empty LLM response")
 
         # Try to parse JSON
-        try:
-            json_response = json.loads(response)
-        except json.JSONDecodeError:
+        json_response = parse_json(response, PERSONA_SCHEMA, agent="PersonaAgent")
+        if json_response is None:
             logger.error("PersonaAgent: Invalid JSON. Using fallback.")
             return self._fallback_persona("Invalid JSON response from agent.")
 
@@ -116,7 +128,7 @@ class PersonaAgent:
 
         # Store in vector DB
         try:
-            add_document(
+            write_memory(
                 json.dumps(json_response),
                 metadata={"type": "persona", "product_text": product_text}
             )
@@ -125,3 +137,28 @@ class PersonaAgent:
             logger.error(f"PersonaAgent: Failed to store persona: {e}")
 
         return json_response
+
+    def generate_persona(self, product_text: str, market_text: str = None) -> dict:
+        """
+        Creates a full persona profile for the given product and the market.
+        Then automatically saves it to the vector database.
+        """
+        prompt = self._build_prompt(product_text, market_text)
+        logger.info("Sending persona prompt to model...")
+        response = invoke(
+            prompt, agent="persona", response_schema=PERSONA_SCHEMA
+        )
+        return self._handle_response(product_text, response)
+
+    async def agenerate_persona(
+            self, product_text: str, market_text: str = None
+            ) -> dict:
+        """
+        Async variant of generate_persona().
+        """
+        prompt = self._build_prompt(product_text, market_text)
+        logger.info("Sending persona prompt to model...")
+        response = await ainvoke(
+            prompt, agent="persona", response_schema=PERSONA_SCHEMA
+        )
+        return self._handle_response(product_text, response)
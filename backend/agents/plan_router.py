@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from typing import Any, Dict
+
+from agents.planner_agent import PLAN_SCHEMA
+from agents.reasoner import ROUTE_SCHEMA
+from core.config import settings
+from llm.context import build_context
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import extract_json, validate
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Structured output schema requested from Gemini. Each half is
+# validated separately so a valid plan survives an invalid route.
+PLAN_ROUTE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {"plan": PLAN_SCHEMA, "reasoning": ROUTE_SCHEMA},
+    "required": ["plan", "reasoning"],
+}
+
+
+class PlanRouterAgent:
+    """
+    Combined Planner + Reasoner.
+    Produces the structured plan and the routing decision from a single
+    LLM round trip instead of two sequential ones.
+
+    If the combined response cannot be validated, only the plan part
+    (or the planner fallback) is returned with reasoning=None, so the
+    caller can still run the regular reasoner.
+    """
+
+    def __init__(self, retriever=None, context_budget: int | None = None):
+        self.retriever = retriever
+        # Token budget for retrieved memory in the prompt
+        self.context_budget = (
+            settings.PLAN_ROUTER_CONTEXT_TOKENS
+            if context_budget is None else context_budget
+        )
+
+    def _retrieve(self, user_task: str) -> Any:
+        if self.retriever is None:
+            return {}
+        try:
+            return self.retriever.search_docs(user_task)
+        except Exception as e:
+            logger.warning(f"Retriever failed: {e}")
+            return {}
+
+    def _build_prompt(self, user_task: str, retrieved: Any) -> str:
+        return f"""
+        You are the Planner AND Core Reasoning Agent of an ULTRA HIGH
+        PERFORMANCE MARKETING AI SYSTEM.
+        In ONE answer you must:
+        1) plan which agents the request needs
+        2) decide which single agent to call next and with which inputs
+
+        Agents available:
+        - research_agent (product analysis, competitor analysis)
+          → action: "call_research_agent", inputs: ["product_text", "competitor_text"]
+        - persona_agent (target audience, personas, segmentation, buyer insights)
+          → action: "call_persona_agent", inputs: ["product_text", "market_text"]
+        - content_agent (ads, posts, scripts, long-form content)
+          → action: "call_content_agent", inputs: ["product_text", "persona_text", "channel"]
+        - experiment_agent (A/B tests, variations, test ideas)
+          → action: "call_experiment_agent", inputs: ["persona_text", "channel", "variants"]
+        - analytics_agent (ROI analysis, performance insights)
+          → action: "call_analytics_agent", inputs: ["campaign_results"]
+
+        ALWAYS return a VALID JSON OBJECT. Never return text outside JSON
+        (NEVER EXPLAIN).
+
+        === INPUT ===
+        User request:
+        {user_task}
+
+        Retrieved memory:
+        {build_context(
+            retrieved,
+            self.context_budget,
+            settings.CONTEXT_ITEM_TOKENS,
+            settings.CONTEXT_DEDUP_THRESHOLD
+        )}
+
+        === OUTPUT FORMAT ===
+        {{
+            "plan": {{
+                "task": "...",
+                "needs_research": true/false,
+                "needs_persona": true/false,
+                "needs_content": true/false,
+                "needs_experimentation": true/false,
+                "needs_analytics": true/false,
+                "additional_context": "Optional description or extracted info"
+            }},
+            "reasoning": {{
+                "task_type": "research|persona|content|experiment|analysis",
+                "reasoning": "short high-level justification",
+                "action": "which agent to call next",
+                "inputs_needed": ["list", "of", "required", "inputs"]
+            }}
+        }}
+        """
+
+    def _fallback_plan(self, user_task: str, reason: str) -> dict:
+        return {
+            "task": user_task,
+            "needs_research": True,
+            "needs_persona": False,
+            "needs_content": False,
+            "needs_experimentation": False,
+            "needs_analytics": False,
+            "additional_context": reason
+        }
+
+    def _parse(self, user_task: str, response: str | None) -> Dict[str, Any]:
+        """
+        Splits the combined response into {"plan": ..., "reasoning": ...}.
+        reasoning is None when the routing half is missing or invalid.
+        """
+        if not response:
+            logger.error("PlanRouterAgent returned no response.")
+            return {
+                "plan": self._fallback_plan(user_task, "Fallback: No Agent response"),
+                "reasoning": None
+            }
+
+        data = extract_json(response)
+        if not isinstance(data, dict):
+            logger.error("PlanRouterAgent failed to JSON parse.")
+            return {
+                "plan": self._fallback_plan(user_task, "Invalid JSON, fallback used."),
+                "reasoning": None
+            }
+
+        plan = data.get("plan")
+        if not validate(plan, PLAN_SCHEMA):
+            plan = self._fallback_plan(user_task, "Missing plan, fallback used.")
+
+        reasoning = data.get("reasoning")
+        if not validate(reasoning, ROUTE_SCHEMA):
+            logger.warning(
+                "Combined routing decision invalid - reasoner will run separately."
+            )
+            reasoning = None
+
+        logger.info(f"PLAN + ROUTE GENERATED: {plan} / {reasoning}")
+        return {"plan": plan, "reasoning": reasoning}
+
+    def plan_and_route(self, user_task: str) -> Dict[str, Any]:
+        """
+        Returns {"plan": dict, "reasoning": dict | None} from one LLM call.
+        """
+        prompt = self._build_prompt(user_task, self._retrieve(user_task))
+        response = invoke(
+            prompt, agent="plan_router", response_schema=PLAN_ROUTE_SCHEMA
+        )
+        return self._parse(user_task, response)
+
+    async def aplan_and_route(self, user_task: str) -> Dict[str, Any]:
+        """
+        Async variant of plan_and_route().
+        """
+        # encode + Chroma query (+ BM25 build on first use) off the event loop
+        retrieved = await asyncio.to_thread(self._retrieve, user_task)
+        prompt = self._build_prompt(user_task, retrieved)
+        response = await ainvoke(
+            prompt, agent="plan_router", response_schema=PLAN_ROUTE_SCHEMA
+        )
+        return self._parse(user_task, response)
@@ -1,11 +1,29 @@
 import logging
-import json
-from llm.gemini_pipeline import invoke
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import parse_json
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Structured output schema requested from Gemini and validated on parse
+PLAN_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "task": {"type": "STRING"},
+        "needs_research": {"type": "BOOLEAN"},
+        "needs_persona": {"type": "BOOLEAN"},
+        "needs_content": {"type": "BOOLEAN"},
+        "needs_experimentation": {"type": "BOOLEAN"},
+        "needs_analytics": {"type": "BOOLEAN"},
+        "additional_context": {"type": "STRING"},
+    },
+    "required": [
+        "task", "needs_research", "needs_persona", "needs_content",
+        "needs_experimentation", "needs_analytics",
+    ],
+}
+
 
 class PlannerAgent:
     """
@@ -16,12 +34,8 @@ class PlannerAgent:
     def __init__(self):
         pass
 
-    def plan(self, user_task: str) -> dict:
-        """
-        Uses the LLM to classify the task and decide which agents are needed.
-        """
-
-        prompt = f"""
+    def _build_prompt(self, user_task: str) -> str:
+        return f"""
         You are the Planner Agent of an ULTRA HIGH PERFORMANCE MARKETING AI
         SYSTEM.
         Your job is to analyze the user's request and output a JSON plan that
@@ -49,8 +63,11 @@ class PlannerAgent:
         {user_task}
         """
 
-        response = invoke(prompt)
-
+    def _parse_plan(self, user_task: str, response: str | None) -> dict:
+        """
+        Turns the raw LLM response into a plan, falling back to a
+        research-only plan when the response is empty or invalid.
+        """
         if not response:
             logger.error(
                 "PlannerAgent returned no response. Using fallback plan."
@@ -65,10 +82,8 @@ class PlannerAgent:
                 "additional_context": "Fallback: No Agent response"
             }
 
-        try:
-            plan = json.loads(response)
-        except Exception as e:
-            logger.error(f"PlannerAgent failed to JSON parse: {e}")
+        plan = parse_json(response, PLAN_SCHEMA, agent="PlannerAgent")
+        if plan is None:
             logger.error(f"Raw Agent response: {response}")
 
             # Fallback if JSON fails
@@ -84,3 +99,25 @@ class PlannerAgent:
 
         logger.info(f"PLANNER PLAN GENERATED: {plan}")
         return plan
+
+    def plan(self, user_task: str) -> dict:
+        """
+        Uses the LLM to classify the task and decide which agents are needed.
+        """
+        response = invoke(
+            self._build_prompt(user_task),
+            agent="planner",
+            response_schema=PLAN_SCHEMA
+        )
+        return self._parse_plan(user_task, response)
+
+    async def aplan(self, user_task: str) -> dict:
+        """
+        Async variant of plan() for the graph and async endpoints.
+        """
+        response = await ainvoke(
+            self._build_prompt(user_task),
+            agent="planner",
+            response_schema=PLAN_SCHEMA
+        )
+        return self._parse_plan(user_task, response)
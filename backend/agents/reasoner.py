@@ -1,13 +1,28 @@
+import asyncio
 import logging
-import json
 from typing import Any, Dict
 
-from llm.gemini_pipeline import invoke
+from core.config import settings
+from llm.context import build_context
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import parse_json
 
 # Set up logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Structured output schema requested from Gemini and validated on parse
+ROUTE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "task_type": {"type": "STRING"},
+        "reasoning": {"type": "STRING"},
+        "action": {"type": "STRING"},
+        "inputs_needed": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["task_type", "reasoning", "action", "inputs_needed"],
+}
+
 
 class ReasonerAgent:
     """
@@ -18,9 +33,14 @@ class ReasonerAgent:
     - fallback JSON repair
     - validation
     """
-    def __init__(self, retriever):
+    def __init__(self, retriever, context_budget: int | None = None):
         self.max_retries = 2
         self.retriever = retriever
+        # Token budget for retrieved memory in the prompt
+        self.context_budget = (
+            settings.REASONER_CONTEXT_TOKENS
+            if context_budget is None else context_budget
+        )
     
     def _build_prompt(self, user_task: str, retrieved: Any) -> str:
         return f"""
@@ -57,7 +77,12 @@ class ReasonerAgent:
         {user_task}
 
         Retrieved memory:
-        {json.dumps(retrieved, indent=2)}
+        {build_context(
+            retrieved,
+            self.context_budget,
+            settings.CONTEXT_ITEM_TOKENS,
+            settings.CONTEXT_DEDUP_THRESHOLD
+        )}
 
         === OUTPUT FORMAT ===
         {{
@@ -82,23 +107,36 @@ class ReasonerAgent:
     def _try_parse(self, text: str) -> Dict[str, Any] | None:
         """
         Tries to parse JSON and returns Dict when successful,
-        otherwise None
+        otherwise None.
+        Fenced or prefixed JSON is recovered here, so the repair
+        round trip only runs when no valid object can be extracted.
+        """
+        return parse_json(text, ROUTE_SCHEMA, agent="ReasonerAgent")
+
+    def _retrieval_keys(self, user_task: Any) -> list[str]:
+        """
+        The graph passes the planner's plan dict rather than raw text;
+        its task and extracted context are searched as separate keys.
         """
+        if isinstance(user_task, dict):
+            keys = [user_task.get("task"), user_task.get("additional_context")]
+            return [str(key) for key in keys if key]
+        return [str(user_task)]
+
+    def _retrieve(self, user_task: str) -> Any:
+        """
+        Retrieves memory context, never failing the reasoning step.
+        """
+        if self.retriever is None:
+            return {}
         try:
-            data = json.loads(text)
-            # Minimal validation
-            required = {"task_type", "reasoning", "action", "inputs_needed"}
-            if not required.issubset(set(data.keys())):
-                logger.warning("Parson JSON is missing required keys.")
-                return None
-            # Ensure types
-            if not isinstance(data.get("inputs_needed", []), list):
-                logger.warning("inputs_needed is not a list.")
-                return None
-            return data
+            keys = self._retrieval_keys(user_task)
+            if len(keys) > 1:
+                return self.retriever.search_many_docs(keys)
+            return self.retriever.search_docs(keys[0] if keys else str(user_task))
         except Exception as e:
-            logger.warning(f"_try_parse() failed: {e}")
-            return None
+            logger.warning(f"Retriever failed: {e}")
+            return {}
 
     def decide(self, user_task: str):
         """
@@ -111,20 +149,11 @@ class ReasonerAgent:
 
         logger.info("Starting reasoning process.")
 
-        retrieved = {}
-
-        if self.retriever is not None:
-            try:
-                # Retrieve memory context
-                retrieved = self.retriever.search_docs(user_task)
-            except Exception as e:
-                logger.warning(f"Retriever failed: {e}")
-                retrieved = {}
-
+        retrieved = self._retrieve(user_task)
         prompt = self._build_prompt(user_task, retrieved)
 
         # Call LLM
-        response = invoke(prompt)
+        response = invoke(prompt, agent="reasoner", response_schema=ROUTE_SCHEMA)
 
         if not response:
             logger.error("No reasoning response from Agent on initial call.")
@@ -135,22 +164,63 @@ class ReasonerAgent:
         if parsed:
             logger.info("Successfully parsed initial LLM response.")
             return parsed
-        
+
         logger.warning(
             "Initial parse failed - requesting JSON-only fallback from Agent"
             )
-        fallback = self._fallback_prompt(response)
-        updated_response = invoke(fallback)
+        updated_response = invoke(
+            self._fallback_prompt(response),
+            agent="reasoner",
+            response_schema=ROUTE_SCHEMA
+        )
+        return self._finish_fallback(response, updated_response)
+
+    async def adecide(self, user_task: str):
+        """
+        Async variant of decide() for the graph and async endpoints.
+        """
+        logger.info("Starting reasoning process.")
+
+        # encode + Chroma query (+ BM25 build on first use) off the event loop
+        retrieved = await asyncio.to_thread(self._retrieve, user_task)
+        prompt = self._build_prompt(user_task, retrieved)
+
+        response = await ainvoke(
+            prompt, agent="reasoner", response_schema=ROUTE_SCHEMA
+        )
 
+        if not response:
+            logger.error("No reasoning response from Agent on initial call.")
+            return {"error": "No reasoning response returned."}
+
+        parsed = self._try_parse(response)
+        if parsed:
+            logger.info("Successfully parsed initial LLM response.")
+            return parsed
+
+        logger.warning(
+            "Initial parse failed - requesting JSON-only fallback from Agent"
+            )
+        updated_response = await ainvoke(
+            self._fallback_prompt(response),
+            agent="reasoner",
+            response_schema=ROUTE_SCHEMA
+        )
+        return self._finish_fallback(response, updated_response)
+
+    def _finish_fallback(self, response: str, updated_response: str | None):
+        """
+        Parses the JSON-repair response, or reports both raw attempts.
+        """
         if not updated_response:
             logger.error("No response from LLM on fallback.")
             return {"error": "no_response_on_fallback", "raw_first": response}
-        
+
         parsed2 = self._try_parse(updated_response)
         if parsed2:
             logger.info("Successfully parsed fallback LLM response.")
             return parsed2
-        
+
         logger.error("Both parsing attempts failed.")
         return {
             "error": "json_parsing_failed",
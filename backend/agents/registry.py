@@ -0,0 +1,63 @@
+import logging
+import threading
+
+from agents.planner_agent import PlannerAgent
+from agents.plan_router import PlanRouterAgent
+from agents.reasoner import ReasonerAgent
+from agents.retriever_agent import RetrieverAgent
+from agents.dispatcher import Dispatcher
+from agents.research_agent import ResearchAgent
+from agents.persona_agent import PersonaAgent
+from agents.content_agent import ContentAgent
+from agents.experiment_agent import ExperimentationAgent
+from agents.analytics_agent import AnalyticsAgent
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Shared agent set, built on first use (not at import)
+_agents = None
+_lock = threading.Lock()
+
+
+def _build_agents() -> dict:
+    retriever = RetrieverAgent()
+    research_agent = ResearchAgent()
+    persona_agent = PersonaAgent()
+    content_agent = ContentAgent()
+    experiment_agent = ExperimentationAgent()
+    analytics_agent = AnalyticsAgent()
+    return {
+        "planner": PlannerAgent(),
+        "retriever": retriever,
+        "reasoner": ReasonerAgent(retriever),
+        "plan_router": PlanRouterAgent(retriever),
+        "research": research_agent,
+        "persona": persona_agent,
+        "content": content_agent,
+        "experiment": experiment_agent,
+        "analytics": analytics_agent,
+        "dispatcher": Dispatcher(
+            research_agent,
+            persona_agent,
+            content_agent,
+            experiment_agent,
+            analytics_agent
+        ),
+    }
+
+
+def get_agent(name: str):
+    """
+    Returns the shared agent instance registered under `name`
+    (planner, retriever, reasoner, plan_router, research, persona,
+    content, experiment, analytics, dispatcher).
+    """
+    global _agents
+    if _agents is None:
+        with _lock:
+            if _agents is None:
+                logger.info("Initialising agents...")
+                _agents = _build_agents()
+    return _agents[name]
@@ -1,13 +1,25 @@
 import json
 import logging
 
-from llm.gemini_pipeline import invoke
-from vectorstore.store import add_document
+from llm.gemini_pipeline import invoke, ainvoke
+from llm.structured import parse_json
+from vectorstore.store import write_memory
 
 # logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Structured output schema requested from Gemini and validated on parse
+RESEARCH_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "product_summary": {"type": "STRING"},
+        "usps": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "target_audience": {"type": "ARRAY", "items": {"type": "STRING"}},
+        "competitor_comparison": {"type": "STRING"},
+    },
+}
+
 
 class ResearchAgent:
     """
@@ -19,16 +31,10 @@ class ResearchAgent:
     def __init__(self):
         pass
 
-    def analyse_product(
+    def _build_prompt(
             self, product_text: str, competitor_text: str | None
-            ) -> dict:
-        """
-        Analyses the product text and competitor text
-        altogether and provides insights. Then saves these
-        to the vector database, and returns structured JSON
-        at the end.
-        """
-        prompt = f"""
+            ) -> str:
+        return f"""
         You are a marketing research agent.
         Analyse the following product:
         {product_text}
@@ -42,12 +48,17 @@ class ResearchAgent:
             "competitor_comparison": "2 Sentences comparision"
         }}
         """
-        logger.info(f"Prompt sent to Agent: \n{prompt}")
-        response = invoke(prompt)
+
+    def _handle_response(
+            self, product_text: str, competitor_text: str | None,
+            response: str | None
+            ) -> dict:
+        """
+        Normalises the LLM response and stores it in the vector database.
+        """
         if response:
-            try:
-                result = json.loads(response)
-            except json.JSONDecodeError:
+            result = parse_json(response, RESEARCH_SCHEMA, agent="ResearchAgent")
+            if result is None:
                 logger.error(
                     "JSON Parsing failed. Generating fallback structure."
                     )
@@ -73,7 +84,7 @@ class ResearchAgent:
                 result["target_audience"] = [result["target_audience"]]
 
             logger.info("Analysis completed successfully.")
-            add_document(
+            write_memory(
                 json.dumps(result),
                 metadata={
                     "type": "research",
@@ -91,3 +102,32 @@ class ResearchAgent:
             "competitor_comparision": "",
             "error": "No response generated by Agent"
         }
+
+    def analyse_product(
+            self, product_text: str, competitor_text: str | None
+            ) -> dict:
+        """
+        Analyses the product text and competitor text
+        altogether and provides insights. Then saves these
+        to the vector database, and returns structured JSON
+        at the end.
+        """
+        prompt = self._build_prompt(product_text, competitor_text)
+        logger.info(f"Prompt sent to Agent: \n{prompt}")
+        response = invoke(
+            prompt, agent="research", response_schema=RESEARCH_SCHEMA
+        )
+        return self._handle_response(product_text, competitor_text, response)
+
+    async def aanalyse_product(
+            self, product_text: str, competitor_text: str | None
+            ) -> dict:
+        """
+        Async variant of analyse_product().
+        """
+        prompt = self._build_prompt(product_text, competitor_text)
+        logger.info(f"Prompt sent to Agent: \n{prompt}")
+        response = await ainvoke(
+            prompt, agent="research", response_schema=RESEARCH_SCHEMA
+        )
+        return self._handle_response(product_text, competitor_text, response)
@@ -1,37 +1,95 @@
 import logging
 
-from vectorstore.store import search
+from core.config import settings
+from vectorstore.store import build_where, hybrid_search_many, search_many
 
 # Set up logging configuration
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _format(raw_data: dict) -> list[dict]:
+    formatted_results = []
+
+    ids = raw_data.get("ids", [])
+    documents = raw_data.get("documents", [])
+    metadatas = raw_data.get("metadatas", [])
+    distances = raw_data.get("distances", [])
+    scores = raw_data.get("scores") or [None] * len(ids)
+
+    for doc_id, doc, meta, dist, score in zip(ids, documents, metadatas, distances, scores):
+        item = {
+            "id": doc_id,
+            "text": doc,
+            "metadata": meta,
+            "distance": dist
+        }
+        if score is not None:
+            item["score"] = score
+        formatted_results.append(item)
+    return formatted_results
+
+
+def _rank(item: dict) -> float:
+    """Sort key, lower is better: fused score when present, else distance."""
+    return -item["score"] if "score" in item else item["distance"]
+
+
+def _search(queries: list[str], k: int, where: dict | None) -> list[dict]:
+    if settings.RETRIEVAL_MODE == "hybrid":
+        return hybrid_search_many(queries, k, where)
+    return search_many(queries, k, where)
+
+
 class RetrieverAgent:
     def __init__(self):
         pass
 
-    def search_docs(self, query: str, top_k: int = 3):
+    def search_docs(
+        self,
+        query: str,
+        top_k: int = 3,
+        memory_type: str | list[str] | None = None,
+        channel: str | None = None,
+        product: str | None = None,
+    ):
         """
         Searches the vector store for relevant documents based on the query.
+        Optional filters (memory type, channel, product) are applied as
+        metadata filters before the similarity search.
         """
         logger.info(f"Searching memory for query: {query}")
 
-        raw_data = search(query, k=top_k)
+        raw_data = _search([query], top_k, build_where(memory_type, channel, product))[0]
+        return _format(raw_data)
+
+    def search_many_docs(
+        self,
+        queries: list[str],
+        top_k: int = 3,
+        memory_type: str | list[str] | None = None,
+        channel: str | None = None,
+        product: str | None = None,
+    ):
+        """
+        Searches with several retrieval keys in one batched query and
+        merges the hits: each document once, at its best rank,
+        best first, at most top_k per key.
+        """
+        queries = [q for q in dict.fromkeys(queries) if q]
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return self.search_docs(queries[0], top_k, memory_type, channel, product)
 
-        formatted_results = []
+        logger.info(f"Searching memory for {len(queries)} queries: {queries}")
 
-        documents = raw_data.get("documents", [])
-        metadatas = raw_data.get("metadatas", [])
-        distances = raw_data.get("distances", [])
+        merged = {}
+        where = build_where(memory_type, channel, product)
+        for raw_data in _search(queries, top_k, where):
+            for item in _format(raw_data):
+                best = merged.get(item["id"])
+                if best is None or _rank(item) < _rank(best):
+                    merged[item["id"]] = item
 
-        for doc, meta, dist in zip(documents, metadatas, distances):
-            formatted_results.append(
-                {
-                    "text": doc,
-                    "metadata": meta,
-                    "distance": dist
-                }
-            )
-        
-        return formatted_results
+        return sorted(merged.values(), key=_rank)[: top_k * len(queries)]
@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+
+from vectorstore.retention import compact, load_policies
+from vectorstore.store import collection_counts
+
+router = APIRouter()
+
+
+@router.get("/memory")
+def memory_stats():
+    """
+    Document count per collection plus the active retention policies.
+    """
+    try:
+        return {
+            "status": "success",
+            "collections": collection_counts(),
+            "policies": load_policies(),
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
+@router.post("/compact")
+def compact_memory(dry_run: bool = False, rebuild: bool | None = None):
+    """
+    Applies retention policies and compacts the vector store.
+
+    Args:
+    - dry_run: only report what would be deleted
+    - rebuild: force (true) or skip (false) the index rebuild; by default
+      a collection is rebuilt once MEMORY_COMPACT_REBUILD_RATIO of it expired
+    """
+    try:
+        return {"status": "success", "report": compact(dry_run=dry_run, rebuild=rebuild)}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
@@ -5,7 +5,8 @@ from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from graph.runner import run_graph
+from api.sse import sse_event, sse_response
+from graph.runner import result_cache, run_graph_cached, stream_graph
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +24,10 @@ class GraphRequest(BaseModel):
     channel: Optional[str] | None
     variants: Optional[List[str]] | None
     campaign_results: Optional[str] | None
+    # "separate" (planner + reasoner) or "combined" (one LLM round trip)
+    plan_mode: Optional[str] | None
+    # Reuse the result of a semantically similar earlier run
+    use_cache: Optional[bool] = True
 
 
 @router.post("/run-graph")
@@ -31,13 +36,66 @@ async def run_graph_endpoint(request: GraphRequest):
     Endpoint which runs the full UHPM Graph asynchronously and return its result.
     """
     payload: Dict[str, Any] = request.dict()
+    use_cache = payload.pop("use_cache", True) is not False
     try:
         # call async runner
-        result = await run_graph(payload, timeout=60)
+        run = await run_graph_cached(payload, timeout=60, use_cache=use_cache)
         return {
             "status": "ok",
-            "result": result
+            "cache_hit": run["cache"]["hit"],
+            "cache": run["cache"],
+            "result": run["result"]
         }
     except Exception as e:
         logger.exception(f"Graph execution failed: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/run-graph/stream")
+async def run_graph_stream_endpoint(request: GraphRequest):
+    """
+    Server-sent-event variant of /run-graph.
+    Emits a `node` event as each graph node completes, `token` events
+    while the content agent generates, then `cache` (hit flag) and `done`
+    with the final state.
+    """
+    payload: Dict[str, Any] = request.dict()
+    use_cache = payload.pop("use_cache", True) is not False
+
+    async def events():
+        try:
+            async for event, data in stream_graph(payload, timeout=60, use_cache=use_cache):
+                yield sse_event(event, data)
+        except Exception as e:
+            logger.exception(f"Graph streaming failed: {e}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return sse_response(events())
+
+
+@router.get("/cache")
+def graph_cache_stats():
+    if result_cache is None:
+        return {"status": "ok", "cache": {"enabled": False}}
+    return {"status": "ok", "cache": {"enabled": True, **result_cache.stats()}}
+
+
+@router.delete("/cache")
+def invalidate_graph_cache(entry_id: Optional[str] = None):
+    """
+    Drops one cached run (entry_id, as returned in a hit) or the whole cache.
+    """
+    if result_cache is None:
+        return {"status": "ok", "invalidated": 0}
+    return {"status": "ok", "invalidated": result_cache.invalidate(entry_id=entry_id)}
+
+
+@router.post("/cache/invalidate")
+def invalidate_graph_cache_for_inputs(request: GraphRequest):
+    """
+    Drops every cached run with the same structured inputs as the request
+    (product_text, persona_text, channel, ...), whatever its task.
+    """
+    if result_cache is None:
+        return {"status": "ok", "invalidated": 0}
+    return {"status": "ok", "invalidated": result_cache.invalidate(payload=request.dict())}
@@ -0,0 +1,30 @@
+from fastapi import APIRouter
+
+from llm.gemini_pipeline import llm_metrics, metrics_snapshot
+from vectorstore.store import embedding_cache_stats
+
+router = APIRouter()
+
+
+@router.get("/llm")
+def llm_metrics_endpoint():
+    """
+    Per-agent LLM latency percentiles, token and cost totals,
+    plus cache, coalescing and rate-limit counters.
+    """
+    return {"status": "success", "metrics": metrics_snapshot()}
+
+
+@router.get("/embeddings")
+def embedding_metrics_endpoint():
+    """
+    Embedding cache hit rate and tier sizes, read from the vector service
+    when the store is remote.
+    """
+    return {"status": "success", "metrics": embedding_cache_stats()}
+
+
+@router.post("/llm/reset")
+def reset_llm_metrics():
+    llm_metrics.reset()
+    return {"status": "success", "message": "LLM metrics reset."}
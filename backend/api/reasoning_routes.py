@@ -3,36 +3,14 @@ import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from agents.reasoner import ReasonerAgent
-from agents.dispatcher import Dispatcher
-# agent imports
-from agents.research_agent import ResearchAgent
-from agents.analytics_agent import AnalyticsAgent
-from agents.content_agent import ContentAgent
-from agents.experiment_agent import ExperimentationAgent
-from agents.persona_agent import PersonaAgent
+from agents.registry import get_agent
+from api.sse import sse_event, sse_response
 
 router = APIRouter()
 # Logging configuration
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-reasoner = ReasonerAgent()
-
-research_agent = ResearchAgent()
-analytics_agent = AnalyticsAgent()
-content_agent = ContentAgent()
-experiment_agent = ExperimentationAgent()
-persona_agent = PersonaAgent()
-
-dispatcher = Dispatcher(
-    research_agent,
-    persona_agent,
-    content_agent,
-    experiment_agent,
-    analytics_agent
-    )
-
 
 class ReasonRequest(BaseModel):
     task: str
@@ -55,9 +33,10 @@ async def reason_endpoint(request: ReasonRequest):
     try:
         logger.info(f"Reasoning endpoint called with task: {request.task}")
         # Run core reasoning layer
-        reasoning = reasoner.decide(request.task)
+        reasoning = await get_agent("reasoner").adecide(request.task)
         # Dispatch to appropriate agent
-        dispatch_result = dispatcher.run(
+        dispatch_result = await get_agent("dispatcher").arun(
+            plan=None,
             reason_output=reasoning,
             user_payload=request.dict()
             )
@@ -73,3 +52,32 @@ async def reason_endpoint(request: ReasonRequest):
             status_code=500,
             detail=f"Reasoning failed: {e}"
             )
+
+
+@router.post("/reason/stream")
+async def reason_stream_endpoint(request: ReasonRequest):
+    """
+    Server-sent-event variant of /reason.
+    Emits `reasoning` once the route is decided, `token` events while a
+    streaming agent generates, then `dispatch` and `done`.
+    """
+    logger.info(f"Streaming reasoning endpoint called with task: {request.task}")
+
+    async def events():
+        try:
+            reasoning = await get_agent("reasoner").adecide(request.task)
+            yield sse_event("reasoning", reasoning)
+
+            async for event, data in get_agent("dispatcher").astream(
+                plan=None,
+                reason_output=reasoning,
+                user_payload=request.dict()
+            ):
+                yield sse_event(event, data)
+
+            yield sse_event("done", {"status": "ok"})
+        except Exception as e:
+            logger.exception(f"Streaming reasoning failed due to {e}")
+            yield sse_event("error", {"detail": f"Reasoning failed: {e}"})
+
+    return sse_response(events())
@@ -3,14 +3,12 @@ import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 
-from agents.research_agent import ResearchAgent
+from agents.registry import get_agent
 
 router = APIRouter()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-agent = ResearchAgent()
-
 
 class ResearchRequest(BaseModel):
     product_text: str
@@ -18,11 +16,11 @@ class ResearchRequest(BaseModel):
 
 
 @router.post("/analyse")
-def analyse_product(request: ResearchRequest):
+async def analyse_product(request: ResearchRequest):
     try:
         logger.info("Received research analysis request.")
 
-        result = agent.analyse_product(
+        result = await get_agent("research").aanalyse_product(
         product_text=request.product_text,
         competitor_text=request.competitor_text
         )
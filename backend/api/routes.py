@@ -1,9 +1,13 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
 
 from api.graph_endpoints import router as graph_router
 from api.vector_endpoints import router as vectordb_router
 from api.research_endpoints import router as research_router
 from api.reasoning_routes import router as reasoning_router
+from api.metrics_endpoints import router as metrics_router
+from api.admin_endpoints import router as admin_router
+from core.readiness import readiness
 
 router = APIRouter()
 
@@ -13,7 +17,18 @@ def health_check():
     return {"ok": True}
 
 
+@router.get("/ready")
+def readiness_check():
+    """
+    Readiness probe: 503 until start-up warm-up has finished.
+    """
+    state = readiness()
+    return JSONResponse(status_code=200 if state["ready"] else 503, content=state)
+
+
 router.include_router(graph_router, prefix="/graph")
 router.include_router(vectordb_router, prefix="/vectordb")
 router.include_router(research_router, prefix="/research")
 router.include_router(reasoning_router, prefix="/api")
+router.include_router(metrics_router, prefix="/metrics")
+router.include_router(admin_router, prefix="/admin")
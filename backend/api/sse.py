@@ -0,0 +1,24 @@
+import json
+from typing import Any, AsyncIterator
+
+from fastapi.responses import StreamingResponse
+
+
+def sse_event(event: str, data: Any) -> str:
+    """
+    Formats one server-sent event. Data is always JSON encoded, so
+    tokens containing newlines stay on a single `data:` line.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Wraps an async iterator of formatted events in an SSE response.
+    Proxy buffering is disabled so tokens reach the client immediately.
+    """
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,6 +1,13 @@
 from fastapi import APIRouter
 from pydantic import BaseModel
-from vectorstore.store import add_document, search
+from core.config import settings
+from vectorstore.store import (
+    add_document,
+    add_documents,
+    build_where,
+    hybrid_search_many,
+    search_many,
+)
 
 router = APIRouter()
 
@@ -10,6 +17,26 @@ class AddDocumentRequest(BaseModel):
     text: str
 
 
+class AddDocumentsRequest(BaseModel):
+    texts: list[str]
+    metadatas: list[dict] | None = None
+
+
+class SearchManyRequest(BaseModel):
+    queries: list[str]
+    k: int = 3
+    memory_type: str | None = None
+    channel: str | None = None
+    product: str | None = None
+    mode: str | None = None
+
+
+def _search_fn(mode: str | None):
+    if (mode or settings.RETRIEVAL_MODE) == "hybrid":
+        return hybrid_search_many
+    return search_many
+
+
 @router.post("/add")
 def add_document_to_vectordb(request: AddDocumentRequest):
     try:
@@ -19,11 +46,47 @@ def add_document_to_vectordb(request: AddDocumentRequest):
         return {"status": "error", "message": str(e)}
 
 
+@router.post("/add-batch")
+def add_documents_to_vectordb(request: AddDocumentsRequest):
+    try:
+        added = add_documents(request.texts, request.metadatas)
+        return {
+            "status": "success",
+            "message": f"{len(added)} documents added successfully.",
+            "ids": [doc["id"] for doc in added],
+        }
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
+
+
 @router.get("/search")
-def search_in_vectordb(query: str):
+def search_in_vectordb(
+    query: str,
+    memory_type: str | None = None,
+    channel: str | None = None,
+    product: str | None = None,
+    mode: str | None = None,
+):
+    """
+    mode: "hybrid" (BM25 + vector) or "vector", defaults to RETRIEVAL_MODE.
+    """
     try:
-        results = search(query)
+        search_fn = _search_fn(mode)
+        results = search_fn([query], where=build_where(memory_type, channel, product))[0]
         # results are returned as dictionaries, adapt if needed
         return {"status": "success", "results": results}
     except Exception as e:
         return {"status": "error", "message": str(e)}
+
+
+@router.post("/search-batch")
+def search_many_in_vectordb(request: SearchManyRequest):
+    try:
+        results = _search_fn(request.mode)(
+            request.queries,
+            request.k,
+            where=build_where(request.memory_type, request.channel, request.product),
+        )
+        return {"status": "success", "results": results}
+    except Exception as e:
+        return {"status": "error", "message": str(e)}
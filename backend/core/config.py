@@ -14,6 +14,105 @@ class Settings:
         "PERSIST_DIRECTORY", "vectorstore/chroma_store"
     )
 
+    # Store each memory type (persona, research, ...) in its own collection
+    VECTOR_COLLECTION_PER_TYPE: bool = os.getenv(
+        "VECTOR_COLLECTION_PER_TYPE", "false"
+    ).lower() == "true"
+
+    # Skip exact / near-duplicate memory writes (cosine similarity to the
+    # nearest stored document of the same type) and refresh the stored one
+    MEMORY_DEDUP_ENABLED: bool = os.getenv("MEMORY_DEDUP_ENABLED", "true").lower() == "true"
+    MEMORY_DEDUP_THRESHOLD: float = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.95"))
+
+    # Memory retention: JSON policies per memory type ("*" = default), e.g.
+    # {"persona": {"keep_last_per_product": 5}, "*": {"max_age_days": 180}}
+    # Empty keeps everything. Compaction runs every
+    # MEMORY_COMPACTION_INTERVAL_SECONDS (0 = only via POST /admin/compact)
+    # and rebuilds a collection once this fraction of it was deleted.
+    MEMORY_RETENTION_POLICIES: str = os.getenv("MEMORY_RETENTION_POLICIES", "")
+    MEMORY_COMPACTION_INTERVAL_SECONDS: float = float(
+        os.getenv("MEMORY_COMPACTION_INTERVAL_SECONDS", "0")
+    )
+    MEMORY_COMPACT_REBUILD_RATIO: float = float(
+        os.getenv("MEMORY_COMPACT_REBUILD_RATIO", "0.2")
+    )
+
+    # Retrieval: "hybrid" (BM25 + vector, reciprocal rank fusion) or "vector"
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", "60"))
+    # Candidates per side = k * factor
+    HYBRID_CANDIDATE_FACTOR: int = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+    # The BM25 side lives in process memory: it is rebuilt when the stored
+    # counts change (writes by other workers / scripts.ingest), checked at
+    # most every LEXICAL_INDEX_CHECK_SECONDS, and at least every
+    # LEXICAL_INDEX_MAX_AGE_SECONDS (0 = never). Run the vector service
+    # (VECTOR_SERVICE_SOCKET) to keep one always-current index per host.
+    LEXICAL_INDEX_CHECK_SECONDS: float = float(os.getenv("LEXICAL_INDEX_CHECK_SECONDS", "5"))
+    LEXICAL_INDEX_MAX_AGE_SECONDS: float = float(
+        os.getenv("LEXICAL_INDEX_MAX_AGE_SECONDS", "300")
+    )
+
+    # Texts per sentence-transformer forward pass in batched adds
+    EMBED_BATCH_SIZE: int = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+    # Token-aware chunking of long documents at write time (MiniLM reads
+    # at most 256 word pieces). Chunks point at their parent document via
+    # parent_id and searches return the best chunk per parent, fetching
+    # k * CHUNK_SEARCH_FACTOR hits before collapsing.
+    CHUNKING_ENABLED: bool = os.getenv("CHUNKING_ENABLED", "true").lower() == "true"
+    CHUNK_SIZE_TOKENS: int = int(os.getenv("CHUNK_SIZE_TOKENS", "200"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "32"))
+    CHUNK_SEARCH_FACTOR: int = int(os.getenv("CHUNK_SEARCH_FACTOR", "3"))
+
+    # Shared embedding / storage service (python -m vectorstore.service).
+    # When the socket is set, API workers forward embedding, search and
+    # write calls to it instead of loading the model and Chroma themselves.
+    VECTOR_SERVICE_SOCKET: str = os.getenv("VECTOR_SERVICE_SOCKET", "")
+    VECTOR_SERVICE_TIMEOUT_SECONDS: float = float(
+        os.getenv("VECTOR_SERVICE_TIMEOUT_SECONDS", "60")
+    )
+    VECTOR_SERVICE_FALLBACK_LOCAL: bool = os.getenv(
+        "VECTOR_SERVICE_FALLBACK_LOCAL", "false"
+    ).lower() == "true"
+    # Requests from all workers arriving within the window share one call
+    VECTOR_SERVICE_BATCH_WINDOW_MS: float = float(
+        os.getenv("VECTOR_SERVICE_BATCH_WINDOW_MS", "5")
+    )
+    VECTOR_SERVICE_MAX_BATCH: int = int(os.getenv("VECTOR_SERVICE_MAX_BATCH", "256"))
+    VECTOR_SERVICE_THREADS: int = int(os.getenv("VECTOR_SERVICE_THREADS", "4"))
+
+    # Warm up model, Chroma, agents and graph in the background on startup
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+    # Embedding encoder: "torch" (SentenceTransformer) or "onnx"
+    # (ONNX Runtime, needs the optional onnxruntime package; exported on
+    # first use into EMBED_ONNX_DIR, int8-quantised when EMBED_ONNX_QUANTIZE)
+    EMBED_BACKEND: str = os.getenv("EMBED_BACKEND", "torch").lower()
+    EMBED_ONNX_DIR: str = os.getenv("EMBED_ONNX_DIR", "vectorstore/onnx")
+    EMBED_ONNX_QUANTIZE: bool = os.getenv("EMBED_ONNX_QUANTIZE", "true").lower() == "true"
+    EMBED_ONNX_THREADS: int = int(os.getenv("EMBED_ONNX_THREADS", "0"))
+
+    # Embedding cache: in-memory LRU plus optional memmapped disk tier,
+    # off by default (EMBED_CACHE_DIR empty = memory only); set e.g.
+    # EMBED_CACHE_DIR=vectorstore/embedding_cache to share one across workers
+    EMBED_CACHE_ENABLED: bool = os.getenv("EMBED_CACHE_ENABLED", "true").lower() == "true"
+    EMBED_CACHE_DIR: str = os.getenv("EMBED_CACHE_DIR", "")
+    EMBED_CACHE_MAX_MEMORY_ITEMS: int = int(
+        os.getenv("EMBED_CACHE_MAX_MEMORY_ITEMS", "10000")
+    )
+    EMBED_CACHE_MAX_DISK_ITEMS: int = int(
+        os.getenv("EMBED_CACHE_MAX_DISK_ITEMS", "100000")
+    )
+
+    # Write-behind queue for memory writes (agents, write_memory_node)
+    MEMORY_WRITE_BEHIND: bool = os.getenv("MEMORY_WRITE_BEHIND", "true").lower() == "true"
+    MEMORY_QUEUE_SIZE: int = int(os.getenv("MEMORY_QUEUE_SIZE", "1024"))
+    MEMORY_FLUSH_BATCH: int = int(os.getenv("MEMORY_FLUSH_BATCH", "64"))
+    MEMORY_FLUSH_INTERVAL_MS: int = int(os.getenv("MEMORY_FLUSH_INTERVAL_MS", "250"))
+    # How long a write may block on a full queue before it is written inline
+    MEMORY_ENQUEUE_TIMEOUT_SECONDS: float = float(
+        os.getenv("MEMORY_ENQUEUE_TIMEOUT_SECONDS", "2")
+    )
+
     # Telemetry flags
     ALLOW_TELEMETRY: bool = os.getenv("ALLOW_TELEMETRY", "false").lower() == "true"
     CHROMA_TELEMETRY_ENABLED: bool = os.getenv(
@@ -23,6 +122,114 @@ class Settings:
         "OTEL_SDK_DISABLED", "true"
     ).lower() == "true"
 
+    # Semantic cache of whole graph runs: same structured inputs and a task
+    # embedding with cosine similarity >= GRAPH_CACHE_THRESHOLD
+    GRAPH_CACHE_ENABLED: bool = os.getenv("GRAPH_CACHE_ENABLED", "true").lower() == "true"
+    GRAPH_CACHE_THRESHOLD: float = float(os.getenv("GRAPH_CACHE_THRESHOLD", "0.92"))
+    GRAPH_CACHE_TTL_SECONDS: int = int(os.getenv("GRAPH_CACHE_TTL_SECONDS", "3600"))
+    GRAPH_CACHE_MAX_ITEMS: int = int(os.getenv("GRAPH_CACHE_MAX_ITEMS", "1000"))
+
+    # Token budgets for retrieved memory embedded in prompts
+    REASONER_CONTEXT_TOKENS: int = int(os.getenv("REASONER_CONTEXT_TOKENS", "800"))
+    PLAN_ROUTER_CONTEXT_TOKENS: int = int(
+        os.getenv("PLAN_ROUTER_CONTEXT_TOKENS", "800")
+    )
+    CONTEXT_ITEM_TOKENS: int = int(os.getenv("CONTEXT_ITEM_TOKENS", "200"))
+    CONTEXT_DEDUP_THRESHOLD: float = float(
+        os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8")
+    )
+
+    # Graph planning: "separate" (planner + reasoner) or "combined"
+    GRAPH_PLAN_MODE: str = os.getenv("GRAPH_PLAN_MODE", "separate")
+
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
+    GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-3-pro-preview")
+
+    # Ask Gemini for JSON mime type + response schema where agents pass one
+    LLM_JSON_MODE: bool = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+
+    # LLM backend: gemini | fake | record | replay
+    LLM_BACKEND: str = os.getenv("LLM_BACKEND", "gemini")
+    LLM_CASSETTE_PATH: str = os.getenv(
+        "LLM_CASSETTE_PATH", "llm/cassettes/cassette.jsonl"
+    )
+    LLM_FAKE_LATENCY_MS: float = float(os.getenv("LLM_FAKE_LATENCY_MS", "800"))
+    LLM_FAKE_LATENCY_SIGMA: float = float(
+        os.getenv("LLM_FAKE_LATENCY_SIGMA", "0.5")
+    )
+    LLM_FAKE_ERROR_RATE: float = float(os.getenv("LLM_FAKE_ERROR_RATE", "0"))
+    LLM_FAKE_SEED: int = int(os.getenv("LLM_FAKE_SEED", "0"))
+    LLM_FAKE_RESPONSES_PATH: str = os.getenv("LLM_FAKE_RESPONSES_PATH", "")
+
+    # Shared HTTP connection pool for Gemini calls
+    LLM_TIMEOUT_MS: int = int(os.getenv("LLM_TIMEOUT_MS", "60000"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(
+        os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    LLM_KEEPALIVE_EXPIRY: float = float(
+        os.getenv("LLM_KEEPALIVE_EXPIRY", "30")
+    )
+
+    # Prompt/response cache in front of invoke()
+    LLM_CACHE_ENABLED: bool = os.getenv(
+        "LLM_CACHE_ENABLED", "true"
+    ).lower() == "true"
+    # Outside the source tree by default: one file shared by all workers
+    LLM_CACHE_PATH: str = os.getenv(
+        "LLM_CACHE_PATH",
+        os.path.join(
+            os.getenv("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+            "uhpm-agent",
+            "llm_cache.sqlite3",
+        ),
+    )
+    # Seconds a worker waits for another one's write lock on the cache
+    LLM_CACHE_BUSY_TIMEOUT: float = float(
+        os.getenv("LLM_CACHE_BUSY_TIMEOUT", "5")
+    )
+    LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+    LLM_CACHE_MAX_MEMORY_ITEMS: int = int(
+        os.getenv("LLM_CACHE_MAX_MEMORY_ITEMS", "1024")
+    )
+    LLM_CACHE_MAX_DISK_ITEMS: int = int(
+        os.getenv("LLM_CACHE_MAX_DISK_ITEMS", "100000")
+    )
+
+    # Client-side rate limiting for Gemini calls (0 disables a bucket).
+    # Requests are not capped by default (LLM_MAX_CONCURRENCY and the
+    # adaptive backoff on 429 still apply); set this to the project's
+    # Gemini RPM quota divided by the number of worker processes.
+    LLM_REQUESTS_PER_MINUTE: float = float(
+        os.getenv("LLM_REQUESTS_PER_MINUTE", "0")
+    )
+    LLM_TOKENS_PER_MINUTE: float = float(
+        os.getenv("LLM_TOKENS_PER_MINUTE", "1000000")
+    )
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    LLM_BACKOFF_BASE_SECONDS: float = float(
+        os.getenv("LLM_BACKOFF_BASE_SECONDS", "1.0")
+    )
+    LLM_BACKOFF_MAX_SECONDS: float = float(
+        os.getenv("LLM_BACKOFF_MAX_SECONDS", "30")
+    )
+
+    # Hedged requests: comma-separated agents, latency percentile that
+    # triggers the hedge, and the max fraction of calls that may hedge
+    LLM_HEDGE_AGENTS: str = os.getenv("LLM_HEDGE_AGENTS", "")
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_MAX_RATE: float = float(os.getenv("LLM_HEDGE_MAX_RATE", "0.1"))
+    LLM_HEDGE_MIN_SAMPLES: int = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+    # LLM metrics: percentile window per agent and USD price per 1M tokens
+    LLM_METRICS_WINDOW: int = int(os.getenv("LLM_METRICS_WINDOW", "2048"))
+    LLM_PRICE_INPUT_PER_MTOK: float = float(
+        os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0")
+    )
+    LLM_PRICE_OUTPUT_PER_MTOK: float = float(
+        os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "0")
+    )
+
 
 settings = Settings()
@@ -0,0 +1,68 @@
+import logging
+import threading
+import time
+
+from core.config import settings
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Warm-up progress, reported by GET /ready
+_state = {
+    "status": "pending" if settings.WARMUP_ON_STARTUP else "lazy",
+    "started_at": None,
+    "finished_at": None,
+    "duration_s": None,
+    "error": None,
+}
+_lock = threading.Lock()
+
+
+def warm_up():
+    """
+    Initialises everything the request path would otherwise load lazily:
+    embedding model, Chroma collection, agents and the compiled graph.
+    """
+    # Imported here so that importing this module stays cheap
+    from agents.registry import get_agent
+    from graph.runner import _get_graph_app
+    from vectorstore.store import warm_up as warm_up_store
+
+    with _lock:
+        _state.update(status="warming", started_at=time.time(), error=None)
+    started = time.perf_counter()
+    try:
+        warm_up_store()
+        get_agent("dispatcher")
+        _get_graph_app()
+    except Exception as e:
+        logger.error(f"Warm-up failed: {e}")
+        with _lock:
+            _state.update(status="failed", error=str(e))
+        return
+
+    duration = time.perf_counter() - started
+    with _lock:
+        _state.update(
+            status="ready", finished_at=time.time(), duration_s=round(duration, 3)
+        )
+    logger.info(f"Warm-up finished in {duration:.2f}s")
+
+
+def start_warm_up() -> threading.Thread:
+    """Runs warm_up() in a background thread so startup is not blocked."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness() -> dict:
+    """
+    ready is True once warm-up has finished, or always when warm-up is
+    disabled (components then initialise on first use).
+    """
+    with _lock:
+        state = dict(_state)
+    state["ready"] = state["status"] in ("ready", "lazy")
+    return state
@@ -0,0 +1,164 @@
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Request fields that must match exactly for a cached run to be reused
+INPUT_FIELDS = (
+    "product_text",
+    "competitor_text",
+    "market_text",
+    "customer_text",
+    "persona_text",
+    "channel",
+    "variants",
+    "campaign_results",
+)
+
+
+def inputs_hash(payload: Dict[str, Any]) -> str:
+    """Hash of the structured inputs (everything but the free-text task)."""
+    inputs = {field: payload.get(field) for field in INPUT_FIELDS}
+    encoded = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def cacheable(state: Dict[str, Any]) -> bool:
+    """Only runs whose agent finished successfully are cached."""
+    output = state.get("agent_output")
+    return isinstance(output, dict) and str(output.get("status", "")).endswith("_done")
+
+
+class GraphResultCache:
+    """
+    Semantic cache of final graph states.
+
+    Entries are bucketed by inputs_hash(); inside a bucket the task
+    embedding decides: a new task whose cosine similarity to a cached
+    task is >= threshold reuses that run's final state. Entries expire
+    after ttl_seconds, the cache holds at most max_items (LRU), and can
+    be invalidated per entry, per inputs or entirely.
+    """
+
+    def __init__(self, threshold: float = 0.92, ttl_seconds: int = 3600, max_items: int = 1000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_items = max_items
+        # entry_id -> entry
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        # inputs hash -> entry ids
+        self._buckets: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - entry["created_at"] > self.ttl_seconds
+
+    def _drop(self, entry_id: str):
+        """Caller holds the lock."""
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        bucket = self._buckets.get(entry["inputs_hash"])
+        if bucket is not None:
+            bucket.discard(entry_id)
+            if not bucket:
+                del self._buckets[entry["inputs_hash"]]
+
+    def lookup(self, payload: Dict[str, Any], embedding) -> dict | None:
+        """
+        Returns {"entry_id", "similarity", "state", "task", "age_s"} for the
+        most similar live entry above the threshold, or None.
+        """
+        key = inputs_hash(payload)
+        vector = np.asarray(embedding, dtype=np.float32)
+        now = time.time()
+        with self._lock:
+            best_id, best_similarity = None, -1.0
+            for entry_id in list(self._buckets.get(key, ())):
+                entry = self._entries[entry_id]
+                if self._expired(entry, now):
+                    self._drop(entry_id)
+                    continue
+                similarity = float(
+                    np.dot(vector, entry["embedding"])
+                    / ((np.linalg.norm(vector) * entry["norm"]) or 1.0)
+                )
+                if similarity > best_similarity:
+                    best_id, best_similarity = entry_id, similarity
+
+            if best_id is None or best_similarity < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return {
+                "entry_id": best_id,
+                "similarity": round(best_similarity, 4),
+                "task": entry["task"],
+                "age_s": round(now - entry["created_at"], 1),
+                "state": copy.deepcopy(entry["state"]),
+            }
+
+    def store(self, payload: Dict[str, Any], embedding, state: Dict[str, Any]) -> str:
+        entry_id = str(uuid.uuid4())
+        vector = np.asarray(embedding, dtype=np.float32)
+        key = inputs_hash(payload)
+        with self._lock:
+            self._entries[entry_id] = {
+                "inputs_hash": key,
+                "task": payload.get("task"),
+                "embedding": vector,
+                "norm": float(np.linalg.norm(vector)),
+                "state": copy.deepcopy(state),
+                "created_at": time.time(),
+            }
+            self._buckets.setdefault(key, set()).add(entry_id)
+            while len(self._entries) > self.max_items:
+                self._drop(next(iter(self._entries)))
+        return entry_id
+
+    def invalidate(self, entry_id: str | None = None, payload: Dict[str, Any] | None = None) -> int:
+        """
+        Drops one entry (entry_id), every entry for the same structured
+        inputs (payload), or everything (no arguments). Returns the count.
+        """
+        with self._lock:
+            if entry_id is not None:
+                existed = entry_id in self._entries
+                self._drop(entry_id)
+                return int(existed)
+            if payload is not None:
+                ids = list(self._buckets.get(inputs_hash(payload), ()))
+                for cached_id in ids:
+                    self._drop(cached_id)
+                return len(ids)
+            count = len(self._entries)
+            self._entries.clear()
+            self._buckets.clear()
+            return count
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "items": len(self._entries),
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -1,7 +1,10 @@
 import asyncio
 import logging
-from typing import Any, Dict
+import time
+from typing import Any, AsyncIterator, Dict, Tuple
 
+from core.config import settings
+from graph.result_cache import GraphResultCache, cacheable
 from graph.uhpm_graph import create_uhpm_graph, GraphState
 
 # Logging setup
@@ -20,6 +23,60 @@ def _get_graph_app():
     return _graph_app
 
 
+# Semantic cache of whole graph runs
+result_cache = GraphResultCache(
+    threshold=settings.GRAPH_CACHE_THRESHOLD,
+    ttl_seconds=settings.GRAPH_CACHE_TTL_SECONDS,
+    max_items=settings.GRAPH_CACHE_MAX_ITEMS,
+) if settings.GRAPH_CACHE_ENABLED else None
+
+
+async def _task_embedding(task: str):
+    # Encoding is CPU-bound; keep it off the event loop
+    from vectorstore.store import embed
+
+    return (await asyncio.to_thread(embed, [task]))[0]
+
+
+async def _cache_lookup(input_dict: Dict[str, Any], use_cache: bool):
+    """
+    Returns (embedding, hit) where hit is the cache lookup result or None.
+    The embedding is reused to store the run on a miss.
+    """
+    if result_cache is None or not use_cache:
+        return None, None
+    try:
+        embedding = await _task_embedding(str(input_dict.get("task", "")))
+    except Exception as e:
+        logger.warning(f"Graph cache lookup skipped: {e}")
+        return None, None
+    hit = result_cache.lookup(input_dict, embedding)
+    if hit is not None:
+        logger.info(
+            f"Graph cache hit (similarity={hit['similarity']}) for task: {input_dict.get('task')}"
+        )
+    return embedding, hit
+
+
+def _cache_store(input_dict: Dict[str, Any], embedding, state: Dict[str, Any]) -> str | None:
+    if result_cache is None or embedding is None or not cacheable(state):
+        return None
+    return result_cache.store(input_dict, embedding, state)
+
+
+def _cache_info(hit: dict | None, use_cache: bool) -> Dict[str, Any]:
+    if hit is None:
+        return {"hit": False, "enabled": result_cache is not None and use_cache}
+    return {
+        "hit": True,
+        "enabled": True,
+        "entry_id": hit["entry_id"],
+        "similarity": hit["similarity"],
+        "cached_task": hit["task"],
+        "age_s": hit["age_s"],
+    }
+
+
 async def run_graph(input_dict: Dict[str, Any], timeout: int = 60) -> Dict[str, Any]:
     """
     Runs the UHPM Langgraph pipeline asynchronously with a timeout.
@@ -50,3 +107,89 @@ async def run_graph(input_dict: Dict[str, Any], timeout: int = 60) -> Dict[str,
         raise
 
     return dict(result_state)
+
+
+async def run_graph_cached(
+    input_dict: Dict[str, Any], timeout: int = 60, use_cache: bool = True
+) -> Dict[str, Any]:
+    """
+    run_graph() behind the semantic result cache: a task similar enough
+    to a cached one, with identical structured inputs, returns the cached
+    final state without running the graph.
+
+    Returns:
+    - {"result": final_state, "cache": {"hit": bool, ...}}
+    """
+    if "task" not in input_dict:
+        raise ValueError("Missing required field 'task'")
+    embedding, hit = await _cache_lookup(input_dict, use_cache)
+    if hit is not None:
+        return {"result": hit["state"], "cache": _cache_info(hit, use_cache)}
+
+    result = await run_graph(input_dict, timeout=timeout)
+    _cache_store(input_dict, embedding, result)
+    return {"result": result, "cache": _cache_info(None, use_cache)}
+
+
+async def stream_graph(
+    input_dict: Dict[str, Any], timeout: int = 60, use_cache: bool = True
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Runs the UHPM Langgraph pipeline and yields events as they happen.
+
+    Yields:
+    - ("node", {"node": name, "state": update}) when a node completes
+    - ("token", chunk) while a streaming agent generates
+    - ("cache", {"hit": bool, ...}) before "done"
+    - ("done", final_state) at the end
+    A semantic cache hit skips straight to "cache" and "done".
+    """
+    if "task" not in input_dict:
+        raise ValueError("Missing required field 'task'")
+    embedding, hit = await _cache_lookup(input_dict, use_cache)
+    if hit is not None:
+        yield "cache", _cache_info(hit, use_cache)
+        yield "done", hit["state"]
+        return
+
+    app = _get_graph_app()
+
+    state = GraphState(input_dict)
+    state["stream"] = True
+
+    final_state: Dict[str, Any] = dict(state)
+    deadline = time.monotonic() + timeout
+    events = app.astream(
+        state,
+        stream_mode=["updates", "custom"],
+    ).__aiter__()
+
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            logger.error("Graph execution timed out")
+            await events.aclose()
+            raise asyncio.TimeoutError()
+        try:
+            mode, chunk = await asyncio.wait_for(
+                events.__anext__(), timeout=remaining
+            )
+        except StopAsyncIteration:
+            break
+        except asyncio.TimeoutError:
+            logger.error("Graph execution timed out")
+            raise
+
+        if mode == "custom":
+            yield "token", chunk.get("token", "")
+            continue
+
+        for node, update in chunk.items():
+            if update:
+                final_state.update(update)
+            yield "node", {"node": node, "state": update}
+
+    final_state.pop("stream", None)
+    _cache_store(input_dict, embedding, final_state)
+    yield "cache", _cache_info(None, use_cache)
+    yield "done", final_state
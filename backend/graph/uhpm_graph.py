@@ -1,18 +1,13 @@
 from langgraph.graph import StateGraph, END
-from langgraph.checkpoint.memory import MemorySaver
-
-# Import agents
-from agents.planner_agent import PlannerAgent
-from agents.reasoner import ReasonerAgent
-from agents.dispatcher import Dispatcher
-from agents.research_agent import ResearchAgent
-from agents.persona_agent import PersonaAgent
-from agents.content_agent import ContentAgent
-from agents.experiment_agent import ExperimentationAgent
-from agents.analytics_agent import AnalyticsAgent
+from langgraph.config import get_stream_writer
+
+from core.config import settings
+
+# Agents are created on first use by the shared registry
+from agents.registry import get_agent
 
 # Vector memory
-from vectorstore.store import add_document
+from vectorstore.store import write_memory
 
 
 class GraphState(dict):
@@ -23,55 +18,70 @@ class GraphState(dict):
     pass
 
 
-# Initialise Agents
-planner_agent = PlannerAgent()
-reasoner = ReasonerAgent()
-research_agent = ResearchAgent()
-persona_agent = PersonaAgent()
-content_agent = ContentAgent()
-experiment_agent = ExperimentationAgent()
-analytics_agent = AnalyticsAgent()
-
-dispatcher = Dispatcher(
-    research_agent,
-    persona_agent,
-    content_agent,
-    experiment_agent,
-    analytics_agent
-)
-
-memory = MemorySaver()
-
-
-def planner_node(state: GraphState):
+async def planner_node(state: GraphState):
     """
     Transforms raw user text into a structured plan.
+    In "combined" plan mode the routing decision is produced in the same
+    LLM call, and the reason node is skipped.
     """
     user_task = state.get("task", "")
-    plan = planner_agent.plan(user_task)
+    plan_mode = state.get("plan_mode") or settings.GRAPH_PLAN_MODE
+
+    if plan_mode == "combined":
+        combined = await get_agent("plan_router").aplan_and_route(user_task)
+        state["plan"] = combined["plan"]
+        if combined["reasoning"] is not None:
+            state["reasoning"] = combined["reasoning"]
+        return state
+
+    plan = await get_agent("planner").aplan(user_task)
     state["plan"] = plan
     return state
 
 
-def reason_node(state: GraphState):
+def route_after_planner(state: GraphState) -> str:
+    """
+    Skips the reason node when the planner already decided the route.
+    """
+    return "dispatch" if state.get("reasoning") else "reason"
+
+
+async def reason_node(state: GraphState):
     """
     Takes the structured plan instead of the raw user task.
     """
     plan = state.get("plan", {})
-    reasoning = reasoner.decide(plan)
+    reasoning = await get_agent("reasoner").adecide(plan)
     state["reasoning"] = reasoning
     return state
 
 
-def dispatch_node(state: GraphState):
+async def dispatch_node(state: GraphState):
     """
     Calls the correct agent based on the plan + reasoning.
+    In streaming runs, agent tokens are forwarded to the graph's
+    custom stream as they are generated.
     """
-    result = dispatcher.run(
+    if not state.get("stream"):
+        result = await get_agent("dispatcher").arun(
+            plan=state.get("plan"),
+            reason_output=state.get("reasoning"),
+            user_payload=state
+        )
+        state["agent_output"] = result
+        return state
+
+    writer = get_stream_writer()
+    result = None
+    async for event, data in get_agent("dispatcher").astream(
         plan=state.get("plan"),
         reason_output=state.get("reasoning"),
         user_payload=state
-    )
+    ):
+        if event == "token":
+            writer({"token": data})
+        else:
+            result = data
     state["agent_output"] = result
     return state
 
@@ -83,7 +93,7 @@ def write_memory_node(state: GraphState):
         "reason": state.get("reasoning"),
         "output": state.get("agent_output")
     }
-    add_document(str(payload))
+    write_memory(str(payload))
     return state
 
 
@@ -97,11 +107,16 @@ def create_uhpm_graph():
 
     # edges
     graph.set_entry_point("planner")
-    graph.add_edge("planner", "reason")
+    graph.add_conditional_edges(
+        "planner",
+        route_after_planner,
+        {"reason": "reason", "dispatch": "dispatch"}
+    )
     graph.add_edge("reason", "dispatch")
     graph.add_edge("dispatch", "memory")
     graph.add_edge("memory", END)
 
-    # compile with memory
-    app = graph.compile(checkpointer=memory)
+    # No checkpointer: every run is one-shot and nothing reads its state
+    # back, so an in-memory saver would only keep every run's state forever
+    app = graph.compile()
     return app
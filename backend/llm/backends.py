@@ -0,0 +1,429 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Iterator
+
+from core.config import settings
+from llm.cache import cache_key
+from llm.ratelimit import estimate_tokens
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class LLMResponse:
+    """
+    Text plus token usage of one completed LLM call.
+    Token counts are None when the backend cannot report them.
+    """
+
+    def __init__(
+        self,
+        text: str | None,
+        prompt_tokens: int | None = None,
+        response_tokens: int | None = None,
+    ):
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.response_tokens = response_tokens
+
+
+class LLMBackend:
+    """
+    Interface every LLM backend implements.
+    Sync and async variants exist for both one-shot and streaming calls.
+    """
+
+    name = "base"
+
+    def generate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        """
+        response_schema asks for JSON matching the given schema where the
+        backend supports it; other backends ignore it.
+        """
+        raise NotImplementedError
+
+    async def agenerate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        raise NotImplementedError
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        raise NotImplementedError
+
+    def astream(self, prompt: str) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Live Gemini backend on google-genai, sharing one bounded keep-alive
+    connection pool between the sync and async transports.
+    """
+
+    name = "gemini"
+
+    def __init__(self, model: str):
+        import httpx
+        from google import genai
+        from google.genai import types
+
+        self.model = model
+        self._types = types
+        limits = httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+        )
+        # client.aio shares the same configuration
+        self.client = genai.Client(
+            api_key=settings.GEMINI_API_KEY,
+            http_options=types.HttpOptions(
+                timeout=settings.LLM_TIMEOUT_MS,
+                client_args={"limits": limits},
+                async_client_args={"limits": limits},
+            ),
+        )
+
+    def _to_response(self, response) -> LLMResponse:
+        logger.debug(f"Gemini Response: {response}")
+        if not response:
+            return LLMResponse(None)
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            response.text,
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            response_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+    def _config(self, response_schema: dict | None):
+        """JSON mime type + response schema, when structured output is wanted."""
+        if response_schema is None:
+            return None
+        return self._types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=response_schema,
+        )
+
+    def generate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._config(response_schema),
+        )
+        return self._to_response(response)
+
+    async def agenerate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        response = await self.client.aio.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._config(response_schema),
+        )
+        return self._to_response(response)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.client.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+        ):
+            if chunk.text:
+                yield chunk.text
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        response_stream = await self.client.aio.models.generate_content_stream(
+            model=self.model,
+            contents=prompt,
+        )
+        async for chunk in response_stream:
+            if chunk.text:
+                yield chunk.text
+
+
+class FakeBackendError(Exception):
+    """Simulated upstream failure; carries an HTTP-like status code."""
+
+    def __init__(self, code: int):
+        super().__init__(f"Simulated LLM error {code}")
+        self.code = code
+
+
+# Prompt markers identifying which agent sent a prompt, checked in order
+AGENT_MARKERS = [
+    ("plan_router", "Planner AND Core Reasoning Agent"),
+    ("planner", "You are the Planner Agent"),
+    ("reasoner_fallback", "The previous response was not valid JSON"),
+    ("reasoner", "CORE REASONING AGENT"),
+    ("research", "marketing research agent"),
+    ("persona", "MARKETING PERSONA MODELLER"),
+    ("content", "MARKETING CONTENT GENERATOR"),
+    ("experiment", "MARKETING EXPERIMENT EVAULATOR"),
+    ("analytics", "MARKETING PERFORMANCE ANALYST"),
+]
+
+_ROUTE = {
+    "task_type": "research",
+    "reasoning": "Offline fake backend.",
+    "action": "call_research_agent",
+    "inputs_needed": ["product_text"]
+}
+_PLAN = {
+    "task": "offline",
+    "needs_research": True,
+    "needs_persona": False,
+    "needs_content": False,
+    "needs_experimentation": False,
+    "needs_analytics": False,
+    "additional_context": "Offline fake backend."
+}
+
+DEFAULT_FAKE_RESPONSES = {
+    "plan_router": {"plan": _PLAN, "reasoning": _ROUTE},
+    "planner": _PLAN,
+    "reasoner": _ROUTE,
+    "reasoner_fallback": _ROUTE,
+    "research": {
+        "product_summary": "Offline summary.",
+        "usps": ["USP1", "USP2"],
+        "target_audience": ["Audience"],
+        "competitor_comparison": "Offline comparison."
+    },
+    "persona": {
+        "persona_name": "Offline Persona",
+        "age_range": "25-40",
+        "demographics": "",
+        "lifestyle": "",
+        "deep_motivations": "",
+        "pain_points": "",
+        "buying_triggers": "",
+        "objections": "",
+        "language_and_tone": "",
+        "recommended_channels": ["social_media"],
+        "summary": "Offline persona."
+    },
+    "content": (
+        "# Offline headline\n\nOffline body copy generated by the fake "
+        "backend.\n\nCTA: Buy now."
+    ),
+    "experiment": [{"variant": "A", "score": 50, "reason": "Offline."}],
+    "analytics": {
+        "summary": "Offline analysis.",
+        "persona_changes": [],
+        "content_improvements": [],
+        "channel_recommendations": [],
+        "next_steps": []
+    },
+}
+
+
+def detect_agent(prompt: str) -> str:
+    """Identifies the calling agent from its prompt wording."""
+    for agent, marker in AGENT_MARKERS:
+        if marker in prompt:
+            return agent
+    return "unknown"
+
+
+class FakeBackend(LLMBackend):
+    """
+    Offline, deterministic backend for load tests and benchmarks.
+    - latency: log-normal around `latency_ms` with spread `latency_sigma`
+    - errors: a fraction `error_rate` of calls raise 429/503
+    - responses: canned JSON per agent, overridable from a JSON file
+    Randomness comes from one RNG seeded with `seed`, so a run with the
+    same call sequence always sees the same latencies and failures.
+    """
+
+    name = "fake"
+
+    def __init__(
+        self,
+        latency_ms: float = 800,
+        latency_sigma: float = 0.5,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        responses_path: str | None = None,
+    ):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.responses = dict(DEFAULT_FAKE_RESPONSES)
+        if responses_path:
+            with open(responses_path, encoding="utf-8") as f:
+                self.responses.update(json.load(f))
+
+    def _outcome(self, prompt: str) -> tuple[float, str]:
+        """Returns (latency in seconds, response text) or raises."""
+        with self._lock:
+            latency = self._rng.lognormvariate(0, self.latency_sigma) * self.latency_ms
+            failed = self._rng.random() < self.error_rate
+            code = self._rng.choice([429, 503])
+        if failed:
+            raise FakeBackendError(code)
+        canned = self.responses.get(detect_agent(prompt), {})
+        text = canned if isinstance(canned, str) else json.dumps(canned)
+        return latency / 1000, text
+
+    def _chunks(self, text: str, size: int = 16) -> list[str]:
+        return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+    def _to_response(self, prompt: str, text: str) -> LLMResponse:
+        return LLMResponse(text, estimate_tokens(prompt), estimate_tokens(text))
+
+    def generate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        latency, text = self._outcome(prompt)
+        time.sleep(latency)
+        return self._to_response(prompt, text)
+
+    async def agenerate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        latency, text = self._outcome(prompt)
+        await asyncio.sleep(latency)
+        return self._to_response(prompt, text)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        latency, text = self._outcome(prompt)
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            time.sleep(latency / len(chunks))
+            yield chunk
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        latency, text = self._outcome(prompt)
+        chunks = self._chunks(text)
+        for chunk in chunks:
+            await asyncio.sleep(latency / len(chunks))
+            yield chunk
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a prompt was never recorded."""
+
+
+class RecordReplayBackend(LLMBackend):
+    """
+    Records real prompt/response pairs to a JSONL cassette, or replays
+    them without touching the network.
+    - mode="record": delegates to `inner` and appends every response
+    - mode="replay": answers from the cassette only
+    Entries are keyed like the prompt cache (model + normalized prompt).
+    """
+
+    def __init__(self, cassette_path: str, mode: str, model: str, inner: LLMBackend | None = None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if mode == "record" and inner is None:
+            raise ValueError("Record mode needs a backend to record from")
+        self.name = mode
+        self.cassette_path = cassette_path
+        self.mode = mode
+        self.model = model
+        self.inner = inner
+        self._lock = threading.Lock()
+        self._entries: dict[str, dict] = {}
+
+        if os.path.exists(cassette_path):
+            with open(cassette_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["key"]] = entry
+        logger.info(
+            f"Cassette {cassette_path} loaded with {len(self._entries)} entries."
+        )
+
+    def _replay(self, prompt: str) -> LLMResponse:
+        key = cache_key(self.model, prompt)
+        entry = self._entries.get(key)
+        if entry is None:
+            raise CassetteMissError(f"No recorded response for prompt {key[:12]}")
+        return LLMResponse(
+            entry["response"],
+            entry.get("prompt_tokens"),
+            entry.get("response_tokens"),
+        )
+
+    def _record(self, prompt: str, response: LLMResponse):
+        if response.text is None:
+            return
+        key = cache_key(self.model, prompt)
+        entry = {
+            "key": key,
+            "model": self.model,
+            "prompt": prompt,
+            "response": response.text,
+            "prompt_tokens": response.prompt_tokens,
+            "response_tokens": response.response_tokens,
+        }
+        with self._lock:
+            self._entries[key] = entry
+            directory = os.path.dirname(self.cassette_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.cassette_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def generate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        if self.mode == "replay":
+            return self._replay(prompt)
+        response = self.inner.generate(prompt, response_schema)
+        self._record(prompt, response)
+        return response
+
+    async def agenerate(self, prompt: str, response_schema: dict | None = None) -> LLMResponse:
+        if self.mode == "replay":
+            return self._replay(prompt)
+        response = await self.inner.agenerate(prompt, response_schema)
+        self._record(prompt, response)
+        return response
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        if self.mode == "replay":
+            yield self._replay(prompt).text
+            return
+        parts = []
+        for chunk in self.inner.stream(prompt):
+            parts.append(chunk)
+            yield chunk
+        self._record(prompt, LLMResponse("".join(parts)))
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        if self.mode == "replay":
+            yield self._replay(prompt).text
+            return
+        parts = []
+        async for chunk in self.inner.astream(prompt):
+            parts.append(chunk)
+            yield chunk
+        self._record(prompt, LLMResponse("".join(parts)))
+
+
+def create_backend() -> LLMBackend:
+    """
+    Builds the backend selected by settings.LLM_BACKEND:
+    gemini | fake | record | replay
+    """
+    kind = settings.LLM_BACKEND
+    model = settings.GEMINI_MODEL
+    logger.info(f"Using LLM backend: {kind}")
+
+    if kind == "gemini":
+        return GeminiBackend(model)
+    if kind == "fake":
+        return FakeBackend(
+            latency_ms=settings.LLM_FAKE_LATENCY_MS,
+            latency_sigma=settings.LLM_FAKE_LATENCY_SIGMA,
+            error_rate=settings.LLM_FAKE_ERROR_RATE,
+            seed=settings.LLM_FAKE_SEED,
+            responses_path=settings.LLM_FAKE_RESPONSES_PATH or None,
+        )
+    if kind == "record":
+        return RecordReplayBackend(
+            settings.LLM_CASSETTE_PATH, "record", model, GeminiBackend(model)
+        )
+    if kind == "replay":
+        return RecordReplayBackend(settings.LLM_CASSETTE_PATH, "replay", model)
+    raise ValueError(f"Unknown LLM backend: {kind}")
@@ -0,0 +1,214 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Collapses whitespace so prompts that only differ in indentation
+    (the agents build theirs from indented f-strings) share one entry.
+    """
+    return " ".join(prompt.split())
+
+
+def cache_key(model: str, prompt: str) -> str:
+    """
+    Content address of a prompt: sha256 of model name + normalized prompt.
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(normalize_prompt(prompt).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PromptCache:
+    """
+    Two-tier prompt/response cache:
+    - in-memory LRU for hot prompts
+    - SQLite table on disk, shared across restarts
+    Both tiers honour the same TTL. The disk tier is capped at
+    max_disk_items, evicting the least recently used rows.
+
+    The disk tier is best effort: it is shared by every worker (WAL mode,
+    busy timeout), and a read that still fails counts as a miss while a
+    failed write is skipped, so a locked database never fails an LLM call.
+    """
+
+    def __init__(
+        self,
+        path: str | None,
+        ttl_seconds: int = 86400,
+        max_memory_items: int = 1024,
+        max_disk_items: int = 100000,
+        busy_timeout: float = 5.0,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if path:
+            try:
+                self._db = self._open(path, busy_timeout)
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"Prompt cache disk tier disabled ({path}): {e}")
+
+    @staticmethod
+    def _open(path: str, busy_timeout: float) -> sqlite3.Connection:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        # readers do not block the (single) writer across workers
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS llm_cache_accessed "
+            "ON llm_cache (accessed_at)"
+        )
+        db.commit()
+        return db
+
+    def _expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and now - created_at > self.ttl_seconds
+
+    def _remember(self, key: str, created_at: float, response: str):
+        """Inserts into the LRU tier. Caller holds the lock."""
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> str | None:
+        """
+        Returns the cached response for key, or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created_at, response = entry
+                if not self._expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return response
+                del self._memory[key]
+
+            if self._db is not None:
+                try:
+                    response = self._disk_get(key, now)
+                except sqlite3.Error as e:
+                    self._db.rollback()
+                    logger.warning(f"Prompt cache read failed, treating as a miss: {e}")
+                    response = None
+                if response is not None:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return response
+
+            self.misses += 1
+            return None
+
+    def _disk_get(self, key: str, now: float) -> str | None:
+        """Disk tier lookup. Caller holds the lock."""
+        row = self._db.execute(
+            "SELECT response, created_at FROM llm_cache WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        response, created_at = row
+        if not self._expired(created_at, now):
+            self._remember(key, created_at, response)
+            try:
+                self._db.execute(
+                    "UPDATE llm_cache SET accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                # only the eviction order is lost, still a hit
+                self._db.rollback()
+            return response
+        self._db.execute(
+            "DELETE FROM llm_cache WHERE key = ?", (key,)
+        )
+        self._db.commit()
+        return None
+
+    def set(self, key: str, response: str):
+        """
+        Stores a response in both tiers.
+        """
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, response)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache "
+                    "(key, response, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                self._evict_disk()
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning(f"Prompt cache write skipped: {e}")
+
+    def _evict_disk(self):
+        """Trims the disk tier to max_disk_items. Caller holds the lock."""
+        (count,) = self._db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        overflow = count - self.max_disk_items
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                "SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+            }
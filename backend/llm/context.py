@@ -0,0 +1,126 @@
+import ast
+import json
+import logging
+import re
+from typing import Any
+
+from llm.ratelimit import estimate_tokens
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+_COMPACT = (",", ":")
+
+
+def _compact_item(text: str, max_tokens: int) -> tuple[Any, str]:
+    """
+    Returns (value to embed, its text form for dedup).
+    JSON or Python-literal dumps (stored graph states are `str(payload)`)
+    are embedded as structured values when they fit, avoiding escaped
+    quotes; anything else becomes whitespace-collapsed, trimmed text.
+    """
+    stripped = text.strip()
+    if stripped[:1] in ("{", "["):
+        for parse in (json.loads, ast.literal_eval):
+            try:
+                value = parse(stripped)
+            except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                continue
+            compact = json.dumps(value, separators=_COMPACT, ensure_ascii=False, default=str)
+            if estimate_tokens(compact) <= max_tokens:
+                return value, compact
+            stripped = compact
+            break
+    trimmed = _truncate(" ".join(stripped.split()), max_tokens)
+    return trimmed, trimmed
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Cuts text to roughly max_tokens, on a word boundary where possible."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * 4
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut + "…"
+
+
+def _shingles(text: str) -> set:
+    words = _WORD.findall(text.lower())
+    if len(words) < 3:
+        return set(words)
+    return {" ".join(words[i:i + 3]) for i in range(len(words) - 2)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def build_context(
+    retrieved: Any,
+    budget_tokens: int,
+    item_tokens: int = 200,
+    dedup_threshold: float = 0.8,
+) -> str:
+    """
+    Assembles retrieved memory into a compact, token-budgeted prompt block.
+
+    - items are taken in retrieval order (closest first)
+    - each item is compacted and trimmed to `item_tokens`
+    - near-duplicates (word-shingle Jaccard >= dedup_threshold) are dropped
+    - items are added until `budget_tokens` would be exceeded
+
+    Args:
+    - retrieved: RetrieverAgent.search_docs() output (list of dicts) or
+      any JSON-serialisable value
+    - budget_tokens: total token budget for the block (0 = no memory)
+
+    Returns:
+    - compact JSON string
+    """
+    if not retrieved or budget_tokens <= 0:
+        return "[]"
+    if not isinstance(retrieved, list):
+        return _truncate(
+            json.dumps(retrieved, separators=_COMPACT, ensure_ascii=False, default=str),
+            budget_tokens,
+        )
+
+    selected = []
+    seen = []
+    used = 2  # surrounding brackets
+    for item in retrieved:
+        if isinstance(item, dict):
+            text = str(item.get("text", ""))
+            meta = item.get("metadata") or {}
+            memory_type = meta.get("type") if isinstance(meta, dict) else None
+        else:
+            text, memory_type = str(item), None
+
+        value, flat = _compact_item(text, item_tokens)
+        shingles = _shingles(flat)
+        if any(_jaccard(shingles, other) >= dedup_threshold for other in seen):
+            continue
+
+        entry = {"type": memory_type, "memory": value} if memory_type else {"memory": value}
+        cost = estimate_tokens(
+            json.dumps(entry, separators=_COMPACT, ensure_ascii=False, default=str)
+        )
+        if used + cost > budget_tokens:
+            break
+        selected.append(entry)
+        seen.append(shingles)
+        used += cost
+
+    if len(selected) < len(retrieved):
+        logger.info(
+            f"Context builder kept {len(selected)}/{len(retrieved)} memory items "
+            f"(~{used} tokens)."
+        )
+    return json.dumps(selected, separators=_COMPACT, ensure_ascii=False, default=str)
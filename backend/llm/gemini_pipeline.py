@@ -1,23 +1,311 @@
-import os
+import asyncio
 import logging
-
-from google import genai
+import time
+from typing import AsyncIterator, Iterator
 
 from core.config import settings
+from llm.backends import LLMResponse, create_backend
+from llm.cache import PromptCache, cache_key
+from llm.hedging import Hedger
+from llm.metrics import LLMMetrics
+from llm.ratelimit import RateGovernor, estimate_tokens
+from llm.singleflight import SingleFlight
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# LLM backend selected by settings.LLM_BACKEND (live Gemini by default)
+backend = create_backend()
+
+# Fake responses must never be served to (or from) real traffic
+_cache_model = (
+    f"fake/{settings.GEMINI_MODEL}" if backend.name == "fake"
+    else settings.GEMINI_MODEL
+)
+
+# Prompt/response cache shared by invoke() and ainvoke()
+prompt_cache = PromptCache(
+    path=settings.LLM_CACHE_PATH,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    max_memory_items=settings.LLM_CACHE_MAX_MEMORY_ITEMS,
+    max_disk_items=settings.LLM_CACHE_MAX_DISK_ITEMS,
+    busy_timeout=settings.LLM_CACHE_BUSY_TIMEOUT,
+) if settings.LLM_CACHE_ENABLED else None
+
+# Identical prompts already in flight are awaited, not re-sent
+inflight = SingleFlight()
+
+# Rate limits, concurrency cap and retry policy for upstream calls
+governor = RateGovernor(
+    requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+    tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+)
+
+# Hedged requests for the agents listed in LLM_HEDGE_AGENTS
+hedger = Hedger(
+    agents={a.strip() for a in settings.LLM_HEDGE_AGENTS.split(",") if a.strip()},
+    pct=settings.LLM_HEDGE_PERCENTILE,
+    max_rate=settings.LLM_HEDGE_MAX_RATE,
+    min_samples=settings.LLM_HEDGE_MIN_SAMPLES,
+    max_workers=settings.LLM_MAX_CONCURRENCY * 2,
+)
+
+# Per-agent latency, token and cost metrics
+llm_metrics = LLMMetrics(
+    window=settings.LLM_METRICS_WINDOW,
+    input_price_per_mtok=settings.LLM_PRICE_INPUT_PER_MTOK,
+    output_price_per_mtok=settings.LLM_PRICE_OUTPUT_PER_MTOK,
+)
+
+
+def _cached(
+    prompt: str, use_cache: bool, json_mode: bool = False
+) -> tuple[str, str | None]:
+    """
+    Returns (prompt key, cached response). The cached response is None
+    when caching is disabled globally or bypassed for this call.
+    JSON-mode calls get their own key space.
+    """
+    model = f"{_cache_model}|json" if json_mode else _cache_model
+    key = cache_key(model, prompt)
+    if prompt_cache is None or not use_cache:
+        return key, None
+    try:
+        return key, prompt_cache.get(key)
+    except Exception as e:
+        logger.warning(f"Prompt cache lookup failed, calling the model: {e}")
+        return key, None
+
+
+def _store(text: str | None, key: str, use_cache: bool):
+    """Caches a response; never fails the (already paid for) call."""
+    if prompt_cache is not None and use_cache and text:
+        try:
+            prompt_cache.set(key, text)
+        except Exception as e:
+            logger.warning(f"Prompt cache write skipped: {e}")
+
+
+def _generate(prompt: str, schema: dict | None, agent: str, info: dict) -> LLMResponse:
+    """One governed backend call, hedged if enabled for the agent."""
+    tokens = estimate_tokens(prompt)
+
+    def attempt(attempt_info: dict):
+        return governor.call(lambda: backend.generate(prompt, schema), tokens, attempt_info)
+
+    if hedger.enabled(agent):
+        # each attempt reports into its own dict, the winner's lands in info
+        return hedger.call(agent, attempt, info)
+    return attempt(info)
+
+
+async def _agenerate(prompt: str, schema: dict | None, agent: str, info: dict) -> LLMResponse:
+    tokens = estimate_tokens(prompt)
+
+    def attempt(attempt_info: dict):
+        return governor.acall(lambda: backend.agenerate(prompt, schema), tokens, attempt_info)
+
+    if hedger.enabled(agent):
+        return await hedger.acall(agent, attempt, info)
+    return await attempt(info)
 
-# Initialise Gemini client
-client = genai.Client(api_key=settings.GEMINI_API_KEY)
 
+def _cache_status(use_cache: bool) -> str:
+    return "miss" if prompt_cache is not None and use_cache else "bypass"
 
-def invoke(prompt: str) -> str | None:
-    response = client.models.generate_content(
-        model="gemini-3-pro-preview",
-        contents=prompt,
 
+def _record(
+    agent: str,
+    started: float,
+    info: dict,
+    cache_status: str,
+    response: LLMResponse | None = None,
+    prompt: str = "",
+    error: bool = False,
+):
+    """
+    Records one call into the metrics registry. Only the caller that
+    actually reached the backend (info populated by the governor) is
+    charged tokens; coalesced followers and cache hits record latency.
+    """
+    prompt_tokens = response_tokens = 0
+    if info.get("attempts") and response is not None:
+        prompt_tokens = response.prompt_tokens or estimate_tokens(prompt)
+        response_tokens = response.response_tokens or (
+            estimate_tokens(response.text) if response.text else 0
+        )
+    elif cache_status != "hit" and not error:
+        cache_status = "coalesced"
+
+    llm_metrics.record(
+        agent=agent,
+        wall_ms=(time.perf_counter() - started) * 1000,
+        queue_ms=info.get("queue_ms", 0.0),
+        prompt_tokens=prompt_tokens,
+        response_tokens=response_tokens,
+        retries=info.get("retries", 0),
+        cache_status=cache_status,
+        error=error,
     )
 
-    logging.info(f"Gemini Response: {response}")
-    return response.text if response else None
+
+def invoke(
+    prompt: str,
+    use_cache: bool = True,
+    agent: str = "unknown",
+    response_schema: dict | None = None,
+) -> str | None:
+    """
+    Blocking Gemini call. Use from sync code paths only.
+
+    Args:
+    - prompt
+    - use_cache: False bypasses the prompt cache for this call
+    - agent: calling agent, used to tag latency/token metrics
+    - response_schema: request JSON output matching this schema
+      (honoured when settings.LLM_JSON_MODE is on)
+    """
+    started = time.perf_counter()
+    info: dict = {}
+    status = _cache_status(use_cache)
+    schema = response_schema if settings.LLM_JSON_MODE else None
+    try:
+        key, cached = _cached(prompt, use_cache, schema is not None)
+        if cached is not None:
+            _record(agent, started, info, "hit")
+            return cached
+
+        response = inflight.do(
+            key, lambda: _generate(prompt, schema, agent, info)
+        )
+    except Exception:
+        _record(agent, started, info, status, error=True)
+        raise
+
+    _record(agent, started, info, status, response, prompt)
+    _store(response.text, key, use_cache)
+    return response.text
+
+
+async def ainvoke(
+    prompt: str,
+    use_cache: bool = True,
+    agent: str = "unknown",
+    response_schema: dict | None = None,
+) -> str | None:
+    """
+    Non-blocking Gemini call for async endpoints and graph nodes.
+    Runs on the backend's async surface, so the event loop keeps serving
+    other requests while this one waits on the model.
+    """
+    started = time.perf_counter()
+    info: dict = {}
+    status = _cache_status(use_cache)
+    schema = response_schema if settings.LLM_JSON_MODE else None
+    try:
+        # the disk tier is SQLite: keep its reads / writes off the event loop
+        key, cached = await asyncio.to_thread(_cached, prompt, use_cache, schema is not None)
+        if cached is not None:
+            _record(agent, started, info, "hit")
+            return cached
+
+        response = await inflight.ado(
+            key, lambda: _agenerate(prompt, schema, agent, info)
+        )
+    except Exception:
+        _record(agent, started, info, status, error=True)
+        raise
+
+    _record(agent, started, info, status, response, prompt)
+    await asyncio.to_thread(_store, response.text, key, use_cache)
+    return response.text
+
+
+def stream(prompt: str, use_cache: bool = True, agent: str = "unknown") -> Iterator[str]:
+    """
+    Blocking streaming call: yields text chunks as Gemini produces them.
+    The full text is cached once the stream completes; a cache hit is
+    yielded as a single chunk.
+    """
+    started = time.perf_counter()
+    key, cached = _cached(prompt, use_cache)
+    if cached is not None:
+        _record(agent, started, {}, "hit")
+        yield cached
+        return
+
+    # Streams are rate limited and hold a concurrency slot while open,
+    # but are not retried: tokens may already have reached the client.
+    info = {"attempts": 1}
+    wait = governor.permit_wait(estimate_tokens(prompt))
+    if wait > 0:
+        time.sleep(wait)
+    parts = []
+    governor.acquire_slot()
+    info["queue_ms"] = (time.perf_counter() - started) * 1000
+    try:
+        for chunk in backend.stream(prompt):
+            parts.append(chunk)
+            yield chunk
+    except Exception:
+        _record(agent, started, info, _cache_status(use_cache), error=True)
+        raise
+    finally:
+        governor.release_slot()
+
+    text = "".join(parts)
+    _record(agent, started, info, _cache_status(use_cache), LLMResponse(text), prompt)
+    _store(text, key, use_cache)
+
+
+async def astream(prompt: str, use_cache: bool = True, agent: str = "unknown") -> AsyncIterator[str]:
+    """
+    Async streaming call for SSE endpoints: yields text chunks as soon
+    as Gemini produces them, so time-to-first-byte is one chunk instead
+    of the whole generation.
+    """
+    started = time.perf_counter()
+    key, cached = await asyncio.to_thread(_cached, prompt, use_cache)
+    if cached is not None:
+        _record(agent, started, {}, "hit")
+        yield cached
+        return
+
+    info = {"attempts": 1}
+    wait = governor.permit_wait(estimate_tokens(prompt))
+    if wait > 0:
+        await asyncio.sleep(wait)
+    parts = []
+    await governor.aacquire_slot()
+    info["queue_ms"] = (time.perf_counter() - started) * 1000
+    try:
+        async for chunk in backend.astream(prompt):
+            parts.append(chunk)
+            yield chunk
+    except Exception:
+        _record(agent, started, info, _cache_status(use_cache), error=True)
+        raise
+    finally:
+        governor.release_slot()
+
+    text = "".join(parts)
+    _record(agent, started, info, _cache_status(use_cache), LLMResponse(text), prompt)
+    await asyncio.to_thread(_store, text, key, use_cache)
+
+
+def metrics_snapshot() -> dict:
+    """
+    Per-agent LLM metrics plus cache, coalescing and rate-limit counters.
+    """
+    snapshot = llm_metrics.snapshot()
+    snapshot["cache"] = prompt_cache.stats() if prompt_cache is not None else None
+    snapshot["singleflight"] = inflight.stats()
+    snapshot["rate_limit"] = governor.stats()
+    snapshot["hedging"] = hedger.stats()
+    snapshot["backend"] = backend.name
+    return snapshot
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Awaitable, Callable
+
+from llm.metrics import percentile
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class Hedger:
+    """
+    Hedged requests for tail latency.
+
+    If a call has not returned after the agent's recent latency
+    percentile, an identical second request is launched and whichever
+    finishes first wins; the async loser is cancelled. Hedging is
+    limited to the configured agents, waits for `min_samples` latencies
+    before it kicks in, and never hedges more than `max_rate` of calls.
+
+    Each attempt gets its own info dict (filled by RateGovernor with
+    queue_ms / retries / attempts); only the winner's is copied into the
+    caller's, so the call's metrics describe the request that answered.
+    """
+
+    def __init__(
+        self,
+        agents: set[str],
+        pct: float = 95,
+        max_rate: float = 0.1,
+        min_samples: int = 20,
+        window: int = 512,
+        max_workers: int = 32,
+    ):
+        self.agents = agents
+        self.pct = pct
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+
+        self.calls = defaultdict(int)
+        self.hedged = defaultdict(int)
+        self.hedge_wins = defaultdict(int)
+
+    def enabled(self, agent: str) -> bool:
+        return agent in self.agents
+
+    def _delay(self, agent: str) -> float | None:
+        """
+        Seconds to wait before hedging this call, or None when it must not
+        be hedged (too few samples, or the hedge-rate cap is reached).
+        """
+        with self._lock:
+            self.calls[agent] += 1
+            samples = list(self._latencies[agent])
+            if len(samples) < self.min_samples:
+                return None
+            if self.hedged[agent] >= self.max_rate * self.calls[agent]:
+                return None
+        return percentile(samples, self.pct)
+
+    def _observe(self, agent: str, started: float, hedge_won: bool):
+        with self._lock:
+            self._latencies[agent].append(time.perf_counter() - started)
+            if hedge_won:
+                self.hedge_wins[agent] += 1
+
+    def _mark_hedged(self, agent: str):
+        with self._lock:
+            self.hedged[agent] += 1
+
+    def call(self, agent: str, fn: Callable[[dict], Any], info: dict | None = None) -> Any:
+        """
+        Blocking hedged call. `fn(attempt_info)` runs one attempt.
+
+        Threads cannot be cancelled, so a losing request runs to
+        completion in the background and is discarded: until then it
+        keeps its RateGovernor concurrency slot (and its retries), and its
+        tokens are billed but not recorded. max_rate bounds how many such
+        stragglers can exist, roughly max_rate of the agent's calls.
+        """
+        info = {} if info is None else info
+        started = time.perf_counter()
+        delay = self._delay(agent)
+        if delay is None:
+            result = fn(info)
+            self._observe(agent, started, False)
+            return result
+
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers,
+                        thread_name_prefix="llm-hedge",
+                    )
+
+        attempts = {}
+        primary = self._executor.submit(fn, attempts.setdefault("primary", {}))
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            info.update(attempts["primary"])
+            result = primary.result()
+            self._observe(agent, started, False)
+            return result
+
+        self._mark_hedged(agent)
+        hedge = self._executor.submit(fn, attempts.setdefault("hedge", {}))
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                info.update(attempts["hedge" if future is hedge else "primary"])
+                if future.exception() is None:
+                    self._observe(agent, started, future is hedge)
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def acall(
+        self, agent: str, fn: Callable[[dict], Awaitable[Any]], info: dict | None = None
+    ) -> Any:
+        """
+        Async hedged call; the losing request is cancelled (releasing its
+        concurrency slot).
+        """
+        info = {} if info is None else info
+        started = time.perf_counter()
+        delay = self._delay(agent)
+        if delay is None:
+            result = await fn(info)
+            self._observe(agent, started, False)
+            return result
+
+        attempts = {}
+        primary = asyncio.ensure_future(fn(attempts.setdefault("primary", {})))
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                info.update(attempts["primary"])
+                result = primary.result()
+                self._observe(agent, started, False)
+                return result
+
+            self._mark_hedged(agent)
+            logger.info(f"Hedging slow LLM call for agent={agent} after {delay:.2f}s")
+            hedge = asyncio.ensure_future(fn(attempts.setdefault("hedge", {})))
+            pending = {primary, hedge}
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    info.update(attempts["hedge" if task is hedge else "primary"])
+                    if task.exception() is None:
+                        self._observe(agent, started, task is hedge)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                agent: {
+                    "calls": self.calls[agent],
+                    "hedged": self.hedged[agent],
+                    "hedge_wins": self.hedge_wins[agent],
+                    "threshold_s": round(percentile(list(self._latencies[agent]), self.pct), 3),
+                }
+                for agent in self.calls
+            }
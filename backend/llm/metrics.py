@@ -0,0 +1,140 @@
+import logging
+import threading
+from collections import defaultdict, deque
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list (0.0 when empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def _latency_summary(values: list[float]) -> dict:
+    return {
+        f"p{pct}": round(percentile(values, pct), 1) for pct in (50, 95, 99)
+    }
+
+
+class _AgentStats:
+    """Running totals plus a bounded window of recent latencies."""
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.cost_usd = 0.0
+        self.cache = defaultdict(int)
+        self.wall_ms = deque(maxlen=window)
+        self.queue_ms = deque(maxlen=window)
+
+
+class LLMMetrics:
+    """
+    In-process registry of per-call LLM measurements, aggregated per
+    calling agent into latency percentiles and token/cost totals.
+    Percentiles are computed over the last `window` calls per agent.
+    """
+
+    def __init__(
+        self,
+        window: int = 2048,
+        input_price_per_mtok: float = 0.0,
+        output_price_per_mtok: float = 0.0,
+    ):
+        self.window = window
+        self.input_price_per_mtok = input_price_per_mtok
+        self.output_price_per_mtok = output_price_per_mtok
+        self._lock = threading.Lock()
+        self._agents: dict[str, _AgentStats] = {}
+
+    def record(
+        self,
+        agent: str,
+        wall_ms: float,
+        queue_ms: float = 0.0,
+        prompt_tokens: int = 0,
+        response_tokens: int = 0,
+        retries: int = 0,
+        cache_status: str = "miss",
+        error: bool = False,
+    ):
+        """
+        Records one LLM call.
+
+        Args:
+        - agent: calling agent name
+        - wall_ms: total time spent in invoke()
+        - queue_ms: time spent waiting on rate limits / concurrency slots
+        - prompt_tokens, response_tokens: from usage metadata (0 on cache hits)
+        - retries: retried upstream attempts
+        - cache_status: hit | miss | bypass | coalesced
+        - error: the call raised
+        """
+        cost = (
+            prompt_tokens * self.input_price_per_mtok
+            + response_tokens * self.output_price_per_mtok
+        ) / 1_000_000
+        with self._lock:
+            stats = self._agents.get(agent)
+            if stats is None:
+                stats = self._agents[agent] = _AgentStats(self.window)
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.retries += retries
+            stats.prompt_tokens += prompt_tokens
+            stats.response_tokens += response_tokens
+            stats.cost_usd += cost
+            stats.cache[cache_status] += 1
+            stats.wall_ms.append(wall_ms)
+            stats.queue_ms.append(queue_ms)
+
+        logger.info(
+            f"LLM call agent={agent} wall={wall_ms:.0f}ms queue={queue_ms:.0f}ms "
+            f"tokens={prompt_tokens}/{response_tokens} retries={retries} "
+            f"cache={cache_status}{' error' if error else ''}"
+        )
+
+    def snapshot(self) -> dict:
+        """
+        Per-agent aggregates plus a grand total, as plain dicts.
+        """
+        with self._lock:
+            agents = {}
+            total = {
+                "calls": 0, "errors": 0, "prompt_tokens": 0,
+                "response_tokens": 0, "cost_usd": 0.0,
+            }
+            for name, stats in self._agents.items():
+                wall = list(stats.wall_ms)
+                queue = list(stats.queue_ms)
+                agents[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "retries": stats.retries,
+                    "cache": dict(stats.cache),
+                    "wall_ms": _latency_summary(wall),
+                    "queue_ms": _latency_summary(queue),
+                    "prompt_tokens": stats.prompt_tokens,
+                    "response_tokens": stats.response_tokens,
+                    "cost_usd": round(stats.cost_usd, 6),
+                }
+                total["calls"] += stats.calls
+                total["errors"] += stats.errors
+                total["prompt_tokens"] += stats.prompt_tokens
+                total["response_tokens"] += stats.response_tokens
+                total["cost_usd"] += stats.cost_usd
+            total["cost_usd"] = round(total["cost_usd"], 6)
+            return {"agents": agents, "total": total}
+
+    def reset(self):
+        with self._lock:
+            self._agents.clear()
@@ -0,0 +1,289 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `per_minute`.
+    A rate of 0 disables the bucket.
+    """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = per_minute
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float, rate_factor: float) -> float:
+        """
+        Takes `amount` from the bucket (going into debt if necessary) and
+        returns how long the caller must wait before its share is covered.
+        """
+        if self.per_minute <= 0:
+            return 0.0
+        with self._lock:
+            rate = self.per_minute * rate_factor / 60.0
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * rate
+            )
+            self._updated = now
+            # a single request larger than the bucket may still pass once full
+            amount = min(amount, self.capacity)
+            self._tokens -= amount
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / rate
+
+
+def _status_code(e: Exception) -> int | None:
+    code = getattr(e, "code", None) or getattr(e, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def _retry_after(e: Exception) -> float | None:
+    """Reads a Retry-After header (seconds) off an API error, if present."""
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) used for budgeting."""
+    return max(1, len(text) // 4)
+
+
+class RateGovernor:
+    """
+    Client-side limiter in front of Gemini:
+    - token buckets for requests/min and tokens/min
+    - a cap on concurrent in-flight calls
+    - jittered exponential backoff on 429/5xx, honouring Retry-After
+
+    The effective rate adapts: every throttled call halves it, every
+    successful call recovers it a little, so throughput degrades
+    smoothly instead of hammering the upstream quota.
+    """
+
+    MIN_RATE_FACTOR = 0.1
+
+    def __init__(
+        self,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        max_concurrency: int,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+    ):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # One slot budget for sync and async callers: threads wait on the
+        # condition, coroutines on a future resolved by release_slot()
+        self._in_flight = 0
+        self._slot_lock = threading.Lock()
+        self._slot_free = threading.Condition(self._slot_lock)
+        self._async_waiters = deque()
+        self._lock = threading.Lock()
+        self.rate_factor = 1.0
+        self.throttled = 0
+        self.retries = 0
+
+    # Adaptive rate
+
+    def _on_success(self):
+        with self._lock:
+            self.rate_factor = min(1.0, self.rate_factor + 0.05)
+
+    def _on_throttle(self):
+        with self._lock:
+            self.throttled += 1
+            self.rate_factor = max(self.MIN_RATE_FACTOR, self.rate_factor / 2)
+            logger.warning(
+                f"Gemini throttled, rate factor now {self.rate_factor:.2f}"
+            )
+
+    def permit_wait(self, tokens: int) -> float:
+        """Reserves one request + `tokens`, returning the wait in seconds."""
+        factor = self.rate_factor
+        return max(
+            self.requests.reserve(1, factor),
+            self.tokens.reserve(tokens, factor),
+        )
+
+    def _backoff(self, attempt: int, e: Exception) -> float | None:
+        """
+        Returns the delay before the next attempt, or None if the error
+        is not retryable or retries are exhausted.
+        """
+        status = _status_code(e)
+        if status not in RETRYABLE_STATUS or attempt >= self.max_retries:
+            return None
+        if status == 429:
+            self._on_throttle()
+        with self._lock:
+            self.retries += 1
+        delay = random.uniform(
+            0, min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        )
+        retry_after = _retry_after(e)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        logger.warning(
+            f"Gemini call failed with {status}, retrying in {delay:.2f}s"
+        )
+        return delay
+
+    # Concurrency slots
+
+    def acquire_slot(self):
+        with self._slot_free:
+            while self._in_flight >= self.max_concurrency:
+                self._slot_free.wait()
+            self._in_flight += 1
+
+    async def aacquire_slot(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._slot_lock:
+                if self._in_flight < self.max_concurrency:
+                    self._in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                with self._slot_lock:
+                    try:
+                        self._async_waiters.remove((loop, waiter))
+                    except ValueError:
+                        # already woken for a slot we will not take: pass it on
+                        self._wake_one()
+                raise
+
+    def release_slot(self):
+        with self._slot_lock:
+            self._in_flight -= 1
+            self._wake_one()
+
+    def _wake_one(self):
+        """
+        Wakes one waiting thread and one waiting coroutine; whichever
+        takes the slot first wins, the other waits again. Caller holds
+        the slot lock.
+        """
+        self._slot_free.notify()
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+                return
+            except RuntimeError:
+                # the waiter's loop is closed
+                continue
+
+    # Governed calls
+
+    def call(
+        self, fn: Callable[[], Any], tokens: int = 1, info: dict | None = None
+    ) -> Any:
+        """
+        Runs fn() under the rate limits, retrying retryable failures.
+        If `info` is given it receives queue_ms (time spent waiting for
+        permits and slots), retries and attempts.
+        """
+        info = {} if info is None else info
+        info.update(queue_ms=0.0, retries=0, attempts=0)
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            wait = self.permit_wait(tokens)
+            if wait > 0:
+                time.sleep(wait)
+            self.acquire_slot()
+            info["queue_ms"] += (time.perf_counter() - queued) * 1000
+            info["attempts"] = attempt + 1
+            info["retries"] = attempt
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self._on_success()
+                return result
+            finally:
+                self.release_slot()
+            time.sleep(delay)
+            attempt += 1
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        tokens: int = 1,
+        info: dict | None = None,
+    ) -> Any:
+        """
+        Async variant of call(); waits without blocking the event loop.
+        """
+        info = {} if info is None else info
+        info.update(queue_ms=0.0, retries=0, attempts=0)
+        attempt = 0
+        while True:
+            queued = time.perf_counter()
+            wait = self.permit_wait(tokens)
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self.aacquire_slot()
+            info["queue_ms"] += (time.perf_counter() - queued) * 1000
+            info["attempts"] = attempt + 1
+            info["retries"] = attempt
+            try:
+                result = await fn()
+            except Exception as e:
+                delay = self._backoff(attempt, e)
+                if delay is None:
+                    raise
+            else:
+                self._on_success()
+                return result
+            finally:
+                self.release_slot()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate_factor": self.rate_factor,
+                "throttled": self.throttled,
+                "retries": self.retries,
+            }
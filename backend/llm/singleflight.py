@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import CancelledError, Future
+from typing import Any, Awaitable, Callable
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight calls.
+
+    The first caller for a key (the leader) runs the call; every caller
+    arriving with the same key while it is still running waits for the
+    leader's result instead of issuing its own. The in-flight table holds
+    thread-safe futures, so threads and asyncio tasks (on any loop) can
+    share one upstream call.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        """Returns (future, is_leader) for key."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.leaders += 1
+            return future, True
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """
+        Runs fn() once per key for all concurrent blocking callers.
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            logger.info("Joining identical in-flight LLM call.")
+            try:
+                return future.result()
+            except CancelledError:
+                # the (async) leader was cancelled, not us: retry
+                logger.info("In-flight LLM call was cancelled, retrying.")
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Awaits fn() once per key for all concurrent async callers.
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            logger.info("Joining identical in-flight LLM call.")
+            try:
+                # shield: a cancelled follower must not cancel the shared call
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    # this follower itself was cancelled
+                    raise
+                # the leader was cancelled (client gone, deadline), not this
+                # request: retry, becoming the leader if nobody else has
+                logger.info("In-flight LLM call was cancelled, retrying.")
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # followers see the cancelled future and retry on their own
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._finish(key, future)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
@@ -0,0 +1,154 @@
+import json
+import logging
+import re
+from typing import Any
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_FENCE = re.compile(r"```[a-zA-Z0-9_-]*\s*\n?(.*?)```", re.DOTALL)
+
+# Python types accepted for each (Gemini / OpenAPI style) schema type
+_TYPES = {
+    "OBJECT": dict,
+    "ARRAY": list,
+    "STRING": str,
+    "BOOLEAN": bool,
+    "INTEGER": int,
+    "NUMBER": (int, float),
+}
+
+
+def _strip_fences(text: str) -> str:
+    """Returns the body of the first markdown code fence, if any."""
+    match = _FENCE.search(text)
+    return match.group(1) if match else text
+
+
+def _balanced_span(text: str, start: int) -> str | None:
+    """
+    Returns the balanced {...} or [...] span opening at text[start],
+    skipping brackets inside strings.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch in "{[":
+            depth += 1
+        elif ch in "}]":
+            depth -= 1
+            if depth == 0:
+                return text[start:i + 1]
+    return None
+
+
+def _loads_lenient(candidate: str) -> Any | None:
+    for attempt in (candidate, _drop_trailing_commas(candidate)):
+        try:
+            return json.loads(attempt)
+        except ValueError:
+            continue
+    return None
+
+
+def _drop_trailing_commas(text: str) -> str:
+    """Removes commas directly before } or ], outside of strings."""
+    out = []
+    in_string = False
+    escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+            out.append(ch)
+            continue
+        if ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                continue
+        out.append(ch)
+    return "".join(out)
+
+
+def extract_json(text: str | None) -> Any | None:
+    """
+    Single-pass JSON extraction from an LLM response:
+    - strips markdown code fences
+    - extracts the outermost JSON object/array, ignoring any preamble
+    - tolerates trailing commas
+    Returns the parsed value, or None if no JSON could be recovered.
+    """
+    if not text:
+        return None
+    try:
+        return json.loads(text)
+    except (TypeError, ValueError):
+        pass
+
+    # Outermost object/array: the first bracket that opens a parseable
+    # span wins, so a preamble like "Here [is] the JSON:" is skipped.
+    body = _strip_fences(text)
+    for start, ch in enumerate(body):
+        if ch not in "{[":
+            continue
+        candidate = _balanced_span(body, start)
+        if candidate is None:
+            continue
+        data = _loads_lenient(candidate)
+        if data is not None:
+            return data
+    return None
+
+
+def validate(data: Any, schema: dict | None) -> bool:
+    """
+    Checks data against a Gemini-style schema: the top-level type, the
+    presence of `required` keys and the types of those required keys.
+    Optional properties are left to each agent's own normalisation.
+    """
+    if schema is None:
+        return True
+    expected = _TYPES.get(schema.get("type", "").upper())
+    if expected is not None and not isinstance(data, expected):
+        return False
+    if isinstance(data, dict):
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in data:
+                return False
+            if not validate(data[key], properties.get(key)):
+                return False
+    return True
+
+
+def parse_json(text: str | None, schema: dict | None = None, agent: str = "") -> Any | None:
+    """
+    extract_json() + validate(); returns None if either fails.
+    """
+    data = extract_json(text)
+    if data is None:
+        logger.warning(f"{agent or 'LLM'} response contained no parseable JSON.")
+        return None
+    if not validate(data, schema):
+        logger.warning(f"{agent or 'LLM'} JSON does not match its schema.")
+        return None
+    return data
@@ -1,11 +1,30 @@
 from fastapi import FastAPI
 from api.routes import router
+from core.config import settings
+from core.readiness import start_warm_up
+from vectorstore.retention import start_compaction_job, stop_compaction_job
+from vectorstore.store import memory_writer
 
 app = FastAPI(title="UHPM Agent API")
 
 app.include_router(router)
 
 
+@app.on_event("startup")
+def warm_up_on_startup():
+    # Runs in the background; GET /ready reports when it has finished
+    if settings.WARMUP_ON_STARTUP:
+        start_warm_up()
+    start_compaction_job()
+
+
+@app.on_event("shutdown")
+def drain_memory_writes():
+    # Persist queued memory writes before the process exits
+    stop_compaction_job()
+    memory_writer.close()
+
+
 @app.get("/")
 def root():
     return {"status": "ok", "msg": "UHPM Agent API is running."}
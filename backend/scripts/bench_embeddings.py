@@ -0,0 +1,132 @@
+"""
+Embedding backend benchmark and parity check.
+
+Encodes the same texts with the torch (SentenceTransformer) encoder and
+the ONNX encoder (fp32 and int8), each in its own subprocess so peak RSS
+is measured per backend, then compares throughput, RSS and the cosine
+similarity of the ONNX vectors against the torch ones.
+
+Usage (from backend/):
+    python -m scripts.bench_embeddings [--texts FILE] [--count 512] [--batch-size 32]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Minimum cosine of an ONNX vector against the torch one (also enforced
+# by tests/test_onnx_parity.py)
+MIN_COSINE = 0.98
+
+_SAMPLE = [
+    "Launch campaign for an eco-friendly running shoe aimed at urban commuters",
+    "Persona: 34-year-old product manager who values time savings and data",
+    "Competitor analysis of subscription meal kits in the German market",
+    "Write three LinkedIn posts announcing our B2B analytics dashboard",
+    "A/B test headline variants for a premium coffee subscription landing page",
+    "Campaign results: CTR 2.4%, CPC 0.81 EUR, ROAS 3.1 over 14 days",
+]
+
+
+def _load_texts(path: str | None, count: int) -> list[str]:
+    if path:
+        with open(path) as f:
+            texts = [line.strip() for line in f if line.strip()]
+    else:
+        texts = _SAMPLE
+    return [f"{texts[i % len(texts)]} #{i}" for i in range(count)]
+
+
+def _create_encoder(backend: str, onnx_dir: str):
+    if backend == "torch":
+        from sentence_transformers import SentenceTransformer
+
+        return SentenceTransformer(MODEL_NAME, device="cpu")
+    from vectorstore.onnx_encoder import OnnxEncoder
+
+    return OnnxEncoder(MODEL_NAME, directory=onnx_dir, quantize=backend == "onnx-int8")
+
+
+def _worker(args):
+    """Runs one backend and prints a JSON result line."""
+    texts = _load_texts(args.texts, args.count)
+    encoder = _create_encoder(args.backend, args.onnx_dir)
+    encoder.encode(texts[: args.batch_size], batch_size=args.batch_size)
+
+    started = time.perf_counter()
+    vectors = encoder.encode(texts, batch_size=args.batch_size, convert_to_numpy=True)
+    elapsed = time.perf_counter() - started
+
+    np.save(args.output, np.asarray(vectors, dtype=np.float32))
+    print(json.dumps({
+        "backend": args.backend,
+        "texts_per_s": round(len(texts) / elapsed, 1),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--texts", help="file with one text per line")
+    parser.add_argument("--count", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument(
+        "--onnx-dir", default=os.path.join("vectorstore", "onnx", MODEL_NAME)
+    )
+    parser.add_argument("--min-cosine", type=float, default=MIN_COSINE,
+                        help="parity threshold for the ONNX backends")
+    parser.add_argument("--backend", help=argparse.SUPPRESS)
+    parser.add_argument("--output", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        _worker(args)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ("torch", "onnx", "onnx-int8"):
+            output = os.path.join(tmp, f"{backend}.npy")
+            command = [
+                sys.executable, "-m", "scripts.bench_embeddings",
+                "--backend", backend, "--output", output,
+                "--count", str(args.count), "--batch-size", str(args.batch_size),
+                "--onnx-dir", args.onnx_dir,
+            ]
+            if args.texts:
+                command += ["--texts", args.texts]
+            completed = subprocess.run(command, capture_output=True, text=True, check=True)
+            results[backend] = json.loads(completed.stdout.strip().splitlines()[-1])
+            results[backend]["vectors"] = np.load(output)
+
+    baseline = results["torch"]["vectors"]
+    failed = False
+    print(f"{'backend':<10} {'texts/s':>9} {'peak RSS MB':>12} {'min cos':>8} {'mean cos':>9}")
+    for backend, result in results.items():
+        cosine = _cosine(result["vectors"], baseline)
+        failed |= backend != "torch" and cosine.min() < args.min_cosine
+        print(
+            f"{backend:<10} {result['texts_per_s']:>9} {result['peak_rss_mb']:>12} "
+            f"{cosine.min():>8.4f} {cosine.mean():>9.4f}"
+        )
+    if failed:
+        print(f"Parity check FAILED: cosine below {args.min_cosine}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
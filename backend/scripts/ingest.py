@@ -0,0 +1,370 @@
+"""
+Streaming bulk ingestion into the vector store.
+
+Streams JSONL, CSV and plain-text files record by record (memory stays
+flat regardless of file size), splits long documents into overlapping
+chunks, embeds them in batches (optionally in several worker processes)
+and upserts them into the memory collections in bulk. Progress is
+checkpointed after every written batch (down to the chunk within a
+record, so a large plain-text file resumes mid-file), so an interrupted
+run resumes where it stopped; ids are derived from (file, record, chunk), so
+re-written batches overwrite instead of duplicating.
+
+Usage (from backend/):
+    python -m scripts.ingest FILE [FILE ...] [--type persona] [--processes 4]
+
+With VECTOR_SERVICE_SOCKET set the writes go through the shared vector
+service; embedding always runs in this process (and its workers).
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from core.config import settings
+from vectorstore import store
+from vectorstore.chunking import chunk_stream, chunk_text
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".txt": "text", ".md": "text"}
+
+# Characters read at a time from a plain-text file ingested as one document
+FILE_BLOCK_CHARS = 1 << 20
+
+
+def detect_format(path: str) -> str:
+    return FORMATS.get(os.path.splitext(path)[1].lower(), "text")
+
+
+def iter_records(path: str, fmt: str, text_field: str = "text", text_mode: str = "file"):
+    """
+    Yields (text, metadata) per record without loading the whole file.
+
+    Args:
+    - fmt: "jsonl" (one object per line), "csv" (header row) or "text"
+    - text_field: field holding the document for jsonl / csv; every
+      other field becomes metadata
+    - text_mode: for "text" files, one record per "file", "paragraph"
+      (blank-line separated) or "line". In "file" mode the text is an
+      iterator of FILE_BLOCK_CHARS blocks, chunked as it is read
+    """
+    if fmt == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    logger.warning(f"{path}:{line_number}: skipping invalid JSON ({e})")
+                    yield None, None
+                    continue
+                if not isinstance(record, dict):
+                    record = {text_field: str(record)}
+                text = record.pop(text_field, None)
+                yield (str(text) if text is not None else None), record
+    elif fmt == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                text = row.pop(text_field, None)
+                yield text, row
+    elif text_mode == "line":
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield line.strip(), {}
+    elif text_mode == "paragraph":
+        with open(path, encoding="utf-8") as f:
+            block = []
+            for line in f:
+                if line.strip():
+                    block.append(line.rstrip("\n"))
+                elif block:
+                    yield "\n".join(block), {}
+                    block = []
+            if block:
+                yield "\n".join(block), {}
+    else:
+        yield _read_blocks(path), {}
+
+
+def _read_blocks(path: str):
+    with open(path, encoding="utf-8") as f:
+        while True:
+            block = f.read(FILE_BLOCK_CHARS)
+            if not block:
+                return
+            yield block
+
+
+def clean_metadata(meta: dict) -> dict:
+    """Chroma metadata values must be str, int, float or bool."""
+    cleaned = {}
+    for key, value in (meta or {}).items():
+        if value is None or value == "":
+            continue
+        if isinstance(value, (str, int, float, bool)):
+            cleaned[str(key)] = value
+        else:
+            cleaned[str(key)] = json.dumps(value, ensure_ascii=False, default=str)
+    return cleaned
+
+
+def chunk_id(source: str, record: int, chunk: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{source}#{record}/{chunk}"))
+
+
+def iter_chunks(path: str, args, skip: int = 0, skip_chunks: int = 0):
+    """
+    Yields (record_index, is_last_chunk, id, text, metadata) for the
+    records of one file, starting at record `skip` and, within it, at
+    chunk `skip_chunks` (the ones before are chunked but not yielded).
+    """
+    source = os.path.abspath(path)
+    tokenizer = store.get_tokenizer()
+    for record_index, (text, meta) in enumerate(
+        iter_records(path, args.format or detect_format(path), args.text_field, args.text_mode)
+    ):
+        if record_index < skip or not text:
+            continue
+        if isinstance(text, str):
+            chunks = iter(chunk_text(text, args.chunk_size, args.chunk_overlap, tokenizer=tokenizer))
+        else:
+            # a whole file as blocks
+            chunks = chunk_stream(text, args.chunk_size, args.chunk_overlap, tokenizer=tokenizer)
+        # one chunk of lookahead: is this the last one / is it chunked at all
+        current, upcoming = next(chunks, None), next(chunks, None)
+        if current is None:
+            continue
+        now = time.time()
+        base = {
+            "source": "bulk_ingest",
+            "source_file": os.path.basename(path),
+            "record": record_index,
+            **clean_metadata(meta),
+        }
+        if args.type and "type" not in base:
+            base["type"] = args.type
+        chunked = upcoming is not None
+        if chunked:
+            base["parent_id"] = chunk_id(source, record_index, -1)
+        chunk_index = 0
+        while current is not None:
+            following = next(chunks, None) if upcoming is not None else None
+            if record_index == skip and chunk_index < skip_chunks:
+                current, upcoming = upcoming, following
+                chunk_index += 1
+                continue
+            yield (
+                record_index,
+                upcoming is None,
+                chunk_id(source, record_index, chunk_index),
+                current,
+                {
+                    **base,
+                    **({"chunk_index": chunk_index} if chunked else {}),
+                    "content_hash": store.content_hash(current),
+                    "created_at": now,
+                    "updated_at": now,
+                },
+            )
+            current, upcoming = upcoming, following
+            chunk_index += 1
+
+
+def _batches(items, size: int):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    """
+    Per-file progress ({"records_done", "record_chunks", "chunks"}), saved
+    atomically after every written batch. record_chunks counts the chunks
+    of record `records_done` already written when a batch ended inside
+    it. A file whose size or mtime changed starts over.
+    """
+
+    def __init__(self, path: str, restart: bool = False):
+        self.path = path
+        self.state = {}
+        if not restart and os.path.exists(path):
+            with open(path) as f:
+                self.state = json.load(f)
+
+    @staticmethod
+    def _fingerprint(source: str) -> dict:
+        stat = os.stat(source)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def start(self, source: str) -> dict:
+        key = os.path.abspath(source)
+        entry = self.state.get(key)
+        if entry is None or {k: entry.get(k) for k in ("size", "mtime")} != self._fingerprint(source):
+            entry = {
+                **self._fingerprint(source),
+                "records_done": 0, "record_chunks": 0, "chunks": 0, "done": False,
+            }
+            self.state[key] = entry
+        return entry
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _init_worker(threads: int):
+    # workers only encode; keep each to its share of the cores
+    store.serve_locally()
+    settings.EMBED_ONNX_THREADS = threads
+    try:
+        import torch
+
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def encode(texts: list[str], batch_size: int):
+    """Encodes without the embedding cache (bulk texts are unique)."""
+    return store.get_embedding_model().encode(
+        texts, batch_size=batch_size, convert_to_numpy=True
+    ).tolist()
+
+
+class Progress:
+    def __init__(self, every: float = 5.0):
+        self.every = every
+        self.started = time.perf_counter()
+        self.last = 0.0
+        self.records = 0
+        self.chunks = 0
+
+    def update(self, records: int, chunks: int, force: bool = False):
+        self.records += records
+        self.chunks += chunks
+        elapsed = time.perf_counter() - self.started
+        if force or elapsed - self.last >= self.every:
+            self.last = elapsed
+            print(
+                f"{self.records} records, {self.chunks} chunks in {elapsed:.1f}s "
+                f"({self.chunks / elapsed if elapsed else 0:.0f} chunks/s)",
+                flush=True,
+            )
+
+
+def ingest_file(path: str, args, checkpoint: Checkpoint, pool, progress: Progress):
+    entry = checkpoint.start(path)
+    if entry["done"]:
+        print(f"{path}: already ingested, skipping (use --restart to reload)")
+        return
+    skip_chunks = entry.get("record_chunks", 0)
+    if entry["records_done"] or skip_chunks:
+        print(
+            f"{path}: resuming at record {entry['records_done']}"
+            + (f", chunk {skip_chunks}" if skip_chunks else "")
+        )
+
+    def write(batch, vectors):
+        store.upsert_documents(
+            [item[2] for item in batch],
+            [item[3] for item in batch],
+            vectors,
+            [item[4] for item in batch],
+        )
+        record_index, is_last, meta = batch[-1][0], batch[-1][1], batch[-1][4]
+        records_done = record_index + 1 if is_last else record_index
+        progress.update(records_done - entry["records_done"], len(batch))
+        entry["records_done"] = records_done
+        entry["record_chunks"] = 0 if is_last else meta["chunk_index"] + 1
+        entry["chunks"] += len(batch)
+        checkpoint.save()
+
+    batches = _batches(
+        iter_chunks(path, args, skip=entry["records_done"], skip_chunks=skip_chunks),
+        args.batch_size,
+    )
+    if pool is None:
+        for batch in batches:
+            write(batch, encode([item[3] for item in batch], args.embed_batch_size))
+    else:
+        # keep every worker busy while the main process writes, in order
+        in_flight = deque()
+        for batch in batches:
+            in_flight.append(
+                (batch, pool.submit(encode, [item[3] for item in batch], args.embed_batch_size))
+            )
+            if len(in_flight) >= args.processes * 2:
+                done_batch, future = in_flight.popleft()
+                write(done_batch, future.result())
+        while in_flight:
+            done_batch, future = in_flight.popleft()
+            write(done_batch, future.result())
+
+    entry["done"] = True
+    checkpoint.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())),
+                        help="input format (default: from the file extension)")
+    parser.add_argument("--text-field", default="text", help="document field in jsonl / csv")
+    parser.add_argument("--text-mode", choices=["file", "paragraph", "line"], default="file",
+                        help="record boundaries in plain-text files")
+    parser.add_argument("--type", help="memory type for records without a 'type' field")
+    parser.add_argument("--chunk-size", type=int, default=settings.CHUNK_SIZE_TOKENS)
+    parser.add_argument("--chunk-overlap", type=int, default=settings.CHUNK_OVERLAP_TOKENS)
+    parser.add_argument("--batch-size", type=int, default=512,
+                        help="chunks per write / checkpoint")
+    parser.add_argument("--embed-batch-size", type=int, default=settings.EMBED_BATCH_SIZE)
+    parser.add_argument("--processes", type=int, default=1,
+                        help="embedding worker processes (1 = encode in this process "
+                             "with all cores)")
+    parser.add_argument("--checkpoint", default="ingest_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint")
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint, restart=args.restart)
+    progress = Progress()
+    pool = None
+    if args.processes > 1:
+        threads = max(1, (os.cpu_count() or 1) // args.processes)
+        pool = ProcessPoolExecutor(
+            max_workers=args.processes, initializer=_init_worker, initargs=(threads,)
+        )
+    try:
+        for path in args.files:
+            if not os.path.isfile(path):
+                print(f"{path}: not a file, skipping")
+                continue
+            ingest_file(path, args, checkpoint, pool, progress)
+    except KeyboardInterrupt:
+        print("Interrupted, progress is saved in the checkpoint.")
+        sys.exit(130)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        progress.update(0, 0, force=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Run against local, throwaway state: no shared service, no disk cache
+os.environ.setdefault("VECTOR_SERVICE_SOCKET", "")
+os.environ.setdefault("EMBED_CACHE_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder standing in for MiniLM."""
+
+    dimensions = 64
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, **kwargs):
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                digest = hashlib.md5(word.encode("utf-8")).digest()
+                vectors[row, digest[0] % self.dimensions] += 1.0
+            norm = np.linalg.norm(vectors[row])
+            if norm:
+                vectors[row] /= norm
+        return vectors
+
+
+@pytest.fixture
+def vector_store(tmp_path, monkeypatch):
+    """vectorstore.store on a fresh Chroma directory with the hashing encoder."""
+    from core.config import settings
+    from vectorstore import store
+
+    monkeypatch.setattr(settings, "PERSIST_DIRECTORY", str(tmp_path / "chroma"))
+    monkeypatch.setattr(store, "_embedding_model", HashingEncoder())
+    monkeypatch.setattr(store, "_chroma_client", None)
+    monkeypatch.setattr(store, "_collections", {})
+    monkeypatch.setattr(store, "_collections_generation", None)
+    monkeypatch.setattr(store, "_lexical_index", None)
+    monkeypatch.setattr(store, "_lexical_counts", None)
+    return store
@@ -0,0 +1,70 @@
+def _stored(store, doc_id):
+    got = store.get_collection().get(ids=[doc_id], include=["documents"])
+    return got["documents"][0] if got["ids"] else None
+
+
+def test_repeats_in_batch_do_not_refresh_unrelated_document(vector_store):
+    seed = vector_store.add_documents(["seed note about running shoes"])[0]
+
+    results = vector_store.add_documents(["quarterly email campaign"] * 2)
+
+    assert [r["status"] for r in results] == ["added", "duplicate"]
+    assert results[1]["id"] == results[0]["id"]
+    assert results[0]["id"] != seed["id"]
+    assert _stored(vector_store, seed["id"]) == "seed note about running shoes"
+    assert vector_store.get_collection().count() == 2
+
+
+def test_repeat_after_new_document_maps_to_first_copy(vector_store):
+    seed = vector_store.add_documents(["seed note about running shoes"])[0]
+
+    results = vector_store.add_documents(
+        ["linkedin post for analytics", "coffee subscription landing page", "coffee subscription landing page"]
+    )
+
+    assert [r["status"] for r in results] == ["added", "added", "duplicate"]
+    assert results[2]["id"] == results[1]["id"]
+    assert _stored(vector_store, seed["id"]) == "seed note about running shoes"
+    assert vector_store.get_collection().count() == 3
+
+
+def test_near_duplicates_for_other_products_are_kept(vector_store, monkeypatch):
+    monkeypatch.setattr(vector_store.settings, "MEMORY_DEDUP_THRESHOLD", 0.8)
+    text = "launch email for busy parents who want quick healthy dinners"
+    first = vector_store.add_document(text, {"type": "content", "product_text": "meal kit"})
+    second = vector_store.add_document(text + " tonight", {"type": "content", "product_text": "recipe app"})
+    general = vector_store.add_document(text + " tonight", {"type": "content"})
+    repeat = vector_store.add_document(text, {"type": "content", "product_text": "recipe app"})
+
+    assert [first["status"], second["status"], general["status"]] == ["added"] * 3
+    assert repeat["status"] == "refreshed" and repeat["id"] == second["id"]
+    assert _stored(vector_store, first["id"]) == text
+    got = vector_store.get_collection().get(where={"product_text": "meal kit"})
+    assert got["ids"] == [first["id"]]
+
+
+def _chunk_parents(store, parent_id):
+    got = store.get_collection().get(where={"parent_id": parent_id}, include=["metadatas"])
+    return sorted((doc_id, meta["chunk_index"]) for doc_id, meta in zip(got["ids"], got["metadatas"]))
+
+
+def test_refreshed_chunks_keep_their_parent(vector_store, monkeypatch):
+    monkeypatch.setattr(vector_store.settings, "MEMORY_DEDUP_THRESHOLD", 1.0)
+    monkeypatch.setattr(vector_store.settings, "CHUNK_SIZE_TOKENS", 10)
+    monkeypatch.setattr(vector_store.settings, "CHUNK_OVERLAP_TOKENS", 2)
+    shared = " ".join(f"shared{n}" for n in range(10))
+    text_a = shared + " " + " ".join(f"alpha{n}" for n in range(16))
+    text_b = shared + " " + " ".join(f"beta{n}" for n in range(16))
+
+    a = vector_store.add_document(text_a)
+    chunks_a = _chunk_parents(vector_store, a["id"])
+    assert a["status"] == "added" and len(chunks_a) == a["chunks"] == 3
+
+    # B's first chunk is A's first chunk: A keeps it
+    b = vector_store.add_document(text_b)
+    assert b["status"] == "added"
+    assert _chunk_parents(vector_store, a["id"]) == chunks_a
+
+    again = vector_store.add_document(text_a)
+    assert again["status"] == "refreshed" and again["id"] == a["id"]
+    assert _chunk_parents(vector_store, a["id"]) == chunks_a
@@ -0,0 +1,34 @@
+import numpy as np
+
+from vectorstore.embedding_cache import EmbeddingCache
+
+
+def _vectors(texts):
+    return np.array([[float(len(text)), float(sum(map(ord, text)))] for text in texts], dtype=np.float32)
+
+
+def test_disk_tier_shared_by_two_processes(tmp_path):
+    # two instances on one directory stand in for two workers
+    first = EmbeddingCache("model", directory=str(tmp_path), max_memory_items=1)
+    second = EmbeddingCache("model", directory=str(tmp_path), max_memory_items=1)
+
+    first_texts = [f"first {i}" for i in range(10)]
+    second_texts = [f"second text {i}" for i in range(10)]
+    first.set_many(first_texts, _vectors(first_texts))
+    second.set_many(second_texts, _vectors(second_texts))
+
+    fresh = EmbeddingCache("model", directory=str(tmp_path), max_memory_items=1)
+    for texts in (first_texts, second_texts):
+        found = fresh.get_many(texts)
+        np.testing.assert_array_equal(np.array(found), _vectors(texts))
+
+
+def test_large_lookup_is_chunked(tmp_path):
+    cache = EmbeddingCache("model", directory=str(tmp_path), max_memory_items=1)
+    texts = [f"text {i}" for i in range(2000)]
+    cache.set_many(texts, _vectors(texts))
+
+    found = cache.get_many(texts + ["never stored"])
+
+    assert found[-1] is None
+    np.testing.assert_array_equal(np.array(found[:-1]), _vectors(texts))
@@ -0,0 +1,20 @@
+from vectorstore import service, store
+
+
+class _Client:
+    def __init__(self):
+        self.calls = []
+
+    def call(self, method, *args, **kwargs):
+        self.calls.append(method)
+        # the service runs the undecorated call
+        return service.METHODS[method].__wrapped__(*args, **kwargs)
+
+
+def test_embedding_stats_come_from_the_service_when_remote(vector_store, monkeypatch):
+    client = _Client()
+    monkeypatch.setattr(store.settings, "VECTOR_SERVICE_SOCKET", "/tmp/unused.sock")
+    monkeypatch.setattr(store, "get_service_client", lambda: client)
+
+    assert store.embedding_cache_stats() == {"enabled": False}
+    assert client.calls == ["embedding_cache_stats"]
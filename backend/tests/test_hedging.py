@@ -0,0 +1,50 @@
+import asyncio
+import itertools
+import threading
+import time
+
+from llm.hedging import Hedger
+
+
+def _hedger():
+    hedger = Hedger(agents={"reasoner"}, max_rate=1.0, min_samples=1)
+    hedger._latencies["reasoner"].extend([0.01] * 5)
+    return hedger
+
+
+def test_sync_hedge_reports_only_the_winners_metrics():
+    calls = itertools.count()
+    release = threading.Event()
+
+    def attempt(info):
+        info.update(queue_ms=0.0, retries=0, attempts=0)
+        if next(calls) == 0:
+            info.update(retries=2, attempts=3)  # slow primary
+            release.wait(5)
+            return "primary"
+        info.update(queue_ms=1.5, attempts=1)
+        return "hedge"
+
+    info = {}
+    assert _hedger().call("reasoner", attempt, info) == "hedge"
+    time.sleep(0.05)  # the primary is still running
+    assert info == {"queue_ms": 1.5, "retries": 0, "attempts": 1}
+    release.set()
+
+
+def test_async_hedge_reports_only_the_winners_metrics():
+    calls = itertools.count()
+
+    async def attempt(info):
+        info.update(queue_ms=0.0, retries=0, attempts=0)
+        if next(calls) == 0:
+            info.update(retries=2, attempts=3)
+            await asyncio.sleep(5)
+            return "primary"
+        await asyncio.sleep(0.01)
+        info.update(queue_ms=1.5, attempts=1)
+        return "hedge"
+
+    info = {}
+    assert asyncio.run(_hedger().acall("reasoner", attempt, info)) == "hedge"
+    assert info == {"queue_ms": 1.5, "retries": 0, "attempts": 1}
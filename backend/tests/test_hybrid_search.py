@@ -0,0 +1,39 @@
+import pytest
+
+
+def test_distances_are_per_query(vector_store):
+    vector_store.add_documents(["red running shoes", "blue winter hat"])
+
+    queries = ["red running shoes", "blue winter hat"]
+    hybrid = vector_store.hybrid_search_many(queries, k=2)
+    vector = vector_store.search_many(queries, k=2)
+
+    for hybrid_hits, vector_hits in zip(hybrid, vector):
+        expected = dict(zip(vector_hits["ids"], vector_hits["distances"]))
+        for doc_id, distance in zip(hybrid_hits["ids"], hybrid_hits["distances"]):
+            assert distance == pytest.approx(expected[doc_id], abs=1e-5)
+    assert hybrid[0]["distances"][0] == pytest.approx(0.0, abs=1e-5)
+    assert hybrid[1]["distances"][0] == pytest.approx(0.0, abs=1e-5)
+
+
+def test_lexical_index_picks_up_writes_from_other_processes(vector_store, monkeypatch):
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "LEXICAL_INDEX_CHECK_SECONDS", 0)
+    vector_store.add_documents(["red running shoes"])
+    assert len(vector_store.get_lexical_index()) == 1
+
+    # written by another worker: straight to Chroma, not through this index
+    collection = vector_store.get_collection()
+    collection.add(
+        ids=["other-worker"],
+        documents=["sku XR-200 trail shoe"],
+        embeddings=vector_store.embed(["sku XR-200 trail shoe"]),
+        metadatas=[{"source": "manual"}],
+    )
+
+    hits = vector_store.get_lexical_index().search("xr-200", k=1)
+    assert [doc_id for doc_id, _ in hits] == ["other-worker"]
+
+    collection.delete(ids=["other-worker"])
+    assert vector_store.get_lexical_index().search("xr-200", k=1) == []
@@ -0,0 +1,60 @@
+import argparse
+
+from scripts import ingest
+from vectorstore.chunking import chunk_stream, chunk_text
+
+TEXT = " ".join(f"word{n}, part {n % 7}." for n in range(2000))
+
+
+def test_chunk_stream_matches_whole_text_chunking():
+    for block_chars in (5, 97, 1000, len(TEXT)):
+        blocks = [TEXT[i:i + block_chars] for i in range(0, len(TEXT), block_chars)]
+        assert list(chunk_stream(blocks, 50, 8)) == chunk_text(TEXT, 50, 8)
+
+
+def test_file_mode_is_read_in_blocks(vector_store, tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    monkeypatch.setattr(ingest, "FILE_BLOCK_CHARS", 500)
+    args = argparse.Namespace(
+        format=None, text_field="text", text_mode="file", type="persona",
+        chunk_size=50, chunk_overlap=8,
+    )
+
+    chunks = list(ingest.iter_chunks(str(path), args))
+
+    assert [c[3] for c in chunks] == chunk_text(TEXT, 50, 8)
+    assert [c[1] for c in chunks] == [False] * (len(chunks) - 1) + [True]
+    assert {c[4]["parent_id"] for c in chunks} == {ingest.chunk_id(str(path), 0, -1)}
+    assert [c[4]["chunk_index"] for c in chunks] == list(range(len(chunks)))
+
+
+def test_resume_continues_inside_a_streamed_file(vector_store, tmp_path, monkeypatch):
+    path = tmp_path / "notes.txt"
+    path.write_text(TEXT, encoding="utf-8")
+    args = argparse.Namespace(
+        format=None, text_field="text", text_mode="file", type=None,
+        chunk_size=50, chunk_overlap=8, batch_size=10, embed_batch_size=32,
+    )
+    written = []
+    upsert = vector_store.upsert_documents
+
+    def crash_after_two_batches(ids, *rest):
+        if len(written) == 20:
+            raise KeyboardInterrupt
+        written.extend(ids)
+        return upsert(ids, *rest)
+
+    monkeypatch.setattr(vector_store, "upsert_documents", crash_after_two_batches)
+    checkpoint = ingest.Checkpoint(str(tmp_path / "checkpoint.json"))
+    try:
+        ingest.ingest_file(str(path), args, checkpoint, None, ingest.Progress())
+    except KeyboardInterrupt:
+        pass
+    assert ingest.Checkpoint(checkpoint.path).start(str(path))["record_chunks"] == 20
+
+    monkeypatch.setattr(vector_store, "upsert_documents", lambda ids, *rest: written.extend(ids))
+    ingest.ingest_file(str(path), args, ingest.Checkpoint(checkpoint.path), None, ingest.Progress())
+
+    expected = [ingest.chunk_id(str(path), 0, n) for n in range(len(chunk_text(TEXT, 50, 8)))]
+    assert written == expected
@@ -0,0 +1,37 @@
+import asyncio
+import threading
+import time
+
+
+def test_full_queue_does_not_block_the_event_loop(vector_store, monkeypatch):
+    from core.config import settings
+
+    monkeypatch.setattr(settings, "MEMORY_WRITE_BEHIND", True)
+    writer = vector_store.MemoryWriter(maxsize=1, batch_size=1, enqueue_timeout=2.0)
+    monkeypatch.setattr(vector_store, "memory_writer", writer)
+
+    release = threading.Event()
+    real_add_documents = vector_store.add_documents
+
+    def slow_add_documents(texts, metadatas=None, batch_size=None):
+        release.wait(5)
+        return real_add_documents(texts, metadatas, batch_size)
+
+    monkeypatch.setattr(vector_store, "add_documents", slow_add_documents)
+
+    async def agent():
+        started = time.perf_counter()
+        for i in range(5):
+            vector_store.write_memory(f"memory number {i} about product {i}")
+        elapsed = time.perf_counter() - started
+        release.set()
+        return elapsed
+
+    elapsed = asyncio.run(agent())
+
+    assert elapsed < 0.5
+    assert writer.flush(timeout=10)
+    writer.close()
+    assert writer.failed == 0
+    assert writer.inline_writes >= 1
+    assert vector_store.get_collection().count() == 5
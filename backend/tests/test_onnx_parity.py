@@ -0,0 +1,33 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("sentence_transformers")
+
+from core.config import settings  # noqa: E402
+from scripts.bench_embeddings import MIN_COSINE, MODEL_NAME, _SAMPLE, _cosine  # noqa: E402
+
+ONNX_DIR = os.path.join(settings.EMBED_ONNX_DIR, MODEL_NAME)
+
+
+@pytest.fixture(scope="module")
+def torch_vectors():
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    return np.asarray(model.encode(_SAMPLE, convert_to_numpy=True))
+
+
+@pytest.mark.parametrize("quantize, filename", [(False, "model.onnx"), (True, "model_int8.onnx")])
+def test_onnx_vectors_match_torch(torch_vectors, quantize, filename):
+    if not os.path.exists(os.path.join(ONNX_DIR, filename)):
+        pytest.skip(f"no exported model at {ONNX_DIR}/{filename}")
+    from vectorstore.onnx_encoder import OnnxEncoder
+
+    encoder = OnnxEncoder(MODEL_NAME, directory=ONNX_DIR, quantize=quantize)
+    vectors = np.asarray(encoder.encode(_SAMPLE, convert_to_numpy=True))
+
+    assert vectors.shape == torch_vectors.shape
+    assert _cosine(vectors, torch_vectors).min() >= MIN_COSINE
@@ -0,0 +1,29 @@
+import sqlite3
+
+from llm.cache import PromptCache
+
+
+def test_locked_disk_tier_never_raises(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    cache = PromptCache(path, busy_timeout=0.05)
+    other = sqlite3.connect(path)
+    other.execute("BEGIN EXCLUSIVE")
+
+    cache.set("key", "response")  # write skipped, kept in memory
+    assert cache.get("key") == "response"
+
+    other.rollback()
+    cache.set("key2", "response2")
+    assert PromptCache(path).get("key2") == "response2"
+    assert PromptCache(path).get("key") is None
+
+
+def test_failed_read_is_a_miss(tmp_path):
+    path = str(tmp_path / "llm_cache.sqlite3")
+    cache = PromptCache(path)
+    other = sqlite3.connect(path)
+    other.execute("DROP TABLE llm_cache")
+    other.commit()
+
+    assert cache.get("key") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import time
+
+from llm.ratelimit import RateGovernor
+
+
+def _governor(slots: int) -> RateGovernor:
+    return RateGovernor(requests_per_minute=0, tokens_per_minute=0, max_concurrency=slots)
+
+
+def test_async_waiter_is_woken_by_a_thread_release():
+    governor = _governor(1)
+    governor.acquire_slot()
+
+    async def main():
+        timer = threading.Timer(0.05, governor.release_slot)
+        timer.start()
+        started = time.perf_counter()
+        await governor.aacquire_slot()
+        return time.perf_counter() - started
+
+    waited = asyncio.run(main())
+    assert 0.04 < waited < 1.0
+    assert governor._in_flight == 1
+    governor.release_slot()
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    governor = _governor(1)
+
+    async def main():
+        await governor.aacquire_slot()
+        first = asyncio.ensure_future(governor.aacquire_slot())
+        second = asyncio.ensure_future(governor.aacquire_slot())
+        await asyncio.sleep(0.01)
+        governor.release_slot()  # wakes `first` ...
+        first.cancel()  # ... which gives up before taking the slot
+        await asyncio.wait_for(second, 1.0)
+
+    asyncio.run(main())
+    assert governor._in_flight == 1
@@ -0,0 +1,66 @@
+from vectorstore import retention
+
+
+def test_rebuild_keeps_documents_and_drops_backup(vector_store):
+    vector_store.add_documents(["red running shoes", "blue winter hat"])
+
+    report = retention.compact(rebuild=True)
+
+    entry = report["collections"][vector_store.DEFAULT_COLLECTION]
+    assert entry["rebuilt"] and entry["after"] == 2
+    names = {c.name for c in vector_store.get_chroma_client().list_collections()}
+    assert names == {vector_store.DEFAULT_COLLECTION}
+
+
+def test_interrupted_swap_is_restored_from_backup(vector_store):
+    vector_store.add_documents(["red running shoes", "blue winter hat"])
+    client = vector_store.get_chroma_client()
+    # crash after the old collection was renamed, before the copy took its name
+    vector_store.get_collection().modify(name=f"{vector_store.DEFAULT_COLLECTION}__backup")
+    vector_store.bump_collections_generation()
+    assert vector_store.get_collection().count() == 0
+
+    retention.compact(dry_run=True)
+
+    assert vector_store.get_collection().count() == 2
+    names = {c.name for c in client.list_collections()}
+    assert names == {vector_store.DEFAULT_COLLECTION}
+
+
+def test_other_processes_reopen_rebuilt_collections(vector_store):
+    vector_store.add_documents(["red running shoes"])
+    stale = vector_store.get_collection()
+
+    retention.compact(rebuild=True)
+    # what another worker still holds: the pre-rebuild handle
+    vector_store._collections[vector_store.DEFAULT_COLLECTION] = stale
+    vector_store._collections_generation = None
+
+    assert vector_store.get_collection().id != stale.id
+    assert vector_store.search("running shoes", k=1)["documents"] == ["red running shoes"]
+
+
+def _chunk(doc_id, parent, stamp, **meta):
+    return doc_id, {"parent_id": parent, "updated_at": stamp, **meta}
+
+
+def test_chunks_of_a_document_expire_together():
+    records = [
+        # old document, one chunk refreshed recently
+        _chunk("old:0", "old", 100.0),
+        _chunk("old:1", "old", 900.0),
+        _chunk("new:0", "new", 1000.0),
+        _chunk("new:1", "new", 1000.0),
+        ("single", {"updated_at": 500.0}),
+    ]
+    ids = [doc_id for doc_id, _ in records]
+    metadatas = [meta for _, meta in records]
+
+    assert retention.expired_ids(ids, metadatas, {"*": {"max_count": 1}}, now=1000.0) == {
+        "old:0", "old:1", "single",
+    }
+    # dated by the newest chunk: "old" is not older than 200s
+    day = 86400.0
+    assert retention.expired_ids(ids, metadatas, {"*": {"max_age_days": 200 / day}}, now=1100.0) == {
+        "single",
+    }
@@ -0,0 +1,27 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from vectorstore import service
+
+
+def _call(request):
+    async def main():
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            batcher = service.DynamicBatcher(executor, window_ms=1)
+            runner = asyncio.ensure_future(batcher.run())
+            try:
+                return await service._handle(request, batcher, executor)
+            finally:
+                runner.cancel()
+
+    return asyncio.run(main())
+
+
+def test_batched_methods_accept_keyword_arguments(vector_store):
+    vector_store.add_documents(["running shoes for commuters", "coffee subscription page"])
+    direct = vector_store.search_many(["coffee"], k=1)
+
+    by_keyword = _call({"method": "search_many", "kwargs": {"queries": ["coffee"], "k": 1}})
+    positional = _call({"method": "search_many", "args": [["coffee"], 1]})
+
+    assert by_keyword == positional == direct
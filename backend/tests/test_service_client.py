@@ -0,0 +1,89 @@
+import socket
+import threading
+import time
+
+import pytest
+
+from vectorstore.service_client import (
+    VectorServiceClient,
+    VectorServiceError,
+    VectorServiceUnavailable,
+    recv_frame,
+    send_frame,
+)
+
+
+def _serve(path, handler):
+    """Serves a Unix socket, recording every request; handler may return "close"."""
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen()
+    requests = []
+
+    def connection(conn):
+        try:
+            while True:
+                request = recv_frame(conn)
+                requests.append(request["method"])
+                if handler(conn, request) == "close":
+                    break
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            conn.close()
+
+    def loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=connection, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=loop, daemon=True).start()
+    return server, requests
+
+
+def test_unreachable_service_is_unavailable(tmp_path):
+    client = VectorServiceClient(str(tmp_path / "missing.sock"), timeout=0.2)
+    with pytest.raises(VectorServiceUnavailable):
+        client.call("ping")
+
+
+def test_slow_write_is_not_resent_or_reported_unavailable(tmp_path):
+    path = str(tmp_path / "slow.sock")
+    server, requests = _serve(path, lambda conn, request: time.sleep(0.5))
+    client = VectorServiceClient(path, timeout=0.1)
+    try:
+        with pytest.raises(VectorServiceError) as error:
+            client.call("add_documents", ["text"])
+        assert not isinstance(error.value, VectorServiceUnavailable)
+        time.sleep(0.6)
+        assert requests == ["add_documents"]
+    finally:
+        server.close()
+
+
+def test_dropped_read_is_retried_but_write_is_not(tmp_path):
+    path = str(tmp_path / "drop.sock")
+    answered = set()
+
+    def handler(conn, request):
+        # drop the first attempt of each method, answer a retry
+        if request["method"] not in answered:
+            answered.add(request["method"])
+            return "close"
+        send_frame(conn, {"ok": True, "result": "again"})
+
+    server, requests = _serve(path, handler)
+    client = VectorServiceClient(path, timeout=1)
+    try:
+        assert client.call("ping") == "again"
+        assert requests == ["ping", "ping"]
+
+        with pytest.raises(VectorServiceError) as error:
+            client.call("add_documents", ["text"])
+        assert not isinstance(error.value, VectorServiceUnavailable)
+        assert requests == ["ping", "ping", "add_documents"]
+    finally:
+        server.close()
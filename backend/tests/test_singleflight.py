@@ -0,0 +1,46 @@
+import asyncio
+
+from llm.singleflight import SingleFlight
+
+
+def test_follower_survives_cancelled_leader():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await follower
+        assert leader.cancelled()
+        return result
+
+    assert asyncio.run(scenario()) == "answer"
+    # the follower re-issued the call as the new leader
+    assert len(calls) == 2
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_cancel_leader():
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def scenario():
+        leader = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(flight.ado("key", call))
+        await asyncio.sleep(0.01)
+        follower.cancel()
+        return await leader, follower.cancelled()
+
+    assert asyncio.run(scenario()) == ("answer", True)
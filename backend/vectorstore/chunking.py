@@ -0,0 +1,92 @@
+import re
+from typing import Iterable, Iterator
+
+from core.config import settings
+
+# Approximate word pieces when no tokenizer is available
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def _token_spans(text: str, tokenizer=None) -> list[tuple[int, int]]:
+    """(start, end) character offsets of the tokens of `text`."""
+    if tokenizer is not None:
+        try:
+            encoded = tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                verbose=False,
+            )
+            return [tuple(span) for span in encoded["offset_mapping"]]
+        except Exception:
+            # slow tokenizers have no offsets
+            pass
+    return [match.span() for match in _PIECE.finditer(text)]
+
+
+def chunk_text(
+    text: str,
+    size: int | None = None,
+    overlap: int | None = None,
+    tokenizer=None,
+) -> list[str]:
+    """
+    Splits a document into overlapping windows of at most `size` tokens,
+    so no part of it falls past the encoder's max sequence length
+    (256 word pieces for MiniLM).
+
+    Args:
+    - text: document text
+    - size: tokens per chunk, defaults to settings.CHUNK_SIZE_TOKENS
+    - overlap: tokens shared by consecutive chunks, defaults to
+      settings.CHUNK_OVERLAP_TOKENS
+    - tokenizer: the encoder's (fast) tokenizer; without one, words and
+      punctuation are counted as tokens
+
+    Returns:
+    - the chunks as slices of the original text (the text itself when it
+      fits in one chunk, nothing for blank text)
+    """
+    size = size or settings.CHUNK_SIZE_TOKENS
+    overlap = settings.CHUNK_OVERLAP_TOKENS if overlap is None else overlap
+    overlap = max(0, min(overlap, size - 1))
+
+    if not text or not text.strip():
+        return []
+    spans = _token_spans(text, tokenizer)
+    if len(spans) <= size:
+        return [text.strip()]
+
+    chunks = []
+    step = size - overlap
+    for start in range(0, len(spans), step):
+        window = spans[start:start + size]
+        chunks.append(text[window[0][0]:window[-1][1]].strip())
+        if start + size >= len(spans):
+            break
+    return chunks
+
+
+def chunk_stream(
+    blocks: Iterable[str],
+    size: int | None = None,
+    overlap: int | None = None,
+    tokenizer=None,
+) -> Iterator[str]:
+    """
+    chunk_text() over a document that arrives in pieces (e.g. blocks of a
+    large file). Yields the same chunks while holding only one piece plus
+    one chunk in memory: the last, possibly cut, chunk of every piece is
+    carried over and chunked again with the next one.
+    """
+    carry = ""
+    for block in blocks:
+        text = carry + block
+        chunks = chunk_text(text, size, overlap, tokenizer)
+        if len(chunks) <= 1:
+            carry = text
+            continue
+        yield from chunks[:-1]
+        # restart at the last chunk's position on the window grid
+        carry = text[text.rindex(chunks[-1]):]
+    yield from chunk_text(carry, size, overlap, tokenizer)
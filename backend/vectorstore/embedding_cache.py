@@ -0,0 +1,243 @@
+import contextlib
+import fcntl
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Keys per SQLite IN (...) lookup, below the bound-variable limit
+_LOOKUP_CHUNK = 500
+
+
+def embedding_key(model: str, text: str) -> str:
+    """
+    Content address of an embedding: sha256 of model name + exact text.
+    """
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Two-tier embedding cache keyed by embedding_key():
+    - in-memory LRU of float32 vectors
+    - optional on-disk tier: a memmapped float32 matrix of
+      `max_disk_items` rows plus a SQLite index of key -> row.
+      Rows are reused round-robin once the matrix is full.
+    The disk tier is created on the first write, once the vector
+    dimension is known. It can be shared by several processes (API
+    workers, scripts.ingest): row allocation and writes hold an exclusive
+    file lock, disk reads a shared one, and the next free row lives in
+    SQLite rather than in the process.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        directory: str | None = None,
+        max_memory_items: int = 10000,
+        max_disk_items: int = 100000,
+    ):
+        self.model = model
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        self._matrix = None
+        self._matrix_path = None
+        self._dim = None
+        self._lock_file = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            slug = model.replace("/", "_")
+            self._matrix_path = os.path.join(directory, f"{slug}.f32")
+            self._lock_file = open(os.path.join(directory, f"{slug}.lock"), "a")
+            self._db = sqlite3.connect(
+                os.path.join(directory, f"{slug}.sqlite3"), check_same_thread=False
+            )
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_index (
+                    key TEXT PRIMARY KEY,
+                    row INTEGER NOT NULL UNIQUE
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_meta (name TEXT PRIMARY KEY, value INTEGER)"
+            )
+            self._db.commit()
+            with self._disk_lock(exclusive=False):
+                meta = self._meta()
+                if meta.get("capacity") == max_disk_items and meta.get("dim"):
+                    self._open_matrix(meta["dim"], "r+")
+
+    @contextlib.contextmanager
+    def _disk_lock(self, exclusive: bool):
+        """Cross-process lock on the disk tier (threads hold self._lock)."""
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _meta(self) -> dict:
+        return dict(self._db.execute("SELECT name, value FROM embedding_meta"))
+
+    def _open_matrix(self, dim: int, mode: str):
+        """Maps the on-disk matrix. Caller holds the lock (or is __init__)."""
+        if mode == "r+" and not os.path.exists(self._matrix_path):
+            mode = "w+"
+        self._dim = dim
+        self._matrix = np.memmap(
+            self._matrix_path, dtype=np.float32, mode=mode,
+            shape=(self.max_disk_items, dim),
+        )
+
+    def _init_disk(self, dim: int):
+        """
+        Creates a fresh disk tier for `dim`-sized vectors.
+        Caller holds the lock and the exclusive disk lock.
+        """
+        logger.info(f"Creating embedding disk cache ({self.max_disk_items} x {dim}).")
+        self._db.execute("DELETE FROM embedding_index")
+        self._db.executemany(
+            "INSERT OR REPLACE INTO embedding_meta (name, value) VALUES (?, ?)",
+            [("dim", dim), ("capacity", self.max_disk_items), ("next_row", 0)],
+        )
+        self._db.commit()
+        self._open_matrix(dim, "w+")
+
+    def _remember(self, key: str, vector: np.ndarray):
+        """Inserts into the LRU tier. Caller holds the lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, texts: list[str]) -> list[np.ndarray | None]:
+        """
+        Returns the cached vector for each text, or None on a miss.
+        """
+        keys = [embedding_key(self.model, text) for text in texts]
+        found: list[np.ndarray | None] = [None] * len(texts)
+        with self._lock:
+            missing = []
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    found[i] = vector
+                else:
+                    missing.append(i)
+
+            if missing and self._matrix is not None:
+                wanted = list({keys[i] for i in missing})
+                # shared lock: no other process reassigns rows meanwhile
+                with self._disk_lock(exclusive=False):
+                    rows = {}
+                    for start in range(0, len(wanted), _LOOKUP_CHUNK):
+                        chunk = wanted[start:start + _LOOKUP_CHUNK]
+                        placeholders = ",".join("?" * len(chunk))
+                        rows.update(self._db.execute(
+                            f"SELECT key, row FROM embedding_index WHERE key IN ({placeholders})",
+                            tuple(chunk),
+                        ))
+                    for i in missing:
+                        row = rows.get(keys[i])
+                        if row is None:
+                            continue
+                        vector = np.array(self._matrix[row])
+                        self._remember(keys[i], vector)
+                        self.disk_hits += 1
+                        found[i] = vector
+
+            self.misses += sum(1 for vector in found if vector is None)
+        return found
+
+    def set_many(self, texts: list[str], vectors) -> None:
+        """
+        Stores vectors (one per text) in both tiers.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        keys = [embedding_key(self.model, text) for text in texts]
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._db is None:
+                return
+            dim = vectors.shape[1]
+            with self._disk_lock(exclusive=True):
+                meta = self._meta()
+                if meta.get("dim") != dim or meta.get("capacity") != self.max_disk_items:
+                    self._init_disk(dim)
+                    meta = self._meta()
+                elif self._matrix is None or self._dim != dim:
+                    # created by another process since we looked
+                    self._open_matrix(dim, "r+")
+
+                next_row = meta.get("next_row", 0)
+                for key, vector in zip(keys, vectors):
+                    (exists,) = self._db.execute(
+                        "SELECT COUNT(*) FROM embedding_index WHERE key = ?", (key,)
+                    ).fetchone()
+                    if exists:
+                        continue
+                    row = next_row
+                    next_row = (row + 1) % self.max_disk_items
+                    self._matrix[row] = vector
+                    self._db.execute("DELETE FROM embedding_index WHERE row = ?", (row,))
+                    self._db.execute(
+                        "INSERT INTO embedding_index (key, row) VALUES (?, ?)", (key, row)
+                    )
+                self._matrix.flush()
+                self._db.execute(
+                    "UPDATE embedding_meta SET value = ? WHERE name = 'next_row'",
+                    (next_row,),
+                )
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                with self._disk_lock(exclusive=True):
+                    self._db.execute("DELETE FROM embedding_index")
+                    self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            disk_items = 0
+            if self._db is not None:
+                (disk_items,) = self._db.execute(
+                    "SELECT COUNT(*) FROM embedding_index"
+                ).fetchone()
+            return {
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": disk_items,
+            }
@@ -0,0 +1,142 @@
+import heapq
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Words plus joined identifiers such as SKUs ("ab-1234", "v2.1")
+_TOKEN = re.compile(r"\w+(?:[-./]\w+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased terms. Joined identifiers are kept whole and also split
+    into their parts, so "XR-200" matches both "xr-200" and "xr 200".
+    """
+    tokens = []
+    for match in _TOKEN.findall(text.lower()):
+        tokens.append(match)
+        if not match.isalnum():
+            tokens.extend(part for part in re.split(r"[-./]", match) if part)
+    return tokens
+
+
+def matches(meta: dict | None, where: dict | None) -> bool:
+    """
+    Evaluates the subset of Chroma `where` syntax build_where() produces:
+    equality, $eq, $in and $and.
+    """
+    if not where:
+        return True
+    meta = meta or {}
+    if "$and" in where:
+        return all(matches(meta, condition) for condition in where["$and"])
+    for key, expected in where.items():
+        value = meta.get(key)
+        if isinstance(expected, dict):
+            if "$in" in expected and value not in expected["$in"]:
+                return False
+            if "$eq" in expected and value != expected["$eq"]:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class BM25Index:
+    """
+    In-process BM25 inverted index over the memory documents, kept in
+    sync with Chroma by vectorstore.store (add / refresh / delete).
+    Stores per-document term frequencies, length, metadata (for `where`
+    filters) and the collection the document lives in.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self._terms: dict[str, list[str]] = {}
+        self._lengths: dict[str, int] = {}
+        self._metadata: dict[str, dict] = {}
+        self._collection: dict[str, str] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def _remove(self, doc_id: str):
+        """Caller holds the lock."""
+        terms = self._terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc_id, 0)
+        self._metadata.pop(doc_id, None)
+        self._collection.pop(doc_id, None)
+
+    def add(
+        self,
+        ids: list[str],
+        texts: list[str],
+        metadatas: list[dict | None],
+        collection: str,
+    ):
+        """Indexes (or re-indexes) documents."""
+        with self._lock:
+            for doc_id, text, meta in zip(ids, texts, metadatas):
+                self._remove(doc_id)
+                counts = Counter(tokenize(text or ""))
+                for term, tf in counts.items():
+                    self._postings[term][doc_id] = tf
+                self._terms[doc_id] = list(counts)
+                length = sum(counts.values())
+                self._lengths[doc_id] = length
+                self._total_length += length
+                self._metadata[doc_id] = meta or {}
+                self._collection[doc_id] = collection
+
+    def remove(self, ids: list[str]):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def collection_of(self, doc_id: str) -> str | None:
+        return self._collection.get(doc_id)
+
+    def search(self, query: str, k: int = 10, where: dict | None = None) -> list[tuple[str, float]]:
+        """
+        Returns up to k (doc_id, bm25 score) pairs, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            count = len(self._lengths)
+            if not terms or not count:
+                return []
+            avg_length = self._total_length / count
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            if where:
+                scores = {
+                    doc_id: score for doc_id, score in scores.items()
+                    if matches(self._metadata.get(doc_id), where)
+                }
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
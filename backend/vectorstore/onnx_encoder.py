@@ -0,0 +1,148 @@
+import logging
+import os
+
+import numpy as np
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def export_onnx(model_name: str, directory: str, quantize: bool = True) -> str:
+    """
+    Exports the transformer of a sentence-transformers model to ONNX
+    (plus its tokenizer), optionally with dynamic int8 weight quantisation.
+    Needs torch; only runs once, the exported files are reused afterwards.
+
+    Returns:
+    - path of the .onnx file to load
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(directory, exist_ok=True)
+    fp32_path = os.path.join(directory, "model.onnx")
+    int8_path = os.path.join(directory, "model_int8.onnx")
+
+    if not os.path.exists(fp32_path):
+        logger.info(f"Exporting {model_name} to ONNX in {directory}...")
+        st_model = SentenceTransformer(model_name, device="cpu")
+        transformer = st_model[0].auto_model.eval()
+        tokenizer = st_model.tokenizer
+        tokenizer.save_pretrained(directory)
+        with open(os.path.join(directory, "max_seq_length"), "w") as f:
+            f.write(str(st_model.max_seq_length))
+
+        sample = tokenizer(["warm-up"], return_tensors="pt")
+        dynamic = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+                fp32_path,
+                input_names=["input_ids", "attention_mask", "token_type_ids"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={
+                    "input_ids": dynamic,
+                    "attention_mask": dynamic,
+                    "token_type_ids": dynamic,
+                    "last_hidden_state": dynamic,
+                },
+                opset_version=14,
+            )
+
+    if not quantize:
+        return fp32_path
+
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info("Quantising ONNX embedding model to int8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    return int8_path
+
+
+class OnnxEncoder:
+    """
+    CPU embedding encoder running a MiniLM-style sentence-transformer
+    through ONNX Runtime: tokenise, run the transformer, mean-pool over
+    the attention mask and L2-normalise (same pipeline as
+    all-MiniLM-L6-v2). Exposes the subset of SentenceTransformer.encode()
+    used by vectorstore.store.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        directory: str,
+        quantize: bool = True,
+        threads: int = 0,
+    ):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(
+            directory, "model_int8.onnx" if quantize else "model.onnx"
+        )
+        if not os.path.exists(model_path):
+            model_path = export_onnx(model_name, directory, quantize)
+
+        self.tokenizer = AutoTokenizer.from_pretrained(directory)
+        self.max_seq_length = 256
+        length_path = os.path.join(directory, "max_seq_length")
+        if os.path.exists(length_path):
+            with open(length_path) as f:
+                self.max_seq_length = int(f.read().strip())
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(
+            model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model {model_path}")
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.session.get_outputs()[0].shape[-1]
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        tokens = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        feeds = {
+            name: tokens[name].astype(np.int64)
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+            if name in self._input_names and name in tokens
+        }
+        if "token_type_ids" in self._input_names and "token_type_ids" not in feeds:
+            feeds["token_type_ids"] = np.zeros_like(feeds["input_ids"])
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = tokens["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, **_):
+        """
+        Encodes a string or list of strings into normalised float32 vectors.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Sort by length so each batch pads to similar sizes
+        order = np.argsort([-len(text) for text in texts])
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            chunk = [texts[i] for i in order[start:start + batch_size]]
+            chunks.append(self._encode_batch(chunk))
+        vectors = np.concatenate(chunks)[np.argsort(order)]
+        return vectors[0] if single else vectors
@@ -0,0 +1,319 @@
+import fcntl
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from core.config import settings
+from vectorstore import store
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Page size for scanning / copying collections
+_PAGE = 1000
+
+
+def load_policies(raw: str | None = None) -> dict:
+    """
+    Retention policies per memory type, from MEMORY_RETENTION_POLICIES:
+
+        {"persona": {"max_age_days": 30, "keep_last_per_product": 5},
+         "*": {"max_age_days": 180, "max_count": 50000}}
+
+    "*" applies to every type without its own entry (including untyped
+    documents). Supported keys: max_age_days, max_count,
+    keep_last_per_product.
+    """
+    raw = settings.MEMORY_RETENTION_POLICIES if raw is None else raw
+    if not raw:
+        return {}
+    try:
+        policies = json.loads(raw)
+    except ValueError as e:
+        logger.error(f"Invalid MEMORY_RETENTION_POLICIES, retention disabled: {e}")
+        return {}
+    return policies if isinstance(policies, dict) else {}
+
+
+def _timestamp(meta: dict) -> float | None:
+    value = meta.get("updated_at", meta.get("created_at"))
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _scan(collection) -> tuple[list[str], list[dict]]:
+    ids, metadatas = [], []
+    offset = 0
+    while True:
+        page = collection.get(include=["metadatas"], limit=_PAGE, offset=offset)
+        page_ids = page.get("ids") or []
+        ids.extend(page_ids)
+        metadatas.extend(page.get("metadatas") or [{}] * len(page_ids))
+        if len(page_ids) < _PAGE:
+            return ids, metadatas
+        offset += _PAGE
+
+
+def expired_ids(ids: list[str], metadatas: list[dict], policies: dict, now: float) -> set[str]:
+    """
+    Applies the retention policies to one collection's records.
+
+    Rules apply to documents, not chunks: the chunks of a document (same
+    parent_id) are kept or expired together, dated by their newest chunk.
+    Documents without timestamps are never considered too old, and are
+    ranked as oldest for the count-based rules.
+    """
+    # type -> parent key -> [(doc_id, meta)]
+    by_type = defaultdict(lambda: defaultdict(list))
+    for doc_id, meta in zip(ids, metadatas):
+        meta = meta or {}
+        parent = meta.get("parent_id") or doc_id
+        by_type[meta.get("type")][parent].append((doc_id, meta))
+
+    expired = set()
+    for memory_type, documents in by_type.items():
+        policy = policies.get(memory_type) or policies.get("*")
+        if not policy:
+            continue
+
+        stamps = {}
+        for parent, records in documents.items():
+            known = [stamp for stamp in (_timestamp(meta) for _, meta in records) if stamp is not None]
+            stamps[parent] = max(known) if known else None
+
+        expired_parents = set()
+        max_age_days = policy.get("max_age_days")
+        if max_age_days:
+            cutoff = now - float(max_age_days) * 86400
+            for parent, stamp in stamps.items():
+                if stamp is not None and stamp < cutoff:
+                    expired_parents.add(parent)
+
+        # newest first for the keep-last rules
+        live = sorted(
+            (parent for parent in documents if parent not in expired_parents),
+            key=lambda parent: stamps[parent] or 0.0,
+            reverse=True,
+        )
+
+        keep_per_product = policy.get("keep_last_per_product")
+        if keep_per_product:
+            seen = defaultdict(int)
+            for parent in live:
+                product = documents[parent][0][1].get("product_text")
+                if product is None:
+                    continue
+                seen[product] += 1
+                if seen[product] > int(keep_per_product):
+                    expired_parents.add(parent)
+
+        max_count = policy.get("max_count")
+        if max_count:
+            remaining = [parent for parent in live if parent not in expired_parents]
+            expired_parents.update(remaining[int(max_count):])
+
+        for parent in expired_parents:
+            expired.update(doc_id for doc_id, _ in documents[parent])
+
+    return expired
+
+
+def _drop_collection(client, name: str):
+    try:
+        client.delete_collection(name)
+    except ValueError:
+        # does not exist
+        pass
+
+
+def _recover(name: str):
+    """
+    Finishes or rolls back a swap interrupted by a crash: if the live
+    collection is missing or empty while a backup holds data, the backup
+    is put back; any other leftover backup / copy is dropped.
+    """
+    client = store.get_chroma_client()
+    existing = {collection.name for collection in client.list_collections()}
+    backup_name = f"{name}__backup"
+    if backup_name in existing:
+        backup = client.get_collection(backup_name)
+        live_count = client.get_collection(name).count() if name in existing else 0
+        if live_count == 0 and backup.count() > 0:
+            logger.warning(f"Restoring {name} from {backup_name} after an interrupted rebuild.")
+            _drop_collection(client, name)
+            backup.modify(name=name)
+            store.replace_collection(name, backup)
+            store.bump_collections_generation()
+        else:
+            _drop_collection(client, backup_name)
+    if f"{name}__compact" in existing:
+        _drop_collection(client, f"{name}__compact")
+
+
+def _rebuild(name: str, collection):
+    """
+    Copies the live records into a fresh collection and swaps it in under
+    the original name, so the HNSW index no longer carries deleted entries.
+
+    The old collection is renamed to a backup before the copy takes its
+    name and is only dropped afterwards, so the data exists under some
+    name at every step (see _recover).
+    """
+    client = store.get_chroma_client()
+    temp_name = f"{name}__compact"
+    backup_name = f"{name}__backup"
+    _drop_collection(client, temp_name)
+    _drop_collection(client, backup_name)
+    target = client.create_collection(name=temp_name, metadata=collection.metadata)
+
+    offset = 0
+    while True:
+        page = collection.get(
+            include=["documents", "embeddings", "metadatas"], limit=_PAGE, offset=offset
+        )
+        page_ids = page.get("ids") or []
+        if page_ids:
+            target.add(
+                ids=page_ids,
+                documents=page["documents"],
+                embeddings=page["embeddings"],
+                metadatas=page["metadatas"],
+            )
+        if len(page_ids) < _PAGE:
+            break
+        offset += _PAGE
+
+    collection.modify(name=backup_name)
+    target.modify(name=name)
+    store.replace_collection(name, target)
+    store.bump_collections_generation()
+    client.delete_collection(backup_name)
+
+
+def _directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                total += os.path.getsize(os.path.join(root, file))
+            except OSError:
+                continue
+    return total
+
+
+@store.remote("compact")
+def compact(dry_run: bool = False, rebuild: bool | None = None) -> dict:
+    """
+    Deletes documents expired by the retention policies and, when enough
+    of a collection was deleted (MEMORY_COMPACT_REBUILD_RATIO) or
+    `rebuild` is True, rebuilds its index.
+
+    Queued write-behind writes are flushed first, and writes are held
+    for the duration of the compaction.
+
+    Returns:
+    - per-collection counts before/after, deleted ids count, whether the
+      index was rebuilt, and the store's disk size before/after
+    """
+    started = time.perf_counter()
+    policies = load_policies()
+    store.flush_memory(timeout=30)
+    size_before = _directory_size(settings.PERSIST_DIRECTORY)
+
+    report = {"dry_run": dry_run, "policies": policies, "collections": {}}
+    now = time.time()
+    with store.writing(exclusive=True):
+        for name in store.all_collection_names():
+            _recover(name)
+            collection = store.get_collection(name)
+            ids, metadatas = _scan(collection)
+            expired = expired_ids(ids, metadatas, policies, now)
+            entry = {"before": len(ids), "expired": len(expired), "rebuilt": False}
+
+            if not dry_run:
+                expired_list = list(expired)
+                for start in range(0, len(expired_list), _PAGE):
+                    collection.delete(ids=expired_list[start:start + _PAGE])
+                store.forget_lexical(expired_list)
+
+                ratio = len(expired) / len(ids) if ids else 0.0
+                should_rebuild = rebuild if rebuild is not None else (
+                    expired and ratio >= settings.MEMORY_COMPACT_REBUILD_RATIO
+                )
+                if should_rebuild:
+                    _rebuild(name, collection)
+                    entry["rebuilt"] = True
+
+            entry["after"] = store.get_collection(name).count()
+            report["collections"][name] = entry
+
+    report["disk_bytes_before"] = size_before
+    report["disk_bytes_after"] = _directory_size(settings.PERSIST_DIRECTORY)
+    report["duration_s"] = round(time.perf_counter() - started, 3)
+    logger.info(f"Memory compaction finished: {report['collections']}")
+    return report
+
+
+_stop = threading.Event()
+_thread = None
+# Held for the life of the process that runs the scheduled job
+_scheduler_lock = None
+
+
+def _is_scheduler() -> bool:
+    """
+    Only one process per store runs the scheduled compaction: the first
+    to take the scheduler file lock keeps it until it exits.
+    """
+    global _scheduler_lock
+    if _scheduler_lock is not None:
+        return True
+    lock_file = open(store.store_path(".compaction.lock"), "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _scheduler_lock = lock_file
+    logger.info(f"Process {os.getpid()} runs the scheduled memory compaction.")
+    return True
+
+
+def _compaction_loop(interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        if not _is_scheduler():
+            continue
+        try:
+            compact()
+        except Exception as e:
+            logger.error(f"Scheduled memory compaction failed: {e}")
+
+
+def start_compaction_job() -> bool:
+    """
+    Starts the background compaction thread if
+    MEMORY_COMPACTION_INTERVAL_SECONDS > 0. Returns whether it runs.
+
+    API workers that use the vector service leave the job to the service;
+    otherwise every worker starts the thread but only the one holding the
+    scheduler lock compacts (see _is_scheduler).
+    """
+    global _thread
+    interval = settings.MEMORY_COMPACTION_INTERVAL_SECONDS
+    if store.remote_enabled():
+        return False
+    if interval <= 0 or _thread is not None:
+        return _thread is not None
+    _thread = threading.Thread(
+        target=_compaction_loop, args=(interval, _stop), name="memory-compaction", daemon=True
+    )
+    _thread.start()
+    logger.info(f"Memory compaction job scheduled every {interval}s.")
+    return True
+
+
+def stop_compaction_job():
+    _stop.set()
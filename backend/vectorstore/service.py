@@ -0,0 +1,212 @@
+"""
+Shared embedding / storage service.
+
+Owns the embedding model and the Chroma client for every API worker on
+the host and serves vectorstore.store calls over a Unix socket. Embedding
+and search requests arriving from different workers within
+VECTOR_SERVICE_BATCH_WINDOW_MS are merged into one encoder / Chroma call.
+
+Run (from backend/):
+    python -m vectorstore.service [--socket PATH]
+and point the API workers at it with VECTOR_SERVICE_SOCKET=PATH.
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from core.config import settings
+from vectorstore import retention, store
+from vectorstore.service_client import FRAME_HEADER
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Calls whose inputs are lists of texts and can be merged across requests
+BATCHABLE = {
+    "embed": store.embed,
+    "search_many": store.search_many,
+    "hybrid_search_many": store.hybrid_search_many,
+}
+
+# Everything else is executed as is
+METHODS = {
+    "add_documents": store.add_documents,
+    "upsert_documents": store.upsert_documents,
+    "collection_counts": store.collection_counts,
+    "embedding_cache_stats": store.embedding_cache_stats,
+    "compact": retention.compact,
+    "warm_up": store.warm_up,
+    "ping": lambda: {"pid": os.getpid()},
+}
+
+
+class DynamicBatcher:
+    """
+    Collects batchable calls for up to `window_ms` (or `max_items` texts)
+    and runs each group of compatible calls (same method and options)
+    as one call, then hands every caller its slice of the result.
+    """
+
+    def __init__(self, executor: ThreadPoolExecutor, window_ms: float = 5, max_items: int = 256):
+        self.executor = executor
+        self.window = window_ms / 1000
+        self.max_items = max_items
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.calls = 0
+        self.batches = 0
+
+    async def submit(self, method: str, texts: list, options: dict):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((method, texts, options, future))
+        return await future
+
+    async def run(self):
+        while True:
+            pending = [await self._queue.get()]
+            size = len(pending[0][1])
+            deadline = time.monotonic() + self.window
+            while size < self.max_items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(item)
+                size += len(item[1])
+
+            groups = {}
+            for item in pending:
+                method, _, options, _ = item
+                key = (method, json.dumps(options, sort_keys=True, default=str))
+                groups.setdefault(key, []).append(item)
+            for (method, _), items in groups.items():
+                asyncio.ensure_future(self._execute(method, items))
+
+    async def _execute(self, method: str, items: list):
+        texts = [text for _, batch, _, _ in items for text in batch]
+        options = items[0][2]
+        self.calls += len(items)
+        self.batches += 1
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: BATCHABLE[method](texts, **options)
+            )
+        except Exception as e:
+            for *_, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        offset = 0
+        for _, batch, _, future in items:
+            if not future.done():
+                future.set_result(results[offset:offset + len(batch)])
+            offset += len(batch)
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> dict:
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return json.loads(await reader.readexactly(size))
+
+
+def _write_frame(writer: asyncio.StreamWriter, payload: dict):
+    data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    writer.write(FRAME_HEADER.pack(len(data)) + data)
+
+
+async def _handle(request: dict, batcher: DynamicBatcher, executor: ThreadPoolExecutor):
+    method = request.get("method")
+    args = request.get("args") or []
+    kwargs = request.get("kwargs") or {}
+    if method in BATCHABLE:
+        texts, options = _split_call(method, args, kwargs)
+        return await batcher.submit(method, list(texts), options)
+    if method in METHODS:
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, lambda: METHODS[method](*args, **kwargs)
+        )
+    raise ValueError(f"unknown method: {method}")
+
+
+def _split_call(method: str, args: list, kwargs: dict) -> tuple[list, dict]:
+    """
+    Binds a batchable call's arguments (positional or keyword) to its
+    signature and returns (texts, the other options as keywords).
+    """
+    signature = inspect.signature(BATCHABLE[method])
+    options = dict(signature.bind(*args, **kwargs).arguments)
+    texts = options.pop(next(iter(signature.parameters)))
+    return texts, options
+
+
+async def serve(path: str):
+    executor = ThreadPoolExecutor(
+        max_workers=settings.VECTOR_SERVICE_THREADS, thread_name_prefix="vector-service"
+    )
+    batcher = DynamicBatcher(
+        executor,
+        window_ms=settings.VECTOR_SERVICE_BATCH_WINDOW_MS,
+        max_items=settings.VECTOR_SERVICE_MAX_BATCH,
+    )
+
+    async def connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await _read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    result = await _handle(request, batcher, executor)
+                    _write_frame(writer, {"ok": True, "result": result})
+                except Exception as e:
+                    logger.error(f"Vector service call {request.get('method')} failed: {e}")
+                    _write_frame(writer, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+                await writer.drain()
+        finally:
+            writer.close()
+
+    if os.path.exists(path):
+        os.unlink(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # Load the model and open Chroma before accepting connections
+    await asyncio.get_running_loop().run_in_executor(executor, store.warm_up)
+    server = await asyncio.start_unix_server(connection, path=path)
+    batch_task = asyncio.ensure_future(batcher.run())
+    retention.start_compaction_job()
+    logger.info(f"Vector service listening on {path} (pid {os.getpid()})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        batch_task.cancel()
+        retention.stop_compaction_job()
+        store.memory_writer.close()
+        logger.info(f"Vector service stopped after {batcher.calls} batched calls in {batcher.batches} batches.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared embedding / storage service")
+    parser.add_argument("--socket", default=settings.VECTOR_SERVICE_SOCKET or "/tmp/uhpm-vector.sock")
+    args = parser.parse_args()
+
+    # This process owns the model and Chroma: never forward to itself
+    store.serve_locally()
+    try:
+        asyncio.run(serve(args.socket))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
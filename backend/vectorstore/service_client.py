@@ -0,0 +1,140 @@
+import json
+import logging
+import socket
+import struct
+import threading
+from typing import Any
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Frame header: 4-byte big-endian payload length
+FRAME_HEADER = struct.Struct(">I")
+
+
+class VectorServiceError(RuntimeError):
+    """A call failed inside the vector service."""
+
+
+class VectorServiceUnavailable(VectorServiceError):
+    """The vector service could not be reached; the call was not delivered."""
+
+
+# Safe to send again when the connection drops after the request went out
+IDEMPOTENT = {
+    "embed", "search_many", "hybrid_search_many", "collection_counts",
+    "embedding_cache_stats", "warm_up", "ping",
+}
+
+# Calls that may legitimately run longer than the client timeout
+UNBOUNDED = {"compact"}
+
+
+def send_frame(sock: socket.socket, payload: dict):
+    data = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+    sock.sendall(FRAME_HEADER.pack(len(data)) + data)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("vector service closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> dict:
+    (size,) = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    return json.loads(_recv_exact(sock, size))
+
+
+class VectorServiceClient:
+    """
+    Blocking client for vectorstore.service over a Unix socket.
+    One connection per calling thread.
+
+    A call is retried on a fresh connection only if it certainly never
+    reached the service (connect failed, or a stale pooled connection
+    broke while sending) or, for IDEMPOTENT methods, if the connection
+    dropped while waiting for the answer. Timeouts are never retried:
+    the service may still be working on the call.
+    """
+
+    def __init__(self, path: str, timeout: float = 60.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            sock.close()
+            raise
+        self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+            self._local.sock = None
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        request = {"method": method, "args": list(args), "kwargs": kwargs}
+        for attempt in range(2):
+            pooled = getattr(self._local, "sock", None)
+            try:
+                sock = pooled or self._connect()
+            except OSError as e:
+                self._close()
+                raise VectorServiceUnavailable(
+                    f"vector service at {self.path} unavailable: {e}"
+                ) from e
+            sock.settimeout(None if method in UNBOUNDED else self.timeout)
+
+            try:
+                send_frame(sock, request)
+            except socket.timeout as e:
+                self._close()
+                raise VectorServiceError(f"vector service {method} timed out while sending") from e
+            except OSError as e:
+                # EPIPE / reset: the service had closed this connection
+                # before it could read the request
+                self._close()
+                if attempt or pooled is None:
+                    raise VectorServiceUnavailable(
+                        f"vector service at {self.path} unavailable: {e}"
+                    ) from e
+                logger.warning(f"Vector service connection was closed, reconnecting: {e}")
+                continue
+
+            try:
+                response = recv_frame(sock)
+                break
+            except socket.timeout as e:
+                self._close()
+                raise VectorServiceError(
+                    f"vector service {method} timed out after {self.timeout}s"
+                ) from e
+            except (OSError, ValueError) as e:
+                self._close()
+                if attempt or method not in IDEMPOTENT:
+                    # the request may have been executed: do not resend
+                    raise VectorServiceError(
+                        f"vector service connection lost during {method}: {e}"
+                    ) from e
+                logger.warning(f"Vector service connection lost, retrying {method}: {e}")
+
+        if not response.get("ok"):
+            raise VectorServiceError(response.get("error", "unknown vector service error"))
+        return response.get("result")
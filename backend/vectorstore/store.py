@@ -1,50 +1,1163 @@
+import asyncio
+import atexit
+import contextlib
+import fcntl
+import functools
+import hashlib
+import heapq
+import logging
+import os
+import queue
+import threading
+import time
 import uuid
 
-import chromadb
-from sentence_transformers import SentenceTransformer
 from core.config import settings
+from vectorstore.embedding_cache import EmbeddingCache
+from vectorstore.chunking import chunk_text
+from vectorstore.lexical import BM25Index
+from vectorstore.service_client import VectorServiceClient, VectorServiceUnavailable
 
-# load embedding model
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
 
-# init persistent client
-chroma_client = chromadb.PersistentClient(path=settings.PERSIST_DIRECTORY)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 
-# load/create collection
-collection = chroma_client.get_or_create_collection(
-    name="uhpm_collection",
-    metadata={"hnsw:space": "cosine"}
-)
+# Lazily initialised: importing this module must not load the model
+# or open Chroma (see get_embedding_model / get_collection / warm_up)
+_embedding_model = None
+_embedding_cache = None
+_chroma_client = None
+_collections = {}
+_lexical_index = None
+# collection counts / times behind the BM25 index (see get_lexical_index)
+_lexical_counts = None
+_lexical_checked_at = 0.0
+_lexical_built_at = 0.0
+_model_lock = threading.Lock()
+_chroma_lock = threading.Lock()
+_lexical_lock = threading.Lock()
+# Serialises writes with maintenance (retention/compaction); see writing()
+write_lock = threading.RLock()
+_writing = threading.local()
+# Bumped by compaction when it swaps a rebuilt collection in, so other
+# processes drop their cached collection handles (see get_collection)
+_GENERATION_FILE = ".collections_generation"
+_collections_generation = None
+
+
+# Shared vector service (see vectorstore.service): when
+# VECTOR_SERVICE_SOCKET is set, the @remote functions below run in the
+# service process instead of loading the model / Chroma here
+_serving_locally = False
+_service_client = None
+
+
+def serve_locally():
+    """Marks this process as the vector service itself (no forwarding)."""
+    global _serving_locally
+    _serving_locally = True
+
+
+def remote_enabled() -> bool:
+    return bool(settings.VECTOR_SERVICE_SOCKET) and not _serving_locally
+
+
+def get_service_client() -> VectorServiceClient:
+    global _service_client
+    if _service_client is None:
+        _service_client = VectorServiceClient(
+            settings.VECTOR_SERVICE_SOCKET, timeout=settings.VECTOR_SERVICE_TIMEOUT_SECONDS
+        )
+    return _service_client
+
+
+def remote(method: str):
+    """
+    Forwards calls to the shared vector service when one is configured.
+    With VECTOR_SERVICE_FALLBACK_LOCAL an unreachable service falls back
+    to running the call in this process.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not remote_enabled():
+                return fn(*args, **kwargs)
+            try:
+                return get_service_client().call(method, *args, **kwargs)
+            except VectorServiceUnavailable as e:
+                if not settings.VECTOR_SERVICE_FALLBACK_LOCAL:
+                    raise
+                logger.warning(f"{e} - running {method} locally.")
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def embedding_model_id() -> str:
+    """
+    Model name plus encoder backend. ONNX/int8 vectors differ slightly
+    from the torch ones, so each backend gets its own cache entries.
+    """
+    if settings.EMBED_BACKEND == "onnx":
+        return f"{EMBEDDING_MODEL_NAME}/onnx{'-int8' if settings.EMBED_ONNX_QUANTIZE else ''}"
+    return EMBEDDING_MODEL_NAME
+
+
+def get_embedding_model():
+    """Loads the encoder selected by EMBED_BACKEND on first use."""
+    global _embedding_model
+    if _embedding_model is None:
+        with _model_lock:
+            if _embedding_model is None:
+                logger.info(f"Loading embedding model {embedding_model_id()}...")
+                if settings.EMBED_BACKEND == "onnx":
+                    from vectorstore.onnx_encoder import OnnxEncoder
+
+                    _embedding_model = OnnxEncoder(
+                        EMBEDDING_MODEL_NAME,
+                        directory=os.path.join(settings.EMBED_ONNX_DIR, EMBEDDING_MODEL_NAME),
+                        quantize=settings.EMBED_ONNX_QUANTIZE,
+                        threads=settings.EMBED_ONNX_THREADS,
+                    )
+                else:
+                    from sentence_transformers import SentenceTransformer
+
+                    _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _embedding_model
+
+
+def get_tokenizer():
+    """The encoder's tokenizer (for token-aware chunking), or None."""
+    return getattr(get_embedding_model(), "tokenizer", None)
+
+
+@remote("embedding_cache_stats")
+def embedding_cache_stats() -> dict:
+    """
+    Hit rate and tier sizes of the embedding cache doing the encoding
+    (the vector service's when one is configured).
+    """
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **embedding_cache.stats()}
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Content-addressed embedding cache, or None when disabled."""
+    global _embedding_cache
+    if _embedding_cache is None and settings.EMBED_CACHE_ENABLED:
+        with _model_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(
+                    model=embedding_model_id(),
+                    directory=settings.EMBED_CACHE_DIR or None,
+                    max_memory_items=settings.EMBED_CACHE_MAX_MEMORY_ITEMS,
+                    max_disk_items=settings.EMBED_CACHE_MAX_DISK_ITEMS,
+                )
+    return _embedding_cache
+
+
+def get_chroma_client():
+    """Opens the persistent Chroma client on first use."""
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                import chromadb
+
+                logger.info(f"Opening Chroma store at {settings.PERSIST_DIRECTORY}...")
+                _chroma_client = chromadb.PersistentClient(path=settings.PERSIST_DIRECTORY)
+    return _chroma_client
+
+
+DEFAULT_COLLECTION = "uhpm_collection"
+
+# Memory types the agents tag their documents with
+MEMORY_TYPES = ("persona", "research", "content", "experiment", "analytics")
+
+
+def collection_name(memory_type: str | None = None) -> str:
+    """
+    Collection a document of `memory_type` lives in. With
+    VECTOR_COLLECTION_PER_TYPE every known type gets its own collection
+    (smaller ANN index per search); otherwise everything shares one.
+    """
+    if settings.VECTOR_COLLECTION_PER_TYPE and memory_type in MEMORY_TYPES:
+        return f"uhpm_{memory_type}"
+    return DEFAULT_COLLECTION
+
+
+def store_path(filename: str) -> str:
+    """Path of a bookkeeping file next to the Chroma store."""
+    os.makedirs(settings.PERSIST_DIRECTORY, exist_ok=True)
+    return os.path.join(settings.PERSIST_DIRECTORY, filename)
+
+
+@contextlib.contextmanager
+def writing(exclusive: bool = False):
+    """
+    Holds write_lock plus a file lock on the store: shared for writes,
+    exclusive for maintenance. Compaction in one process thereby waits
+    for writes in every other process (API workers, scripts.ingest) and
+    the other way round. Re-entrant within a thread.
+    """
+    with write_lock:
+        if getattr(_writing, "depth", 0):
+            _writing.depth += 1
+            try:
+                yield
+            finally:
+                _writing.depth -= 1
+            return
+        with open(store_path(".write.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            _writing.depth = 1
+            try:
+                yield
+            finally:
+                _writing.depth = 0
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _generation_marker():
+    try:
+        stat = os.stat(os.path.join(settings.PERSIST_DIRECTORY, _GENERATION_FILE))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def bump_collections_generation():
+    """Tells every process to reopen its collections."""
+    path = store_path(_GENERATION_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(str(uuid.uuid4()))
+    os.replace(f"{path}.tmp", path)
+
+
+def get_collection(name: str = DEFAULT_COLLECTION):
+    """Loads/creates a memory collection on first use."""
+    global _collections_generation
+    marker = _generation_marker()
+    if marker != _collections_generation:
+        with _chroma_lock:
+            if marker != _collections_generation:
+                # a collection was rebuilt (possibly by another process)
+                _collections.clear()
+                _collections_generation = marker
+    collection = _collections.get(name)
+    if collection is None:
+        client = get_chroma_client()
+        with _chroma_lock:
+            collection = _collections.get(name)
+            if collection is None:
+                collection = _collections[name] = client.get_or_create_collection(
+                    name=name,
+                    metadata={"hnsw:space": "cosine"}
+                )
+    return collection
+
+
+@remote("collection_counts")
+def collection_counts() -> dict:
+    """Document count per memory collection."""
+    return {name: get_collection(name).count() for name in all_collection_names()}
+
+
+def replace_collection(name: str, collection):
+    """Points `name` at a new collection object (used after a rebuild)."""
+    with _chroma_lock:
+        _collections[name] = collection
+
+
+def all_collection_names() -> list[str]:
+    if settings.VECTOR_COLLECTION_PER_TYPE:
+        return [DEFAULT_COLLECTION] + [collection_name(t) for t in MEMORY_TYPES]
+    return [DEFAULT_COLLECTION]
+
+
+def _collection_counts() -> dict:
+    return {name: get_collection(name).count() for name in all_collection_names()}
+
+
+def _build_lexical_index() -> BM25Index:
+    started = time.perf_counter()
+    index = BM25Index()
+    page_size = 1000
+    for name in all_collection_names():
+        collection = get_collection(name)
+        offset = 0
+        while True:
+            page = collection.get(
+                include=["documents", "metadatas"], limit=page_size, offset=offset
+            )
+            page_ids = page.get("ids") or []
+            index.add(page_ids, page["documents"], page["metadatas"], name)
+            if len(page_ids) < page_size:
+                break
+            offset += page_size
+    logger.info(
+        f"Built BM25 index over {len(index)} documents in "
+        f"{time.perf_counter() - started:.2f}s"
+    )
+    return index
+
+
+def get_lexical_index() -> BM25Index:
+    """
+    BM25 index over all memory documents. Built from Chroma on first use,
+    then kept up to date incrementally by this process's writes.
+
+    Writes from other processes (other API workers, scripts.ingest, a
+    compaction elsewhere) are picked up by rebuilding when the collection
+    counts differ from what this index has seen (checked at most every
+    LEXICAL_INDEX_CHECK_SECONDS), and at least every
+    LEXICAL_INDEX_MAX_AGE_SECONDS for in-place refreshes that keep the
+    count. With the vector service all writes and hybrid searches run in
+    one process, so the index is always current there.
+    """
+    global _lexical_index, _lexical_counts, _lexical_checked_at, _lexical_built_at
+    now = time.monotonic()
+    if _lexical_index is not None and now - _lexical_checked_at < settings.LEXICAL_INDEX_CHECK_SECONDS:
+        return _lexical_index
+    with _lexical_lock:
+        if _lexical_index is not None:
+            if now - _lexical_checked_at < settings.LEXICAL_INDEX_CHECK_SECONDS:
+                return _lexical_index
+            _lexical_checked_at = now
+            max_age = settings.LEXICAL_INDEX_MAX_AGE_SECONDS
+            counts = _collection_counts()
+            if counts == _lexical_counts and not (max_age > 0 and now - _lexical_built_at > max_age):
+                return _lexical_index
+            logger.info("Memory changed outside this process, rebuilding BM25 index.")
+        # counts first: a write racing the build triggers another rebuild
+        counts = _collection_counts()
+        _lexical_index = _build_lexical_index()
+        _lexical_counts = counts
+        _lexical_checked_at = _lexical_built_at = time.monotonic()
+    return _lexical_index
+
+
+def _index_lexical(name: str, ids: list[str], texts: list[str], metadatas: list[dict]):
+    """Keeps an already built BM25 index in sync with a write."""
+    if _lexical_index is not None:
+        _lexical_index.add(ids, texts, metadatas, name)
+        with _lexical_lock:
+            if _lexical_counts is not None:
+                _lexical_counts[name] = get_collection(name).count()
+
+
+def forget_lexical(ids: list[str]):
+    """Drops deleted documents from an already built BM25 index."""
+    global _lexical_counts
+    if _lexical_index is not None:
+        _lexical_index.remove(ids)
+        with _lexical_lock:
+            _lexical_counts = _collection_counts()
+
+
+def build_where(
+    memory_type: str | list[str] | None = None,
+    channel: str | None = None,
+    product: str | None = None,
+) -> dict | None:
+    """
+    Chroma `where` clause for the metadata the agents write
+    (type, channel, product_text). Returns None when nothing is filtered.
+    """
+    conditions = []
+    if memory_type:
+        if isinstance(memory_type, list):
+            conditions.append({"type": {"$in": memory_type}})
+        else:
+            conditions.append({"type": memory_type})
+    if channel:
+        conditions.append({"channel": channel})
+    if product:
+        conditions.append({"product_text": product})
+
+    if not conditions:
+        return None
+    if len(conditions) == 1:
+        return conditions[0]
+    return {"$and": conditions}
+
+
+@remote("warm_up")
+def warm_up():
+    """
+    Loads the embedding model, opens the collection and runs one encode,
+    so the first request does not pay for initialisation.
+    """
+    started = time.perf_counter()
+    get_embedding_model().encode(["warm-up"], convert_to_numpy=True)
+    get_embedding_cache()
+    get_collection()
+    logger.info(f"Vector store warmed up in {time.perf_counter() - started:.2f}s")
+
+
+@remote("embed")
+def embed(texts: list[str], batch_size: int | None = None) -> list[list[float]]:
+    """
+    Encodes texts, serving repeats from the embedding cache and
+    encoding only the misses in one batched call.
+    """
+    embedding_model = get_embedding_model()
+    embedding_cache = get_embedding_cache()
+    if embedding_cache is None:
+        return embedding_model.encode(
+            texts, batch_size=batch_size or settings.EMBED_BATCH_SIZE,
+            convert_to_numpy=True,
+        ).tolist()
+
+    vectors = embedding_cache.get_many(texts)
+    missing = [i for i, vector in enumerate(vectors) if vector is None]
+    if missing:
+        # encode each distinct missing text once
+        unique = list(dict.fromkeys(texts[i] for i in missing))
+        encoded = embedding_model.encode(
+            unique, batch_size=batch_size or settings.EMBED_BATCH_SIZE,
+            convert_to_numpy=True,
+        )
+        embedding_cache.set_many(unique, encoded)
+        by_text = dict(zip(unique, encoded))
+        for i in missing:
+            vectors[i] = by_text[texts[i]]
+    return [vector.tolist() for vector in vectors]
 
 
 def add_document(text: str, metadata: dict | None = None):
-    doc_id = str(uuid.uuid4())
-    embedding = embedding_model.encode(text).tolist()
-
-    collection.add(
-        ids=[doc_id],
-        documents=[text],
-        embeddings=[embedding],
-        metadatas=[metadata or {"source": "manual"}],
+    return add_documents([text], [metadata])[0]
+
+
+def content_hash(text: str) -> str:
+    """Exact-duplicate key of a document (whitespace-insensitive)."""
+    return hashlib.sha256(" ".join(text.split()).encode("utf-8")).hexdigest()
+
+
+# Metadata a duplicate must share: memories for another product or
+# channel are distinct even when their text is the same
+_DEDUP_SCOPE = ("type", "product_text", "channel")
+
+
+def _dedup_key(meta: dict) -> tuple:
+    return (meta.get("content_hash"),) + tuple(meta.get(key) for key in _DEDUP_SCOPE)
+
+
+def _find_duplicates(
+    collection,
+    indices: list[int],
+    ids: list[str],
+    texts: list[str],
+    embeddings: list[list[float]],
+    metadatas: list[dict],
+) -> dict[int, str]:
+    """
+    Maps batch index -> id of an existing document it duplicates. Only
+    documents with the same type, product_text and channel (absent counts
+    as a value) are compared:
+    - same content hash as a stored document (exact duplicate)
+    - nearest neighbour with cosine similarity >= MEMORY_DEDUP_THRESHOLD
+      (near duplicate)
+    Exact repeats inside the batch map to their first occurrence's target.
+    """
+    duplicates = {}
+    hashes = list({metadatas[i]["content_hash"] for i in indices})
+    stored = collection.get(where={"content_hash": {"$in": hashes}}, include=["metadatas"])
+    by_key = {
+        _dedup_key(meta): doc_id
+        for doc_id, meta in zip(stored.get("ids") or [], stored.get("metadatas") or [])
+    }
+
+    first_in_batch = {}
+    candidates = []
+    for i in indices:
+        key = _dedup_key(metadatas[i])
+        if key in by_key:
+            duplicates[i] = by_key[key]
+        elif key in first_in_batch:
+            continue
+        else:
+            first_in_batch[key] = i
+            candidates.append(i)
+
+    threshold = settings.MEMORY_DEDUP_THRESHOLD
+    if candidates and threshold < 1.0 and collection.count() > 0:
+        for i in candidates:
+            scope = {key: metadatas[i].get(key) for key in _DEDUP_SCOPE}
+            try:
+                raw = collection.query(
+                    query_embeddings=[embeddings[i]],
+                    n_results=1,
+                    where=build_where(scope["type"], scope["channel"], scope["product_text"]),
+                    include=["distances", "metadatas"],
+                )
+            except Exception as e:
+                # e.g. no stored document of this type yet
+                logger.debug(f"Near-duplicate lookup skipped: {e}")
+                continue
+            neighbour_ids = (raw.get("ids") or [[]])[0]
+            distances = (raw.get("distances") or [[]])[0]
+            neighbour_metas = (raw.get("metadatas") or [[]])[0]
+            if not neighbour_ids:
+                continue
+            # `where` cannot ask for a missing field: a general memory must
+            # not absorb a typed or product-specific one
+            neighbour_meta = neighbour_metas[0] or {}
+            if any(neighbour_meta.get(key) != value for key, value in scope.items()):
+                continue
+            # cosine space: distance = 1 - similarity
+            if 1 - distances[0] >= threshold:
+                duplicates[i] = neighbour_ids[0]
+
+    # Later exact repeats within the batch follow their first occurrence:
+    # its stored match if it has one, otherwise the first copy itself
+    for i in indices:
+        first = first_in_batch.get(_dedup_key(metadatas[i]))
+        if first is not None and first != i and i not in duplicates:
+            duplicates[i] = duplicates.get(first, ids[first])
+    return duplicates
+
+
+# Chunk bookkeeping owned by the stored document
+_CHUNK_KEYS = ("parent_id", "chunk_index", "chunk_count")
+
+
+def _refresh(name: str, collection, duplicates: dict[str, int], texts, embeddings, metadatas):
+    """
+    Refreshes existing documents in place with the newer content and
+    merged metadata, keeping their id, original created_at and place in
+    their own parent document (a chunk shared with another text is not
+    re-parented, a standalone document does not become a chunk).
+    """
+    existing_ids = list(duplicates)
+    stored = collection.get(ids=existing_ids, include=["metadatas"])
+    stored_meta = dict(zip(stored.get("ids") or [], stored.get("metadatas") or []))
+    merged = []
+    for doc_id in existing_ids:
+        i = duplicates[doc_id]
+        old = stored_meta.get(doc_id) or {}
+        meta = {**old, **metadatas[i]}
+        for key in _CHUNK_KEYS:
+            if key in old:
+                meta[key] = old[key]
+            else:
+                meta.pop(key, None)
+        meta["created_at"] = old.get("created_at", metadatas[i]["created_at"])
+        meta["refresh_count"] = int(old.get("refresh_count", 0)) + 1
+        merged.append(meta)
+    collection.update(
+        ids=existing_ids,
+        documents=[texts[duplicates[doc_id]] for doc_id in existing_ids],
+        embeddings=[embeddings[duplicates[doc_id]] for doc_id in existing_ids],
+        metadatas=merged,
+    )
+    _index_lexical(
+        name, existing_ids, [texts[duplicates[doc_id]] for doc_id in existing_ids], merged
     )
 
-    return {"id": doc_id, "text": text}
 
+@remote("add_documents")
+def add_documents(
+    texts: list[str],
+    metadatas: list[dict | None] | None = None,
+    batch_size: int | None = None,
+) -> list[dict]:
+    """
+    Batched variant of add_document().
+    Texts are encoded in mini-batches of `batch_size` (small enough to stay
+    cache-friendly on CPU) and written with one collection.add per Chroma
+    max batch instead of one per document.
+
+    Args:
+    - texts: documents to store
+    - metadatas: optional per-document metadata (same length as texts)
+    - batch_size: encoder batch size, defaults to settings.EMBED_BATCH_SIZE
+
+    With MEMORY_DEDUP_ENABLED, exact and near duplicates of stored
+    documents are not inserted again; the stored document is refreshed
+    with the new content instead (see _find_duplicates).
+
+    With CHUNKING_ENABLED, texts longer than CHUNK_SIZE_TOKENS are stored
+    as overlapping chunks (ids "<parent_id>:<n>") carrying parent_id,
+    chunk_index and chunk_count in their metadata; dedup applies per chunk.
+
+    Returns:
+    - [{"id": ..., "text": ..., "status": "added" | "refreshed" | "duplicate"}]
+      in input order; for refreshed/duplicate items id is the stored document.
+      Chunked texts report their parent_id, the number of chunks, and
+      "added" if any chunk was new
+    """
+    if not texts:
+        return []
+    if metadatas is not None and len(metadatas) != len(texts):
+        raise ValueError("metadatas must have the same length as texts")
+
+    parent_texts = texts
+    parent_ids = [str(uuid.uuid4()) for _ in texts]
+    tokenizer = get_tokenizer() if settings.CHUNKING_ENABLED else None
+    now = time.time()
+    # one entry per stored document: chunks of long texts, short texts as is
+    ids, texts, owners, chunked_metadatas = [], [], [], []
+    for p, (parent_id, text, meta) in enumerate(
+        zip(parent_ids, parent_texts, metadatas or [None] * len(parent_texts))
+    ):
+        meta = meta or {"source": "manual"}
+        chunks = chunk_text(text, tokenizer=tokenizer) if settings.CHUNKING_ENABLED else []
+        if len(chunks) <= 1:
+            ids.append(parent_id)
+            texts.append(text)
+            owners.append(p)
+            chunked_metadatas.append(meta)
+            continue
+        for n, chunk in enumerate(chunks):
+            ids.append(f"{parent_id}:{n}")
+            texts.append(chunk)
+            owners.append(p)
+            chunked_metadatas.append(
+                {**meta, "parent_id": parent_id, "chunk_index": n, "chunk_count": len(chunks)}
+            )
+    metadatas = [
+        {
+            **meta,
+            "content_hash": content_hash(text),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for text, meta in zip(texts, chunked_metadatas)
+    ]
+    embeddings = embed(texts, batch_size)
+    statuses = ["added"] * len(texts)
+    new_ids = set(ids)
+
+    # Group by target collection (one per type with VECTOR_COLLECTION_PER_TYPE)
+    groups = {}
+    for i, meta in enumerate(metadatas):
+        groups.setdefault(collection_name(meta.get("type")), []).append(i)
+
+    # Chroma rejects adds larger than the client's max batch size
+    max_batch = getattr(get_chroma_client(), "max_batch_size", None) or len(texts)
+    # Compaction swaps collections under the same lock
+    with writing():
+        for name, indices in groups.items():
+            collection = get_collection(name)
+            if settings.MEMORY_DEDUP_ENABLED:
+                duplicates = _find_duplicates(
+                    collection, indices, ids, texts, embeddings, metadatas
+                )
+                # existing id -> newest batch index that duplicates it
+                refresh = {}
+                for i, target in duplicates.items():
+                    if target in new_ids:
+                        # exact repeat of an earlier item in this batch
+                        statuses[i] = "duplicate"
+                    else:
+                        statuses[i] = "refreshed"
+                        refresh[target] = max(i, refresh.get(target, i))
+                    ids[i] = target
+                if refresh:
+                    _refresh(name, collection, refresh, texts, embeddings, metadatas)
+                    logger.info(f"Memory dedup: refreshed {len(refresh)} stored documents in {name}.")
+                indices = [i for i in indices if statuses[i] == "added"]
+
+            for start in range(0, len(indices), max_batch):
+                chunk = indices[start:start + max_batch]
+                collection.add(
+                    ids=[ids[i] for i in chunk],
+                    documents=[texts[i] for i in chunk],
+                    embeddings=[embeddings[i] for i in chunk],
+                    metadatas=[metadatas[i] for i in chunk],
+                )
+                _index_lexical(
+                    name,
+                    [ids[i] for i in chunk],
+                    [texts[i] for i in chunk],
+                    [metadatas[i] for i in chunk],
+                )
+
+    members_of = {}
+    for j, owner in enumerate(owners):
+        members_of.setdefault(owner, []).append(j)
+    results = []
+    for p, (parent_id, text) in enumerate(zip(parent_ids, parent_texts)):
+        members = members_of[p]
+        if len(members) == 1:
+            results.append({"id": ids[members[0]], "text": text, "status": statuses[members[0]]})
+            continue
+        chunk_statuses = {statuses[j] for j in members}
+        status = next(s for s in ("added", "refreshed", "duplicate") if s in chunk_statuses)
+        if status != "added":
+            # every chunk matched a stored one: report the stored parent
+            parent_id = ids[members[0]].rsplit(":", 1)[0]
+        results.append({"id": parent_id, "text": text, "status": status, "chunks": len(members)})
+    return results
+
+
+@remote("upsert_documents")
+def upsert_documents(
+    ids: list[str],
+    texts: list[str],
+    embeddings: list[list[float]],
+    metadatas: list[dict],
+) -> int:
+    """
+    Bulk write of pre-embedded documents under caller-chosen ids, without
+    dedup lookups. Writing the same ids again overwrites them, which makes
+    resumed bulk loads (scripts.ingest) idempotent.
+
+    Returns:
+    - number of documents written
+    """
+    groups = {}
+    for i, meta in enumerate(metadatas):
+        groups.setdefault(collection_name(meta.get("type")), []).append(i)
+
+    max_batch = getattr(get_chroma_client(), "max_batch_size", None) or len(ids)
+    with writing():
+        for name, indices in groups.items():
+            collection = get_collection(name)
+            for start in range(0, len(indices), max_batch):
+                chunk = indices[start:start + max_batch]
+                collection.upsert(
+                    ids=[ids[i] for i in chunk],
+                    documents=[texts[i] for i in chunk],
+                    embeddings=[embeddings[i] for i in chunk],
+                    metadatas=[metadatas[i] for i in chunk],
+                )
+                _index_lexical(
+                    name,
+                    [ids[i] for i in chunk],
+                    [texts[i] for i in chunk],
+                    [metadatas[i] for i in chunk],
+                )
+    return len(ids)
+
+
+class MemoryWriter:
+    """
+    Write-behind queue for memory writes.
+
+    Writes are accepted into a bounded queue and persisted by a background
+    thread via add_documents(), in batches of `batch_size` or whatever has
+    arrived after `interval_ms`. When the queue is full the caller blocks
+    for up to `enqueue_timeout` seconds (backpressure) and then writes
+    inline, so no write is dropped. The queue is drained on shutdown.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        batch_size: int = 64,
+        interval_ms: int = 250,
+        enqueue_timeout: float = 2.0,
+    ):
+        self.batch_size = batch_size
+        self.interval = interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+        self.written = 0
+        self.batches = 0
+        self.inline_writes = 0
+        self.failed = 0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="memory-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, text: str, metadata: dict | None = None):
+        """
+        Queues one document. Blocks (backpressure) while the queue is full.
+        """
+        if self._closed:
+            add_document(text, metadata)
+            return
+        self._ensure_started()
+        with self._idle:
+            self._pending += 1
+        try:
+            self._queue.put((text, metadata), timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._idle:
+                self._pending -= 1
+                self.inline_writes += 1
+            logger.warning("Memory write queue full - writing inline.")
+            add_document(text, metadata)
+
+    def submit_nowait(self, text: str, metadata: dict | None = None):
+        """
+        submit() for event-loop threads: never blocks. Queues the document
+        if there is room, otherwise hands the inline write to a worker
+        thread (see write_off_loop).
+        """
+        if not self._closed:
+            self._ensure_started()
+            with self._idle:
+                self._pending += 1
+            try:
+                self._queue.put_nowait((text, metadata))
+                return
+            except queue.Full:
+                with self._idle:
+                    self._pending -= 1
+                    self.inline_writes += 1
+                logger.warning("Memory write queue full - writing inline off the event loop.")
+        self.write_off_loop(text, metadata)
+
+    def write_off_loop(self, text: str, metadata: dict | None = None):
+        """
+        Runs one inline write in the running loop's executor; flush()
+        still waits for it. Must be called on an event-loop thread.
+        """
+        with self._idle:
+            self._pending += 1
+        asyncio.get_running_loop().run_in_executor(None, self._write_inline, text, metadata)
+
+    def _write_inline(self, text: str, metadata: dict | None):
+        try:
+            add_document(text, metadata)
+            self.written += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Memory writer failed to persist a document: {e}")
+        finally:
+            self._done(1)
+
+    def _done(self, count: int):
+        with self._idle:
+            self._pending -= count
+            if self._pending <= 0:
+                self._idle.notify_all()
+
+    def _collect(self, first) -> list:
+        batch = [first]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Shutdown sentinel: put it back for the outer loop
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = self._collect(item)
+            try:
+                add_documents(
+                    [text for text, _ in batch],
+                    [meta for _, meta in batch],
+                )
+                self.written += len(batch)
+                self.batches += 1
+            except Exception as e:
+                self.failed += len(batch)
+                logger.error(f"Memory writer failed to persist {len(batch)} documents: {e}")
+            finally:
+                self._done(len(batch))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Blocks until every queued write has been persisted.
+        Returns False if the timeout expired first.
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending <= 0, timeout=timeout)
 
-def search(query: str, k: int = 3):
-    query_embedding = embedding_model.encode(query).tolist()
+    def close(self, timeout: float | None = 30):
+        """Drains the queue and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout=timeout)
+            logger.info(f"Memory writer stopped: {self.stats()}")
 
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "pending": self._pending,
+            "written": self.written,
+            "batches": self.batches,
+            "inline_writes": self.inline_writes,
+            "failed": self.failed,
+        }
+
+
+memory_writer = MemoryWriter(
+    maxsize=settings.MEMORY_QUEUE_SIZE,
+    batch_size=settings.MEMORY_FLUSH_BATCH,
+    interval_ms=settings.MEMORY_FLUSH_INTERVAL_MS,
+    enqueue_timeout=settings.MEMORY_ENQUEUE_TIMEOUT_SECONDS,
+)
+atexit.register(memory_writer.close)
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def write_memory(text: str, metadata: dict | None = None):
+    """
+    Stores a memory off the response path (write-behind), or synchronously
+    when MEMORY_WRITE_BEHIND is disabled.
+
+    Called from async agents (on the event loop) it never blocks: a full
+    queue or a synchronous write is handed to a worker thread instead.
+    """
+    on_loop = _on_event_loop()
+    if settings.MEMORY_WRITE_BEHIND:
+        if on_loop:
+            memory_writer.submit_nowait(text, metadata)
+        else:
+            memory_writer.submit(text, metadata)
+    elif on_loop:
+        memory_writer.write_off_loop(text, metadata)
+    else:
+        add_document(text, metadata)
+
+
+def flush_memory(timeout: float | None = None) -> bool:
+    """Waits until all queued memory writes are persisted."""
+    return memory_writer.flush(timeout)
+
+
+def search(query: str, k: int = 3, where: dict | None = None):
+    return search_many([query], k, where)[0]
+
+
+def _target_collections(where: dict | None) -> list[str]:
+    """
+    Collections a filtered search must look at. A plain type filter
+    narrows per-type storage down to that type's collection(s).
+    """
+    if not settings.VECTOR_COLLECTION_PER_TYPE:
+        return [DEFAULT_COLLECTION]
+    conditions = where.get("$and", [where]) if where else []
+    for condition in conditions:
+        memory_type = condition.get("type")
+        if isinstance(memory_type, str):
+            return [collection_name(memory_type)]
+        if isinstance(memory_type, dict) and "$in" in memory_type:
+            return list(dict.fromkeys(collection_name(t) for t in memory_type["$in"]))
+    return all_collection_names()
+
+
+def _query(name: str, query_embeddings: list, k: int, where: dict | None) -> list[dict]:
     # MUST SPECIFY include param, or Chroma returns a non-serializable object
-    raw = collection.query(
-        query_embeddings=[query_embedding],
+    raw = get_collection(name).query(
+        query_embeddings=query_embeddings,
         n_results=k,
+        where=where,
         include=["documents", "metadatas", "distances"],
     )
 
-    # ALWAYS convert to primitive dict
-    return {
-        "ids": raw.get("ids", [[]])[0],
-        "documents": raw.get("documents", [[]])[0],
-        "metadatas": raw.get("metadatas", [[]])[0],
-        "distances": raw.get("distances", [[]])[0],
-    }
+    # ALWAYS convert to primitive dicts
+    empty = [[] for _ in query_embeddings]
+    return [
+        {
+            "ids": ids,
+            "documents": documents,
+            "metadatas": metadatas,
+            "distances": distances,
+        }
+        for ids, documents, metadatas, distances in zip(
+            raw.get("ids") or empty,
+            raw.get("documents") or empty,
+            raw.get("metadatas") or empty,
+            raw.get("distances") or empty,
+        )
+    ]
+
+
+@remote("search_many")
+def search_many(queries: list[str], k: int = 3, where: dict | None = None) -> list[dict]:
+    """
+    Batched search: encodes all queries in one batch and runs a single
+    collection.query with one embedding per query.
+
+    Args:
+    - queries: query texts
+    - k: results per query
+    - where: optional Chroma metadata filter (see build_where), applied
+      before the ANN search
+
+    Returns:
+    - one {"ids", "documents", "metadatas", "distances"} dict per query,
+      in input order, with at most one hit (the best chunk) per parent
+      document
+    """
+    if not queries:
+        return []
+    hits = _search_embeddings(embed(queries), k * max(1, settings.CHUNK_SEARCH_FACTOR), where)
+    return [collapse_chunks(hit, k) for hit in hits]
+
+
+def collapse_chunks(hit: dict, k: int) -> dict:
+    """
+    Keeps the best ranked hit per parent document (chunks share their
+    parent_id, unchunked documents are their own parent), up to k.
+    """
+    keep = []
+    parents = set()
+    for j, (doc_id, metadata) in enumerate(zip(hit["ids"], hit["metadatas"])):
+        parent = (metadata or {}).get("parent_id") or doc_id
+        if parent in parents:
+            continue
+        parents.add(parent)
+        keep.append(j)
+        if len(keep) == k:
+            break
+    return {key: [values[j] for j in keep] for key, values in hit.items()}
+
+
+def _search_embeddings(query_embeddings: list, k: int, where: dict | None) -> list[dict]:
+    names = _target_collections(where)
+    if len(names) == 1:
+        return _query(names[0], query_embeddings, k, where)
+
+    # Per-type collections: query each, keep the k closest per query
+    per_collection = [_query(name, query_embeddings, k, where) for name in names]
+    results = []
+    for hits in zip(*per_collection):
+        rows = sorted(
+            (
+                (distance, doc_id, document, metadata)
+                for hit in hits
+                for doc_id, document, metadata, distance in zip(
+                    hit["ids"], hit["documents"], hit["metadatas"], hit["distances"]
+                )
+            ),
+            key=lambda row: row[0],
+        )[:k]
+        results.append({
+            "ids": [row[1] for row in rows],
+            "documents": [row[2] for row in rows],
+            "metadatas": [row[3] for row in rows],
+            "distances": [row[0] for row in rows],
+        })
+    return results
+
+
+def _cosine_distance(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) ** 0.5) * (sum(y * y for y in b) ** 0.5)
+    return 1.0 - dot / norm if norm else 1.0
+
+
+@remote("hybrid_search_many")
+def hybrid_search_many(
+    queries: list[str],
+    k: int = 3,
+    where: dict | None = None,
+) -> list[dict]:
+    """
+    Hybrid lexical + vector search, fused with reciprocal rank fusion:
+    score(doc) = sum over both rankings of 1 / (HYBRID_RRF_K + rank).
+    Each side contributes its top k * HYBRID_CANDIDATE_FACTOR hits, so
+    exact product names / SKUs that MiniLM ranks low still surface.
+
+    Returns:
+    - same shape as search_many(), plus "scores" (fused RRF score);
+      distances are cosine distances for every hit, lexical-only ones
+      included. Chunks are collapsed to their parent like search_many()
+    """
+    if not queries:
+        return []
+    top_k = k * max(1, settings.CHUNK_SEARCH_FACTOR)
+    candidates = max(top_k, k * settings.HYBRID_CANDIDATE_FACTOR)
+    query_embeddings = embed(queries)
+    vector_hits = _search_embeddings(query_embeddings, candidates, where)
+    index = get_lexical_index()
+    rrf_k = settings.HYBRID_RRF_K
+
+    fused = []
+    # doc_id -> (document, metadata); distances are kept per query
+    known = {}
+    distances = {}
+    missing = {}
+    for query_index, (query, hits) in enumerate(zip(queries, vector_hits)):
+        scores = {}
+        for rank, doc_id in enumerate(hits["ids"]):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (rrf_k + rank + 1)
+        for doc_id, document, metadata, distance in zip(
+            hits["ids"], hits["documents"], hits["metadatas"], hits["distances"]
+        ):
+            known[doc_id] = (document, metadata)
+            distances[(query_index, doc_id)] = distance
+        for rank, (doc_id, _) in enumerate(index.search(query, candidates, where)):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1 / (rrf_k + rank + 1)
+        top = heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+        fused.append(top)
+        for doc_id, _ in top:
+            if (query_index, doc_id) not in distances:
+                name = index.collection_of(doc_id) or DEFAULT_COLLECTION
+                missing.setdefault(name, set()).add(doc_id)
+
+    # Hits the vector side did not return for their own query: one get per
+    # collection for text, metadata and the embedding (to report a real
+    # distance)
+    embeddings = {}
+    for name, doc_ids in missing.items():
+        got = get_collection(name).get(
+            ids=list(doc_ids), include=["documents", "metadatas", "embeddings"]
+        )
+        for doc_id, document, metadata, embedding in zip(
+            got.get("ids") or [], got["documents"], got["metadatas"], got["embeddings"]
+        ):
+            known[doc_id] = (document, metadata)
+            embeddings[doc_id] = list(embedding)
+
+    results = []
+    for query_index, (query_embedding, top) in enumerate(zip(query_embeddings, fused)):
+        rows = [
+            (doc_id, score) for doc_id, score in top
+            if (query_index, doc_id) in distances or doc_id in embeddings
+        ]
+        row_distances = []
+        for doc_id, _ in rows:
+            distance = distances.get((query_index, doc_id))
+            if distance is None:
+                distance = _cosine_distance(query_embedding, embeddings[doc_id])
+            row_distances.append(distance)
+        results.append(collapse_chunks({
+            "ids": [doc_id for doc_id, _ in rows],
+            "documents": [known[doc_id][0] for doc_id, _ in rows],
+            "metadatas": [known[doc_id][1] for doc_id, _ in rows],
+            "distances": row_distances,
+            "scores": [score for _, score in rows],
+        }, k))
+    return results
+
+
+def hybrid_search(query: str, k: int = 3, where: dict | None = None) -> dict:
+    return hybrid_search_many([query], k, where)[0]